@@ -0,0 +1,76 @@
+"""Micro-benchmark of the cumulative meter values computed for each backfilled day."""
+from datetime import datetime, timedelta, timezone
+import time
+from typing import Callable, List
+
+from custom_components.youtilitics.const import DEFAULT_BACKFILL_SAMPLE_RATE
+from custom_components.youtilitics.models import ReadingSeries
+from custom_components.youtilitics.sensor import _cumulative_day_batches
+from metrics import BenchmarkReport
+
+# Each measurement keeps the fastest of this many runs
+REPEATS = 5
+START = datetime(2020, 1, 1, tzinfo=timezone.utc)
+
+
+def _synthetic_readings(days: float) -> ReadingSeries:
+    """Return 15-minute readings over a number of days."""
+    return ReadingSeries.from_dicts([
+        {
+            "id": i,
+            "timestamp": (START + timedelta(minutes=15 * i)).isoformat(),
+            "reading": 0.1 + (i % 7) * 0.05,
+            "unit": "kWh",
+            "raw_reading": 0.1 + (i % 7) * 0.05,
+            "raw_unit": "kWh",
+            "cost": 0.02,
+        }
+        for i in range(max(1, int(days * 96)))
+    ])
+
+
+def _quadratic_day_values(readings: ReadingSeries, total: float) -> List[float]:
+    """Return the emitted meter values the way backfill computed them before the running sum.
+
+    Each emitted value was the day's closing total minus the sum of the
+    rest of the day, which is quadratic in the readings of a day.
+    """
+    values = []
+    for batch in readings.day_slices():
+        batch_readings = list(batch.readings)
+        total += sum(batch_readings)
+        for i in range(0, len(batch_readings), DEFAULT_BACKFILL_SAMPLE_RATE):
+            values.append(total - sum(batch_readings[i + 1:]))
+    return values
+
+
+def _running_day_values(readings: ReadingSeries, total: float) -> List[float]:
+    """Return the emitted meter values from the running totals used by backfill."""
+    return [
+        totals[i]
+        for _, totals, _ in _cumulative_day_batches(readings, total, 0.0)
+        for i in range(0, len(totals), DEFAULT_BACKFILL_SAMPLE_RATE)
+    ]
+
+
+def _fastest(compute: Callable[[], List[float]]) -> float:
+    """Return the fastest run of compute, in milliseconds."""
+    best = float("inf")
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        compute()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def bench_backfill_batches(bench_options, bench_report: BenchmarkReport):
+    """Time the meter values of one day and of the whole history, before and after the running sum."""
+    day = _synthetic_readings(1)
+    history = _synthetic_readings(bench_options["years"] * 365)
+    for label, readings in (("day", day), ("history", history)):
+        before = _quadratic_day_values(readings, 1000.0)
+        after = _running_day_values(readings, 1000.0)
+        assert len(before) == len(after)
+        assert all(abs(a - b) < 1e-6 for a, b in zip(before, after))
+        bench_report.metrics[f"{label}_quadratic_ms"] = _fastest(lambda: _quadratic_day_values(readings, 1000.0))
+        bench_report.metrics[f"{label}_running_sum_ms"] = _fastest(lambda: _running_day_values(readings, 1000.0))
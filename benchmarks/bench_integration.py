@@ -0,0 +1,70 @@
+"""Benchmark of the setup, sync and backfill of the integration against the fake API."""
+import asyncio
+from datetime import timedelta
+
+from homeassistant.core import HomeAssistant
+from pytest_homeassistant_custom_component.components.recorder.common import async_wait_recording_done
+
+from custom_components.youtilitics.const import DOMAIN
+from fake_api import FakeApiServer
+from harness import SchedulerProbe, add_fake_entry, fake_api_patches
+from metrics import BenchmarkReport, LoopLagMonitor, StateWriteCounter, peak_rss_mb
+
+# Give up on a phase that takes longer than this
+PHASE_TIMEOUT = timedelta(minutes=30)
+
+
+async def bench_integration(
+    recorder_mock,
+    hass: HomeAssistant,
+    enable_custom_integrations,
+    fake_api: FakeApiServer,
+    bench_options,
+    bench_report: BenchmarkReport,
+):
+    """Set up an entry, run its startup sync and backfill, then one incremental sync."""
+    entry = add_fake_entry(hass, "fake", bench_options["backfill_mode"])
+    probe = SchedulerProbe()
+    lag = LoopLagMonitor()
+    writes = StateWriteCounter(hass, f"sensor.{DOMAIN}_")
+    patches = [*fake_api_patches(fake_api), *probe.patches()]
+    for active in patches:
+        active.start()
+    lag.start()
+    try:
+        with bench_report.timed("setup_s"):
+            assert await hass.config_entries.async_setup(entry.entry_id)
+        async with asyncio.timeout(PHASE_TIMEOUT.total_seconds()):
+            await probe.startup_done.wait()
+        bench_report.metrics["startup_sync_s"] = probe.phases.get("update", 0.0)
+        bench_report.metrics["backfill_s"] = probe.phases.get("backfill", 0.0)
+        # Imported statistics and states are written by the recorder thread
+        with bench_report.timed("recorder_drain_s"):
+            await async_wait_recording_done(hass)
+        startup_writes = writes.count
+
+        # One day of new readings published, picked up by the next refresh
+        fake_api.api.advance(timedelta(days=1))
+        coordinator = hass.data[DOMAIN][entry.entry_id]["coordinator"]
+        with bench_report.timed("incremental_sync_s"):
+            await coordinator.async_refresh()
+            async with asyncio.timeout(PHASE_TIMEOUT.total_seconds()):
+                await probe.sync_done.wait()
+        await hass.async_block_till_done()
+    finally:
+        await lag.stop()
+        writes.stop()
+        for active in patches:
+            active.stop()
+
+    bench_report.metrics["loop_blocked_s"] = lag.blocked
+    bench_report.metrics["loop_max_lag_s"] = lag.max_lag
+    bench_report.metrics["peak_rss_mb"] = peak_rss_mb()
+    bench_report.metrics["state_writes_startup"] = startup_writes
+    bench_report.metrics["state_writes_total"] = writes.count
+    bench_report.metrics["api_requests"] = fake_api.api.requests
+    bench_report.metrics["api_errors"] = fake_api.api.errors
+    bench_report.metrics["readings_served"] = fake_api.api.readings_served
+
+    assert await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_block_till_done()
@@ -0,0 +1,74 @@
+"""Benchmark of several config entries sharing the API client pool and sync budget."""
+import asyncio
+import time
+from datetime import timedelta
+
+from homeassistant.config_entries import ConfigEntryState
+from homeassistant.core import HomeAssistant
+from homeassistant.setup import async_setup_component
+from pytest_homeassistant_custom_component.components.recorder.common import async_wait_recording_done
+
+from custom_components.youtilitics.const import DOMAIN
+from custom_components.youtilitics.youtilitics import get_client_pool
+from fake_api import FakeApiServer
+from harness import SchedulerProbe, add_fake_entry, fake_api_patches
+from metrics import BenchmarkReport, LoopLagMonitor, peak_rss_mb
+
+# Give up on the startup runs if they take longer than this
+STARTUP_TIMEOUT = timedelta(minutes=30)
+
+
+async def bench_scaling(
+    recorder_mock,
+    hass: HomeAssistant,
+    enable_custom_integrations,
+    fake_api: FakeApiServer,
+    bench_options,
+    bench_report: BenchmarkReport,
+):
+    """Set up one entry per account of the fake API and run all their startup syncs together."""
+    accounts = bench_options["accounts"]
+    entries = [add_fake_entry(hass, f"account-{account}", bench_options["backfill_mode"]) for account in range(accounts)]
+    probe = SchedulerProbe()
+    lag = LoopLagMonitor()
+    patches = [*fake_api_patches(fake_api), *probe.patches()]
+    for active in patches:
+        active.start()
+    lag.start()
+    start = time.perf_counter()
+    try:
+        with bench_report.timed("setup_s"):
+            assert await async_setup_component(hass, DOMAIN, {})
+        assert all(entry.state is ConfigEntryState.LOADED for entry in entries)
+        async with asyncio.timeout(STARTUP_TIMEOUT.total_seconds()):
+            await probe.async_wait_startups(accounts)
+        finished = sorted(probe.startups.values())
+        bench_report.metrics["startup_all_s"] = finished[-1] - start
+        # Spread between the first and the last entry done: low when syncs are scheduled fairly
+        bench_report.metrics["startup_spread_s"] = finished[-1] - finished[0]
+        with bench_report.timed("recorder_drain_s"):
+            await async_wait_recording_done(hass)
+        pool = get_client_pool(hass)
+        assert len(pool.clients) == accounts
+        # Every entry only sees the services of its own account
+        for entry in entries:
+            coordinator = hass.data[DOMAIN][entry.entry_id]["coordinator"]
+            services = [service for account in coordinator.data["services"] for service in account.services]
+            assert len(services) == bench_options["services"]
+    finally:
+        await lag.stop()
+        for active in patches:
+            active.stop()
+
+    bench_report.metrics["entries"] = accounts
+    bench_report.metrics["loop_blocked_s"] = lag.blocked
+    bench_report.metrics["loop_max_lag_s"] = lag.max_lag
+    bench_report.metrics["peak_rss_mb"] = peak_rss_mb()
+    bench_report.metrics["api_requests"] = fake_api.api.requests
+    bench_report.metrics["api_max_in_flight"] = fake_api.api.max_in_flight
+    bench_report.metrics["readings_served"] = fake_api.api.readings_served
+
+    for entry in entries:
+        assert await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_block_till_done()
+    assert not get_client_pool(hass).clients
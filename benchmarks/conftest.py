@@ -0,0 +1,72 @@
+"""Fixtures and options of the Youtilitics benchmarks."""
+import logging
+from pathlib import Path
+
+import pytest
+
+from fake_api import FakeApiServer, FakeYoutiliticsApi
+from metrics import BenchmarkReport
+
+_REPORTS = []
+
+# pytest-homeassistant logs every SQL statement, which would dominate the recorder timings
+logging.getLogger("sqlalchemy.engine").setLevel(logging.WARNING)
+
+
+def pytest_addoption(parser):
+    """Register the benchmark options."""
+    group = parser.getgroup("youtilitics benchmark")
+    group.addoption("--accounts", type=int, default=1, help="Accounts served by the fake API")
+    group.addoption("--services", type=int, default=3, help="Services per account")
+    group.addoption("--years", type=float, default=3.0, help="Years of 15-minute readings per service")
+    group.addoption("--latency", type=float, default=0.05, help="Latency of every request, in seconds")
+    group.addoption("--error-rate", type=float, default=0.0, help="Fraction of requests failing with a 503")
+    group.addoption("--backfill-mode", default="statistics", help="Backfill mode option of the entry")
+    group.addoption("--baseline", type=Path, help="Compare the results with this saved report")
+    group.addoption("--save", type=Path, help="Save the results as a baseline report")
+
+
+@pytest.fixture
+def bench_options(request):
+    """Return the benchmark parameters."""
+    option = request.config.getoption
+    return {
+        "accounts": option("--accounts"),
+        "services": option("--services"),
+        "years": option("--years"),
+        "latency": option("--latency"),
+        "error_rate": option("--error-rate"),
+        "backfill_mode": option("--backfill-mode"),
+    }
+
+
+@pytest.fixture
+def fake_api(bench_options, socket_enabled):
+    """Serve a fake Youtilitics API on a local port."""
+    api = FakeYoutiliticsApi(
+        accounts=bench_options["accounts"],
+        services_per_account=bench_options["services"],
+        years=bench_options["years"],
+        latency=bench_options["latency"],
+        error_rate=bench_options["error_rate"],
+    )
+    server = FakeApiServer(api)
+    server.start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def bench_report(request, bench_options):
+    """Return the report of a benchmark, printed at the end of the session."""
+    report = BenchmarkReport(request.node.name, bench_options)
+    yield report
+    if request.config.getoption("--save"):
+        report.save(request.config.getoption("--save"))
+    _REPORTS.append((report, request.config.getoption("--baseline")))
+
+
+def pytest_terminal_summary(terminalreporter):
+    """Print the benchmark reports."""
+    for report, baseline in _REPORTS:
+        terminalreporter.write_line(report.format(baseline))
@@ -0,0 +1,208 @@
+"""Local stand-in for the Youtilitics API, serving synthetic accounts and readings."""
+import asyncio
+import json
+import math
+import random
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List
+
+from aiohttp import hdrs, web
+
+SERVICE_TYPES = {"Electricity": 1, "Gas": 2, "Water": 3}
+# (unit, raw_unit) of the readings of each service type
+UNITS = {1: ("kWh", "kWh"), 2: ("L", "therm"), 3: ("L", "gal")}
+INTERVAL = timedelta(minutes=15)
+# Readings serialized per write of a streamed response
+WRITE_BATCH = 1000
+
+
+@dataclass
+class FakeService:
+    """Synthetic readings history of a service."""
+    id: str
+    type: int
+    start: datetime
+    # Number of 15-minute intervals published so far
+    count: int
+    last_sync_at: datetime | None = None
+
+    def reading(self, index: int) -> Dict:
+        """Return the raw API reading of an interval, the same on every request."""
+        timestamp = self.start + INTERVAL * index
+        hour = timestamp.hour + timestamp.minute / 60
+        # Daily usage curve plus deterministic noise
+        value = 0.2 + 0.15 * math.sin((hour - 7) / 24 * 2 * math.pi) + (index * 2654435761 % 100) / 1000
+        if self.type == 2:
+            value *= 1000
+        unit, raw_unit = UNITS[self.type]
+        return {
+            "id": index + 1,
+            "timestamp": timestamp.isoformat(),
+            "reading": round(value, 4),
+            "unit": unit,
+            "raw_reading": round(value, 4),
+            "raw_unit": raw_unit,
+            "cost": round(value * 0.15, 4),
+        }
+
+
+@dataclass
+class FakeYoutiliticsApi:
+    """Youtilitics API serving a configurable amount of synthetic data.
+
+    Every request is delayed by latency and fails with a 503 at error_rate.
+    A bearer token "account-<n>" only sees that account, any other token sees
+    them all. Counters of the requests served are kept for the benchmark report.
+    """
+    accounts: int = 1
+    services_per_account: int = 3
+    years: float = 1.0
+    latency: float = 0.0
+    error_rate: float = 0.0
+    seed: int = 0
+    now: datetime = field(
+        default_factory=lambda: datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    )
+    services: List[FakeService] = field(default_factory=list)
+    requests: int = 0
+    errors: int = 0
+    readings_served: int = 0
+    in_flight: int = 0
+    max_in_flight: int = 0
+
+    def __post_init__(self) -> None:
+        """Create the synthetic services."""
+        self._random = random.Random(self.seed)
+        count = int(timedelta(days=365 * self.years) / INTERVAL)
+        start = self.now - INTERVAL * count
+        for account in range(self.accounts):
+            for number in range(self.services_per_account):
+                self.services.append(FakeService(
+                    id=f"{account:04d}-{number:04d}",
+                    type=list(SERVICE_TYPES.values())[number % len(SERVICE_TYPES)],
+                    start=start,
+                    count=count,
+                    last_sync_at=self.now,
+                ))
+
+    def advance(self, delta: timedelta) -> None:
+        """Publish the readings of the next delta of time."""
+        self.now += delta
+        for service in self.services:
+            service.count += int(delta / INTERVAL)
+            service.last_sync_at = self.now
+
+    def app(self) -> web.Application:
+        """Return the aiohttp application serving the API."""
+        app = web.Application(middlewares=[self._middleware])
+        app.router.add_get("/services", self._services)
+        app.router.add_get("/utilities/services", self._service_types)
+        app.router.add_get("/services/{service_id}", self._readings)
+        return app
+
+    @web.middleware
+    async def _middleware(self, request: web.Request, handler):
+        """Apply the latency and error rate to every request, counting those in flight."""
+        self.requests += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            if self._random.random() < self.error_rate:
+                self.errors += 1
+                return web.Response(status=503, text="Service unavailable")
+            return await handler(request)
+        finally:
+            self.in_flight -= 1
+
+    async def _services(self, request: web.Request) -> web.Response:
+        """Serve the accounts of the token and their services."""
+        token = request.headers.get(hdrs.AUTHORIZATION, "").removeprefix("Bearer ")
+        scope = range(self.accounts)
+        if token.startswith("account-"):
+            scope = [int(token.removeprefix("account-"))]
+        accounts = []
+        for account in scope:
+            services = self.services[account * self.services_per_account:(account + 1) * self.services_per_account]
+            accounts.append({
+                "id": f"account-{account}",
+                "utility": {"id": f"utility-{account}", "slug": "fake", "name": f"Fake Utility {account}", "services": [1, 2, 3]},
+                "services": [
+                    {"id": service.id, "type": service.type, "remote_id": service.id, "last_sync_at": service.last_sync_at.isoformat()}
+                    for service in services
+                ],
+            })
+        # Tagged like the real API so the client revalidates instead of reusing a stale list
+        etag = f'"{self.now.timestamp():.0f}"'
+        if request.headers.get(hdrs.IF_NONE_MATCH) == etag:
+            return web.Response(status=304, headers={hdrs.ETAG: etag})
+        return web.json_response(accounts, headers={hdrs.ETAG: etag})
+
+    async def _service_types(self, request: web.Request) -> web.Response:
+        """Serve the service type ids."""
+        return web.json_response(SERVICE_TYPES)
+
+    async def _readings(self, request: web.Request) -> web.StreamResponse:
+        """Stream the readings after the last query parameter, oldest first."""
+        service = next((s for s in self.services if s.id == request.match_info["service_id"]), None)
+        if service is None:
+            return web.Response(status=404)
+        first = 0
+        if "last" in request.query:
+            last = datetime.fromisoformat(request.query["last"])
+            first = max(0, math.floor((last - service.start) / INTERVAL) + 1)
+        response = web.StreamResponse(headers={"Content-Type": "application/json"})
+        await response.prepare(request)
+        await response.write(b"[")
+        try:
+            for start in range(first, service.count, WRITE_BATCH):
+                end = min(start + WRITE_BATCH, service.count)
+                items = ",".join(json.dumps(service.reading(index)) for index in range(start, end))
+                await response.write(((b"," if start > first else b"") + items.encode()))
+                self.readings_served += end - start
+            await response.write(b"]")
+        except ConnectionResetError:
+            # The client closed the stream once it had the readings it needed
+            pass
+        return response
+
+
+class FakeApiServer:
+    """Serve a fake API from its own thread and event loop.
+
+    Generating the responses then does not block the event loop of the Home
+    Assistant instance under test, so it does not skew the measurements.
+    """
+
+    def __init__(self, api: FakeYoutiliticsApi) -> None:
+        """Initialize the server."""
+        self.api = api
+        self.url: str | None = None
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="fake-youtilitics-api", daemon=True)
+        self._runner: web.AppRunner | None = None
+
+    def start(self) -> str:
+        """Start serving on a free local port and return the base URL."""
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self._async_start(), self._loop).result()
+        return self.url
+
+    async def _async_start(self) -> None:
+        """Start the application."""
+        self._runner = web.AppRunner(self.api.app())
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        port = self._runner.addresses[0][1]
+        self.url = f"http://127.0.0.1:{port}"
+
+    def stop(self) -> None:
+        """Stop serving and join the thread."""
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
@@ -0,0 +1,103 @@
+"""Test doubles shared by the Youtilitics benchmarks."""
+import asyncio
+import time
+from typing import Dict, List
+from unittest.mock import patch
+
+from homeassistant.core import HomeAssistant
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.youtilitics.const import CONF_BACKFILL_MODE, DOMAIN
+from custom_components.youtilitics.scheduler import YoutiliticsSyncScheduler
+from fake_api import FakeApiServer
+
+
+class FakeImplementation:
+    """OAuth2 implementation of a token that never expires."""
+
+    domain = DOMAIN
+    name = "Fake"
+
+    async def async_refresh_token(self, token):
+        """Return the token unchanged."""
+        return token
+
+
+def add_fake_entry(hass: HomeAssistant, access_token: str, backfill_mode: str) -> MockConfigEntry:
+    """Add a config entry authorized with access_token on the fake API."""
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        title=access_token,
+        data={
+            "auth_implementation": "fake",
+            "token": {"access_token": access_token, "token_type": "Bearer", "expires_at": time.time() + 86400 * 365},
+        },
+        options={CONF_BACKFILL_MODE: backfill_mode},
+    )
+    entry.add_to_hass(hass)
+    return entry
+
+
+def fake_api_patches(fake_api: FakeApiServer) -> List:
+    """Return the patches pointing the integration at the fake API."""
+
+    async def implementation(hass, entry):
+        return FakeImplementation()
+
+    return [
+        patch("custom_components.youtilitics.youtilitics.API_URL", fake_api.url),
+        patch("custom_components.youtilitics.async_get_config_entry_implementation", implementation),
+    ]
+
+
+class SchedulerProbe:
+    """Time the phases of the sync schedulers and tell when their runs end."""
+
+    def __init__(self) -> None:
+        """Initialize the probe."""
+        self.phases = {}
+        self.startup_done = asyncio.Event()
+        self.sync_done = asyncio.Event()
+        # Time each entry's startup run ended, in order
+        self.startups: Dict[str, float] = {}
+
+    async def async_wait_startups(self, count: int) -> None:
+        """Wait until count schedulers have finished their startup run."""
+        while len(self.startups) < count:
+            self.startup_done.clear()
+            await self.startup_done.wait()
+
+    def patches(self) -> List:
+        """Return the patches wrapping the scheduler."""
+        probe = self
+        run_all = YoutiliticsSyncScheduler._async_run_all
+        run_startup = YoutiliticsSyncScheduler.async_run_startup
+        run_sync = YoutiliticsSyncScheduler.async_run_sync
+
+        async def timed_run_all(self, phase, *args):
+            start = time.perf_counter()
+            try:
+                return await run_all(self, phase, *args)
+            finally:
+                probe.phases[phase] = probe.phases.get(phase, 0.0) + time.perf_counter() - start
+
+        async def signalled_startup(self, *args):
+            try:
+                return await run_startup(self, *args)
+            finally:
+                probe.startups[self._entry_id] = time.perf_counter()
+                probe.startup_done.set()
+
+        async def signalled_sync(self, *args):
+            try:
+                return await run_sync(self, *args)
+            finally:
+                probe.sync_done.set()
+
+        return [
+            patch.object(YoutiliticsSyncScheduler, "_async_run_all", timed_run_all),
+            patch.object(YoutiliticsSyncScheduler, "async_run_startup", signalled_startup),
+            patch.object(YoutiliticsSyncScheduler, "async_run_sync", signalled_sync),
+            # Measure the work, not the random delays spreading it out
+            patch("custom_components.youtilitics.scheduler.random.uniform", return_value=0),
+        ]
@@ -0,0 +1,129 @@
+"""Measurements taken while benchmarking the integration."""
+import asyncio
+import json
+import resource
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator
+
+from homeassistant.const import EVENT_STATE_CHANGED
+from homeassistant.core import Event, HomeAssistant, callback
+
+# Interval of the event loop lag probe, in seconds
+LAG_PROBE_INTERVAL = 0.01
+# Lags shorter than this are scheduling noise, not blocking
+LAG_THRESHOLD = 0.005
+# A metric changing by more than this fraction of its baseline is flagged
+REGRESSION_THRESHOLD = 0.10
+
+
+def peak_rss_mb() -> float:
+    """Return the peak resident memory of the process, in MiB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, KiB elsewhere
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+class LoopLagMonitor:
+    """Measure how long the event loop is blocked.
+
+    A probe sleeps LAG_PROBE_INTERVAL at a time; any extra delay before it
+    wakes up is time the loop spent running something else without yielding.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the monitor."""
+        self.blocked = 0.0
+        self.max_lag = 0.0
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        """Start probing the running loop."""
+        self._task = asyncio.get_running_loop().create_task(self._probe())
+
+    async def stop(self) -> None:
+        """Stop probing."""
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+    async def _probe(self) -> None:
+        """Record the lag of every wake-up."""
+        while True:
+            before = time.perf_counter()
+            await asyncio.sleep(LAG_PROBE_INTERVAL)
+            lag = time.perf_counter() - before - LAG_PROBE_INTERVAL
+            if lag > LAG_THRESHOLD:
+                self.blocked += lag
+                self.max_lag = max(self.max_lag, lag)
+
+
+class StateWriteCounter:
+    """Count the state changes of the integration's entities."""
+
+    def __init__(self, hass: HomeAssistant, prefix: str) -> None:
+        """Initialize the counter."""
+        self.count = 0
+        self._prefix = prefix
+        self._unsub = hass.bus.async_listen(EVENT_STATE_CHANGED, self._async_state_changed)
+
+    @callback
+    def _async_state_changed(self, event: Event) -> None:
+        """Count a state change."""
+        if event.data["entity_id"].startswith(self._prefix):
+            self.count += 1
+
+    def stop(self) -> None:
+        """Stop counting."""
+        self._unsub()
+
+
+class BenchmarkReport:
+    """Metrics of a benchmark run, comparable against a saved baseline."""
+
+    def __init__(self, name: str, parameters: Dict) -> None:
+        """Initialize the report."""
+        self.name = name
+        self.parameters = parameters
+        self.metrics: Dict[str, float] = {}
+
+    @contextmanager
+    def timed(self, metric: str) -> Iterator[None]:
+        """Record the wall time of a block, in seconds."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.metrics[metric] = time.perf_counter() - start
+
+    def save(self, path: Path) -> None:
+        """Save the report as a baseline, next to those of the other benchmarks."""
+        saved = json.loads(path.read_text()) if path.exists() else {}
+        saved[self.name] = {"parameters": self.parameters, "metrics": self.metrics}
+        path.write_text(json.dumps(saved, indent=2))
+
+    def format(self, baseline_path: Path | None = None) -> str:
+        """Return the report as a table, compared with a baseline if given."""
+        baseline = {}
+        lines = [f"Youtilitics {self.name} {self.parameters}"]
+        if baseline_path is not None:
+            saved = json.loads(baseline_path.read_text()).get(self.name)
+            if saved is None:
+                lines.append("warning: no baseline for this benchmark")
+            else:
+                baseline = saved["metrics"]
+                if saved["parameters"] != self.parameters:
+                    lines.append(f"warning: baseline parameters differ: {saved['parameters']}")
+        for metric, value in self.metrics.items():
+            line = f"  {metric:<28} {value:>12.3f}"
+            before = baseline.get(metric)
+            if before:
+                change = (value - before) / before
+                flag = "  <-- regression" if change > REGRESSION_THRESHOLD else ""
+                line += f"   baseline {before:>12.3f}  {change:+.1%}{flag}"
+            lines.append(line)
+        return "\n".join(lines)
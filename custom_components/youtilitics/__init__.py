@@ -1,11 +1,16 @@
 """The Youtilitics integration."""
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.exceptions import ConfigEntryAuthFailed
 from homeassistant.helpers.config_entry_oauth2_flow import async_get_config_entry_implementation
+from homeassistant.helpers.start import async_at_started
 
-from .const import DOMAIN
+from .const import CONF_SYNC_CONCURRENCY, DEFAULT_SYNC_CONCURRENCY, DOMAIN
 from .coordinator import YoutiliticsDataCoordinator
+from .scheduler import YoutiliticsSyncScheduler, get_sync_budget
+from .youtilitics import get_client_pool
+
+PLATFORMS = ["sensor", "binary_sensor"]
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up Youtilitics config."""
@@ -29,21 +34,70 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     # Initial data fetch
     await yt_coordinator.async_config_entry_first_refresh()
 
-    # Store coordinator and session
-    hass.data[DOMAIN] = {
-        entry.entry_id: {
-            "coordinator": yt_coordinator,
-            # "oauth_session": oauth_session
-        }
+    # Sensors register their services with the scheduler when they are set up
+    scheduler = YoutiliticsSyncScheduler(
+        entry.options.get(CONF_SYNC_CONCURRENCY, DEFAULT_SYNC_CONCURRENCY),
+        profiler=yt_coordinator.profiler,
+        budget=get_sync_budget(hass),
+        entry_id=entry.entry_id,
+        writer=yt_coordinator.state_writer,
+    )
+
+    # Store coordinator and session, next to those of the other entries
+    hass.data.setdefault(DOMAIN, {})[entry.entry_id] = {
+        "coordinator": yt_coordinator,
+        "scheduler": scheduler,
+        # Options the entry was set up with, it is only reloaded when they change
+        "options": dict(entry.options),
+        # "oauth_session": oauth_session
     }
 
-    # Forward setup to sensor platform
-    await hass.config_entries.async_forward_entry_setups(entry, ["sensor"])
+    # Forward setup to the sensor and anomaly binary sensor platforms
+    await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+    entry.async_on_unload(entry.add_update_listener(async_reload_entry))
+
+    cadence = yt_coordinator.cadence
+
+    async def async_startup_sync() -> None:
+        for service_id in await scheduler.async_run_startup():
+            cadence.mark_fetched(service_id, cadence.last_sync_at(service_id))
+
+    async def async_sync(due) -> None:
+        for service_id in await scheduler.async_run_sync(due):
+            cadence.mark_fetched(service_id, due[service_id])
+
+    # Entities are added with their restored state, the network sync runs in
+    # a single background task once Home Assistant has started
+    @callback
+    def start_sync(hass: HomeAssistant) -> None:
+        entry.async_create_background_task(hass, async_startup_sync(), f"{DOMAIN} startup sync")
+
+    entry.async_on_unload(async_at_started(hass, start_sync))
+
+    # After each refresh, only sync the services whose utility published new data
+    @callback
+    def sync_published() -> None:
+        if due := cadence.due_services():
+            entry.async_create_background_task(hass, async_sync(due), f"{DOMAIN} readings sync")
+
+    entry.async_on_unload(yt_coordinator.async_add_listener(sync_published))
     return True
 
 
+async def async_reload_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Reload the config entry when its options change.
+
+    Update listeners are also called when the entry data changes, which
+    happens on every OAuth token refresh, so other updates are ignored.
+    """
+    if entry.options == hass.data[DOMAIN][entry.entry_id]["options"]:
+        return
+    await hass.config_entries.async_reload(entry.entry_id)
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
-    await hass.config_entries.async_unload_platforms(entry, ["sensor"])
+    await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
     hass.data[DOMAIN].pop(entry.entry_id)
+    get_client_pool(hass).async_remove_client(entry.entry_id)
     return True
@@ -0,0 +1,190 @@
+"""Online usage spike and continuous flow (leak) detection over Youtilitics readings."""
+from collections import deque
+from dataclasses import dataclass
+from datetime import timedelta
+from math import sqrt
+from typing import Deque, List, Tuple
+
+from homeassistant.const import UnitOfVolume
+from homeassistant.util import dt as dt_util
+
+from .index import SLOT_SECONDS
+from .models import ReadingSeries
+
+ANOMALY_SPIKE = "spike"
+ANOMALY_LEAK = "leak"
+
+# Smoothing factor of the overall usage level, about half a day of readings
+LEVEL_ALPHA = 0.02
+# Smoothing factor of the hour of day baselines, which get 4 readings a day
+BASELINE_ALPHA = 0.05
+# Days of readings an hour of day baseline needs before spikes are reported
+BASELINE_MIN_DAYS = 7
+# A spike is above its hour of day baseline by this many standard deviations,
+# and by this many times the overall usage level
+SPIKE_SIGMAS = 4.0
+SPIKE_MIN_LEVELS = 2.0
+# A flow that never stops over this window is continuous
+LEAK_WINDOW = timedelta(hours=24)
+# Smoothing factor of the usual minimum flow, sampled once per window
+MIN_FLOW_ALPHA = 0.1
+# A continuous flow is a leak when its minimum is this many times the usual one
+LEAK_MIN_FLOW_RATIO = 2.0
+# Smallest minimum flow per reading considered a leak, for the units checked for leaks
+LEAK_MIN_FLOW = {
+    UnitOfVolume.LITERS: 1.0,
+    UnitOfVolume.CUBIC_METERS: 0.01,
+}
+# Readings further apart than this restart the minimum flow window
+MAX_READING_GAP = timedelta(hours=1)
+
+
+@dataclass(slots=True)
+class Anomaly:
+    """An anomaly found in a reading."""
+    kind: str
+    timestamp: float
+    value: float
+    threshold: float
+
+
+@dataclass(slots=True)
+class _Baseline:
+    """Exponentially weighted mean and variance of a value."""
+    mean: float = 0.0
+    variance: float = 0.0
+    count: int = 0
+
+    def add(self, value: float, alpha: float) -> None:
+        """Add a sample."""
+        if self.count == 0:
+            self.mean = value
+        else:
+            diff = value - self.mean
+            increment = alpha * diff
+            self.mean += increment
+            self.variance = (1 - alpha) * (self.variance + diff * increment)
+        self.count += 1
+
+
+class YoutiliticsAnomalyDetector:
+    """Rolling statistics of a service's readings in one unit, flagging anomalies.
+
+    Every reading is processed once, in O(1):
+
+    - A spike is a reading well above the baseline of its hour of day, an
+      exponentially weighted mean and variance of the readings of that hour.
+    - A leak is a flow that never drops to the usual minimum over
+      LEAK_WINDOW. The minimum over the window is kept with a monotonic
+      queue, and the usual minimum is a moving average of it, frozen
+      during a leak.
+
+    The detector is seeded from the history in one pass, without reporting
+    anything, then fed the new readings as they arrive.
+    """
+
+    def __init__(self, unit: str) -> None:
+        """Initialize the detector."""
+        self.unit = unit
+        self.revision: int | None = None
+        self.last_timestamp: float | None = None
+        self.level = _Baseline()
+        self._baselines = [_Baseline() for _ in range(24)]
+        self._leak_floor = LEAK_MIN_FLOW.get(unit)
+        self._window = int(LEAK_WINDOW.total_seconds() // SLOT_SECONDS)
+        # (position, value) of the readings that can still be the window minimum, increasing
+        self._minimums: Deque[Tuple[int, float]] = deque()
+        self._position = 0
+        self._run_start = 1
+        self._day_start = 0.0
+        self._day_end = 0.0
+        self.min_flow: float | None = None
+        self.usual_min_flow = _Baseline()
+        self.spike: Anomaly | None = None
+        self.last_spike: Anomaly | None = None
+        self.leak_since: float | None = None
+
+    @property
+    def checks_leaks(self) -> bool:
+        """Return whether the unit of the detector is checked for leaks."""
+        return self._leak_floor is not None
+
+    @classmethod
+    def from_history(cls, unit: str, revision: int, readings: ReadingSeries) -> "YoutiliticsAnomalyDetector":
+        """Return a detector seeded with sorted readings, in one pass."""
+        detector = cls(unit)
+        detector.revision = revision
+        detector.add(readings)
+        return detector
+
+    def add(self, readings: ReadingSeries) -> List[Anomaly]:
+        """Process sorted readings newer than the last ones, returning the anomalies found."""
+        anomalies = []
+        readings = readings.with_unit(self.unit)
+        for timestamp, value in zip(readings.timestamps, readings.readings):
+            if self.last_timestamp is not None and timestamp <= self.last_timestamp:
+                continue
+            spike = self._add_reading(timestamp, value)
+            if spike is not None:
+                anomalies.append(spike)
+            if self.leak_since == timestamp:
+                anomalies.append(Anomaly(ANOMALY_LEAK, timestamp, self.min_flow, self._leak_threshold()))
+        return anomalies
+
+    def _hour_of_day(self, timestamp: float) -> int:
+        """Return the local hour of day of a timestamp, the last one covering DST days of 25 hours."""
+        if not self._day_start <= timestamp < self._day_end:
+            day = dt_util.as_local(dt_util.utc_from_timestamp(timestamp)).date()
+            self._day_start = dt_util.start_of_local_day(day).timestamp()
+            self._day_end = dt_util.start_of_local_day(day + timedelta(days=1)).timestamp()
+        return min(int((timestamp - self._day_start) // 3600), 23)
+
+    def _leak_threshold(self) -> float:
+        """Return the minimum flow above which a continuous flow is a leak."""
+        return max(self._leak_floor, LEAK_MIN_FLOW_RATIO * self.usual_min_flow.mean)
+
+    def _add_reading(self, timestamp: float, value: float) -> Anomaly | None:
+        """Update the statistics with a reading, returning it if it is a spike."""
+        gap = self.last_timestamp is not None and timestamp - self.last_timestamp > MAX_READING_GAP.total_seconds()
+        self.last_timestamp = timestamp
+
+        # Spikes, against the baseline of the hour before adding the reading to it
+        baseline = self._baselines[self._hour_of_day(timestamp)]
+        self.spike = None
+        if baseline.count >= BASELINE_MIN_DAYS * 4:
+            threshold = baseline.mean + max(SPIKE_SIGMAS * sqrt(baseline.variance), SPIKE_MIN_LEVELS * self.level.mean)
+            if value > threshold:
+                self.spike = self.last_spike = Anomaly(ANOMALY_SPIKE, timestamp, value, threshold)
+        baseline.add(value, BASELINE_ALPHA)
+        self.level.add(value, LEVEL_ALPHA)
+
+        if self._leak_floor is None:
+            return self.spike
+        # Minimum flow over the window, restarted after a gap in the readings
+        position = self._position = self._position + 1
+        if gap:
+            self._minimums.clear()
+            self._run_start = position
+            self.min_flow = None
+            self.leak_since = None
+        minimums = self._minimums
+        while minimums and minimums[-1][1] >= value:
+            minimums.pop()
+        minimums.append((position, value))
+        if minimums[0][0] <= position - self._window:
+            minimums.popleft()
+        if position - self._run_start + 1 < self._window:
+            return self.spike
+        self.min_flow = minimums[0][1]
+        if self.min_flow > self._leak_threshold():
+            if self.leak_since is None:
+                self.leak_since = timestamp
+        else:
+            self.leak_since = None
+        # The usual minimum does not learn from a leak, or a steady one would become usual.
+        # The first window is always learned, there is nothing to compare it to yet
+        if (position - self._run_start + 1) % self._window == 0 and (
+            self.leak_since is None or not self.usual_min_flow.count
+        ):
+            self.usual_min_flow.add(self.min_flow, MIN_FLOW_ALPHA)
+        return self.spike
@@ -0,0 +1,157 @@
+"""Binary sensor platform for Youtilitics."""
+from typing import List
+
+from homeassistant.components.binary_sensor import BinarySensorDeviceClass, BinarySensorEntity
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import UnitOfVolume
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import entity_platform
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.util import dt as dt_util
+
+from . import DOMAIN, YoutiliticsDataCoordinator
+from .anomaly import LEAK_MIN_FLOW, YoutiliticsAnomalyDetector
+from .entity import YoutiliticsEntity, YoutiliticsEntityReconciler
+from .models import Account, Service
+
+async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry, async_add_entities: AddEntitiesCallback):
+    """Set up binary sensor platform."""
+    coordinator = hass.data[DOMAIN][entry.entry_id]["coordinator"]
+    reconciler = YoutiliticsAnomalyReconciler(
+        hass, entry, coordinator, entity_platform.async_get_current_platform()
+    )
+    async_add_entities(reconciler.async_create_entities())
+    entry.async_on_unload(coordinator.async_add_listener(reconciler.async_reconcile))
+
+class YoutiliticsAnomalyReconciler(YoutiliticsEntityReconciler):
+    """Keep the anomaly binary sensors of a config entry in line with its services."""
+
+    def _create_service_entities(
+        self, account: Account, service: Service, service_type: str, unit: str
+    ) -> List[YoutiliticsEntity]:
+        """Create the anomaly binary sensors of a service, with a leak sensor for water and gas."""
+        name_base = f"{service_type} with {account.utility.name}"
+        service_id_clean = service.id.replace("-", "_")
+        spike_sensor = YoutiliticsSpikeSensor(
+            coordinator=self._coordinator,
+            service_id=service.id,
+            name=f"{name_base} Usage Spike",
+            unit=unit
+        )
+        spike_sensor.entity_id = f"binary_sensor.{DOMAIN}_{service_id_clean}_usage_spike"
+        entities = [spike_sensor]
+        if unit in LEAK_MIN_FLOW:
+            leak_sensor = YoutiliticsLeakSensor(
+                coordinator=self._coordinator,
+                service_id=service.id,
+                name=f"{name_base} Leak",
+                unit=unit
+            )
+            leak_sensor.entity_id = f"binary_sensor.{DOMAIN}_{service_id_clean}_leak"
+            entities.append(leak_sensor)
+        self._entities[service.id] = entities
+        return entities
+
+class YoutiliticsAnomalySensor(YoutiliticsEntity, BinarySensorEntity):
+    """Binary sensor computed by the anomaly detector of a service.
+
+    The detector is seeded from the stored history in the background once the
+    sensor is added, then fed the new readings of every fetch before the
+    sensor is notified.
+    """
+
+    def __init__(self, coordinator: YoutiliticsDataCoordinator, service_id: str, name: str, unit: str):
+        """Initialize the anomaly sensor."""
+        super().__init__(coordinator, service_id)
+        self._unit = unit
+        self._attr_name = name
+
+    @property
+    def _detector(self) -> YoutiliticsAnomalyDetector | None:
+        """Return the anomaly detector of the service, None until it is seeded."""
+        return self._coordinator.readings.get_detector(self._service_id)
+
+    @property
+    def available(self) -> bool:
+        """Return whether the detector of the service is seeded."""
+        return super().available and self._detector is not None
+
+    async def async_added_to_hass(self):
+        """Run when entity is added to Home Assistant."""
+        await super().async_added_to_hass()
+        # Seeding replays the whole stored history, so it does not hold up adding the entities
+        self.async_run_in_background(self._async_track_anomalies(), "anomaly detector seeding")
+
+    async def _async_track_anomalies(self) -> None:
+        """Seed the detector of the service and schedule writing the state."""
+        await self._coordinator.readings.async_track_anomalies(self._service_id, self._unit)
+        self.async_schedule_write()
+
+class YoutiliticsSpikeSensor(YoutiliticsAnomalySensor):
+    """Binary sensor on while the latest reading of a service is well above usual for its hour of day."""
+
+    _attr_device_class = BinarySensorDeviceClass.PROBLEM
+
+    def __init__(self, coordinator: YoutiliticsDataCoordinator, service_id: str, name: str, unit: str):
+        """Initialize the spike sensor."""
+        super().__init__(coordinator, service_id, name, unit)
+        self._attr_unique_id = f"{service_id}_usage_spike"
+
+    @property
+    def icon(self):
+        """Return an icon."""
+        return "mdi:chart-bell-curve-cumulative"
+
+    @property
+    def is_on(self) -> bool | None:
+        """Return whether the latest reading is a spike."""
+        detector = self._detector
+        return None if detector is None else detector.spike is not None
+
+    @property
+    def extra_state_attributes(self):
+        """Return the last spike."""
+        detector = self._detector
+        if detector is None or detector.last_spike is None:
+            return {}
+        spike = detector.last_spike
+        return {
+            "last_spike_at": dt_util.utc_from_timestamp(spike.timestamp).isoformat(),
+            "last_spike_value": spike.value,
+            "last_spike_threshold": round(spike.threshold, 3),
+            "unit": self._unit,
+        }
+
+class YoutiliticsLeakSensor(YoutiliticsAnomalySensor):
+    """Binary sensor on while the flow of a water or gas service has not stopped for a whole day."""
+
+    def __init__(self, coordinator: YoutiliticsDataCoordinator, service_id: str, name: str, unit: str):
+        """Initialize the leak sensor."""
+        super().__init__(coordinator, service_id, name, unit)
+        self._attr_unique_id = f"{service_id}_leak"
+        self._attr_device_class = (
+            BinarySensorDeviceClass.MOISTURE if unit == UnitOfVolume.LITERS else BinarySensorDeviceClass.GAS
+        )
+
+    @property
+    def is_on(self) -> bool | None:
+        """Return whether a continuous flow is going on."""
+        detector = self._detector
+        return None if detector is None else detector.leak_since is not None
+
+    @property
+    def extra_state_attributes(self):
+        """Return the minimum flow over the last day against the usual one."""
+        detector = self._detector
+        if detector is None:
+            return {}
+        return {
+            "leak_since": (
+                None if detector.leak_since is None else dt_util.utc_from_timestamp(detector.leak_since).isoformat()
+            ),
+            "min_flow": detector.min_flow,
+            "usual_min_flow": (
+                round(detector.usual_min_flow.mean, 3) if detector.usual_min_flow.count else None
+            ),
+            "unit": self._unit,
+        }
@@ -1,9 +1,27 @@
 """Config flow for Youtilitics."""
+from collections.abc import Mapping
 import logging
+from typing import Any
 
+import voluptuous as vol
+
+from homeassistant import config_entries
+from homeassistant.core import callback
 from homeassistant.helpers import config_entry_oauth2_flow
 
-from .const import DOMAIN
+from .const import (
+    BACKFILL_MODE_STATES,
+    BACKFILL_MODE_STATISTICS,
+    CONF_BACKFILL_MODE,
+    CONF_BACKFILL_SAMPLE_RATE,
+    CONF_BILLING_DAY,
+    CONF_SYNC_CONCURRENCY,
+    DEFAULT_BACKFILL_MODE,
+    DEFAULT_BACKFILL_SAMPLE_RATE,
+    DEFAULT_BILLING_DAY,
+    DEFAULT_SYNC_CONCURRENCY,
+    DOMAIN,
+)
 
 LOGGER =  logging.getLogger(__name__)
 
@@ -12,11 +30,70 @@ class YoutiliticsConfigFlow(config_entry_oauth2_flow.AbstractOAuth2FlowHandler,
 
     DOMAIN = DOMAIN
 
+    reauth_entry: config_entries.ConfigEntry | None = None
+
     @property
     def logger(self):
         return LOGGER
 
+    async def async_step_reauth(self, entry_data: Mapping[str, Any]):
+        """Start reauthentication once the authorization of an entry was revoked."""
+        self.reauth_entry = self.hass.config_entries.async_get_entry(self.context["entry_id"])
+        return await self.async_step_reauth_confirm()
+
+    async def async_step_reauth_confirm(self, user_input=None):
+        """Ask the user to link the Youtilitics account again."""
+        if user_input is None:
+            return self.async_show_form(step_id="reauth_confirm")
+        return await self.async_step_user()
+
     async def async_oauth_create_entry(self, data):
-        """Create an entry from OAuth2 data."""
+        """Create an entry from OAuth2 data, or update the entry being reauthenticated."""
+        if self.reauth_entry is not None:
+            self.hass.config_entries.async_update_entry(self.reauth_entry, data=data)
+            # Data updates alone do not reload the entry
+            await self.hass.config_entries.async_reload(self.reauth_entry.entry_id)
+            return self.async_abort(reason="reauth_successful")
         LOGGER.info("loading from async_oauth_create_entry")
         return self.async_create_entry(title="Youtilitics", data=data)
+
+    @staticmethod
+    @callback
+    def async_get_options_flow(config_entry):
+        """Get the options flow for this handler."""
+        return YoutiliticsOptionsFlow(config_entry)
+
+class YoutiliticsOptionsFlow(config_entries.OptionsFlow):
+    """Handle Youtilitics options."""
+
+    def __init__(self, config_entry) -> None:
+        """Initialize the options flow."""
+        self._entry = config_entry
+
+    async def async_step_init(self, user_input=None):
+        """Manage the options."""
+        if user_input is not None:
+            return self.async_create_entry(title="", data=user_input)
+
+        options = self._entry.options
+        return self.async_show_form(
+            step_id="init",
+            data_schema=vol.Schema({
+                vol.Required(
+                    CONF_BACKFILL_MODE,
+                    default=options.get(CONF_BACKFILL_MODE, DEFAULT_BACKFILL_MODE),
+                ): vol.In([BACKFILL_MODE_STATISTICS, BACKFILL_MODE_STATES]),
+                vol.Required(
+                    CONF_BACKFILL_SAMPLE_RATE,
+                    default=options.get(CONF_BACKFILL_SAMPLE_RATE, DEFAULT_BACKFILL_SAMPLE_RATE),
+                ): vol.All(vol.Coerce(int), vol.Range(min=1)),
+                vol.Required(
+                    CONF_SYNC_CONCURRENCY,
+                    default=options.get(CONF_SYNC_CONCURRENCY, DEFAULT_SYNC_CONCURRENCY),
+                ): vol.All(vol.Coerce(int), vol.Range(min=1)),
+                vol.Required(
+                    CONF_BILLING_DAY,
+                    default=options.get(CONF_BILLING_DAY, DEFAULT_BILLING_DAY),
+                ): vol.All(vol.Coerce(int), vol.Range(min=1, max=28)),
+            }),
+        )
@@ -9,3 +9,23 @@ TOKEN_URL = BASE_URL + "/token"
 SCOPES = ['email', 'download_data']
 
 LOGGER = logging.getLogger(__package__)
+
+# Fired for each usage spike or leak found in new readings
+EVENT_ANOMALY = f"{DOMAIN}_anomaly"
+
+CONF_BACKFILL_MODE = "backfill_mode"
+BACKFILL_MODE_STATISTICS = "statistics"
+BACKFILL_MODE_STATES = "states"
+DEFAULT_BACKFILL_MODE = BACKFILL_MODE_STATISTICS
+
+# Number of 15-minute readings per state written when replaying history as states
+CONF_BACKFILL_SAMPLE_RATE = "backfill_sample_rate"
+DEFAULT_BACKFILL_SAMPLE_RATE = 4
+
+# Number of services whose readings are synced at the same time
+CONF_SYNC_CONCURRENCY = "sync_concurrency"
+DEFAULT_SYNC_CONCURRENCY = 4
+
+# Day of the month billing periods start on
+CONF_BILLING_DAY = "billing_day"
+DEFAULT_BILLING_DAY = 1
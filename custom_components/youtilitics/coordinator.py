@@ -1,11 +1,396 @@
 """Youtilitics data coordinator."""
+import asyncio
+from bisect import bisect_right
+from collections import Counter
+from dataclasses import asdict, dataclass
+import time
 from datetime import timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
 
-from homeassistant.core import HomeAssistant
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+from homeassistant.util import dt as dt_util
 
-from .const import DOMAIN, LOGGER
-from .youtilitics import YoutiliticsApiClient, YoutiliticsApiError
+from .anomaly import YoutiliticsAnomalyDetector
+from .const import DOMAIN, EVENT_ANOMALY, LOGGER
+from .entity import YoutiliticsStateWriter
+from .index import SLOT_SECONDS
+from .models import Reading, ReadingSeries
+from .profiler import EXECUTOR_MIN_ROWS, PHASE_AGGREGATE, PHASE_SORT, YoutiliticsProfiler
+from .rollups import YoutiliticsRollups
+from .scheduler import DEFAULT_POLL_INTERVAL, MIN_POLL_INTERVAL, YoutiliticsCadenceTracker
+from .store import YoutiliticsReadingsStore
+from .youtilitics import YoutiliticsApiClient, YoutiliticsApiError, YoutiliticsApiUnavailable, get_client_pool
+
+# Fetches for the same service within this window are served from the previous result
+FETCH_REUSE_WINDOW = timedelta(minutes=5)
+# History is fetched in windows of this size, aligned on the epoch so they stay
+# the same across restarts and an interrupted backfill can resume
+HISTORY_WINDOW = timedelta(days=30)
+# Number of history windows of a service fetched at the same time
+HISTORY_WINDOW_CONCURRENCY = 4
+# Utility service types almost never change, refresh them at most this often
+SERVICE_TYPES_TTL = timedelta(hours=24)
+# Missing readings in the stored history are looked for at most this often,
+# and only the most recent gaps are refetched at a time
+GAP_CHECK_INTERVAL = timedelta(days=1)
+MAX_GAPS_PER_CHECK = 50
+# Gaps ending longer ago than this are left alone, utilities do not fill them that late
+GAP_MAX_AGE = timedelta(days=60)
+
+_UNSEEDED = object()
+
+
+@dataclass(frozen=True, slots=True)
+class YoutiliticsServiceSnapshot:
+    """Latest readings fetched for a service, as seen by its entities."""
+    latest: Reading
+    count: int
+    fetched_at: float
+
+
+class YoutiliticsReadingsManager:
+    """Share readings fetches between all the entities of a service.
+
+    Each service gets at most one incremental request per cycle: concurrent
+    callers join the in-flight request, and callers arriving shortly after
+    reuse its result. The cursor is owned here rather than by each entity.
+    Fetched readings are persisted, so only the missing tail is requested.
+    Entities subscribe to the snapshot of the latest fetch of their service
+    instead of inspecting the readings themselves. Services tracked for
+    anomalies have their new readings fed to a detector after each fetch.
+    Each platform holds the services it has entities for, and the data of
+    a service is dropped once the last platform releases it.
+    """
+
+    def __init__(self, hass: HomeAssistant, api: YoutiliticsApiClient) -> None:
+        """Initialize the readings manager."""
+        self.hass = hass
+        self.api = api
+        self.profiler = api.profiler
+        self._cursors: Dict[str, str | None] = {}
+        self._snapshots: Dict[str, YoutiliticsServiceSnapshot] = {}
+        self._listeners: Dict[str, List[Callable[[], None]]] = {}
+        self._in_flight: Dict[Tuple[str, str], asyncio.Future] = {}
+        self._results: Dict[Tuple[str, str], Tuple[float, ReadingSeries]] = {}
+        self._stores: Dict[str, YoutiliticsReadingsStore] = {}
+        self._rollups: Dict[Tuple[str, str], YoutiliticsRollups] = {}
+        self._gaps_checked: Dict[str, float] = {}
+        self._refilled: Dict[str, ReadingSeries] = {}
+        self._detectors: Dict[str, YoutiliticsAnomalyDetector] = {}
+        self._detector_locks: Dict[str, asyncio.Lock] = {}
+        # Number of platforms with entities for each service
+        self._holders: Counter[str] = Counter()
+
+    def seed_cursor(self, service_id: str, last_timestamp: str | None) -> None:
+        """Register a restored cursor, keeping the oldest one so no entity misses data."""
+        current = self._cursors.get(service_id, _UNSEEDED)
+        if current is _UNSEEDED:
+            self._cursors[service_id] = last_timestamp
+        elif current is not None and (
+            last_timestamp is None
+            or dt_util.parse_datetime(last_timestamp) < dt_util.parse_datetime(current)
+        ):
+            self._cursors[service_id] = last_timestamp
+
+    def get_snapshot(self, service_id: str) -> YoutiliticsServiceSnapshot | None:
+        """Return the snapshot of the latest non-empty readings fetched for a service."""
+        return self._snapshots.get(service_id)
+
+    def get_refilled(self, service_id: str) -> ReadingSeries:
+        """Return the readings older than the cursor that the latest fetch of a service refilled.
+
+        They only complete the stored history, the latest reading and the
+        cursor come from the readings returned by async_fetch_latest.
+        """
+        return self._refilled.get(service_id, ReadingSeries())
+
+    @callback
+    def async_add_listener(self, service_id: str, update_callback: Callable[[], None]) -> CALLBACK_TYPE:
+        """Call update_callback when a service gets a new snapshot. Returns a function removing it."""
+        listeners = self._listeners.setdefault(service_id, [])
+        listeners.append(update_callback)
+        return lambda: listeners.remove(update_callback)
+
+    async def async_get_rollups(self, service_id: str, unit: str, billing_day: int) -> YoutiliticsRollups:
+        """Return the usage rollups of a service in a unit, up to date with the stored readings."""
+        store = await self._async_get_store(service_id)
+        rollups = self._rollups.get((service_id, unit))
+        if rollups is None:
+            rollups = self._rollups[service_id, unit] = YoutiliticsRollups(unit, billing_day)
+        with self.profiler.phase(service_id, PHASE_AGGREGATE):
+            rollups.update(store)
+        return rollups
+
+    def get_detector(self, service_id: str) -> YoutiliticsAnomalyDetector | None:
+        """Return the anomaly detector of a service, None until it is seeded."""
+        detector = self._detectors.get(service_id)
+        return detector if detector is not None and detector.revision is not None else None
+
+    async def async_track_anomalies(self, service_id: str, unit: str) -> None:
+        """Detect anomalies in the readings of a service in a unit, seeding the detector from the stored history."""
+        if service_id not in self._detectors:
+            self._detectors[service_id] = YoutiliticsAnomalyDetector(unit)
+        await self._async_update_detector(service_id)
+
+    def anomalies_as_dict(self) -> Dict:
+        """Return the state of the anomaly detectors, for diagnostics."""
+        return {
+            service_id: {
+                "unit": detector.unit,
+                "seeded": detector.revision is not None,
+                "level": detector.level.mean,
+                "min_flow": detector.min_flow,
+                "usual_min_flow": detector.usual_min_flow.mean,
+                "spike": detector.spike is not None,
+                "last_spike": None if detector.last_spike is None else asdict(detector.last_spike),
+                "leak_since": detector.leak_since,
+            }
+            for service_id, detector in self._detectors.items()
+        }
+
+    def untrack_anomalies(self, service_id: str) -> None:
+        """Stop detecting anomalies in the readings of a service."""
+        self._detectors.pop(service_id, None)
+        self._detector_locks.pop(service_id, None)
+
+    def hold_service(self, service_id: str) -> None:
+        """Register a platform creating entities for a service."""
+        self._holders[service_id] += 1
+
+    async def async_release_service(self, service_id: str) -> None:
+        """Unregister a platform that retired the entities of a service.
+
+        Once no platform holds the service, everything held for it is dropped
+        and its stored readings are deleted. Listeners are left to the
+        entities, which remove theirs when they are removed.
+        """
+        self._holders[service_id] -= 1
+        if self._holders[service_id] > 0:
+            return
+        del self._holders[service_id]
+        self._cursors.pop(service_id, None)
+        self._snapshots.pop(service_id, None)
+        for key in [key for key in self._results if key[0] == service_id]:
+            del self._results[key]
+        for key in [key for key in self._rollups if key[0] == service_id]:
+            del self._rollups[key]
+        self._gaps_checked.pop(service_id, None)
+        self._refilled.pop(service_id, None)
+        self.untrack_anomalies(service_id)
+        store = self._stores.pop(service_id, None)
+        if store is None:
+            store = YoutiliticsReadingsStore(self.hass, service_id)
+        await store.async_remove()
+
+    async def _async_update_detector(self, service_id: str) -> None:
+        """Feed the readings stored since the last update to the detector of a service.
+
+        An event is fired for each anomaly found. When the stored history was
+        rewritten (loaded, backfilled or refilled), the detector is seeded
+        again from all of it in one pass, without firing events.
+        """
+        if service_id not in self._detectors:
+            return
+        async with self._detector_locks.setdefault(service_id, asyncio.Lock()):
+            store = await self._async_get_store(service_id)
+            detector = self._detectors.get(service_id)
+            if detector is None:
+                return
+            readings = store.readings
+            if detector.revision != store.revision:
+                seeded = await self.profiler.async_run_stage(
+                    self.hass, service_id, PHASE_AGGREGATE, len(readings) < EXECUTOR_MIN_ROWS,
+                    YoutiliticsAnomalyDetector.from_history, detector.unit, store.revision, readings,
+                )
+                # The service may have been removed while the detector was seeded
+                if self._detectors.get(service_id) is detector:
+                    self._detectors[service_id] = seeded
+                return
+            with self.profiler.phase(service_id, PHASE_AGGREGATE):
+                if detector.last_timestamp is not None:
+                    readings = readings.after(detector.last_timestamp)
+                anomalies = detector.add(readings)
+        for anomaly in anomalies:
+            LOGGER.info("Detected a usage %s on service %s: %s", anomaly.kind, service_id, anomaly)
+            self.hass.bus.async_fire(EVENT_ANOMALY, {
+                "service_id": service_id,
+                "type": anomaly.kind,
+                "timestamp": dt_util.utc_from_timestamp(anomaly.timestamp).isoformat(),
+                "value": anomaly.value,
+                "threshold": anomaly.threshold,
+                "unit": detector.unit,
+            })
+
+    async def async_fetch_latest(self, service_id: str) -> ReadingSeries:
+        """Fetch readings newer than the shared cursor of a service."""
+        return await self._async_coalesce(
+            (service_id, "latest"), lambda: self._async_fetch_latest(service_id)
+        )
+
+    async def async_fetch_history(self, service_id: str) -> ReadingSeries:
+        """Fetch the full history of a service."""
+        return await self._async_coalesce(
+            (service_id, "history"), lambda: self._async_fetch_history(service_id)
+        )
+
+    async def _async_get_store(self, service_id: str) -> YoutiliticsReadingsStore:
+        """Return the loaded readings store of a service."""
+        store = self._stores.get(service_id)
+        if store is None:
+            store = self._stores[service_id] = YoutiliticsReadingsStore(self.hass, service_id)
+        await store.async_load()
+        return store
+
+    async def _async_fetch_tail(self, service_id: str, since: str | None) -> ReadingSeries:
+        """Fetch readings newer than since, sorted by timestamp."""
+        readings = await self.api.get_bulk_readings(service_id, since)
+        return await self._async_sorted(service_id, readings)
+
+    async def _async_sorted(self, service_id: str, readings: ReadingSeries) -> ReadingSeries:
+        """Return readings sorted by timestamp, sorting large series in the executor."""
+        return await self.profiler.async_run_stage(
+            self.hass, service_id, PHASE_SORT, len(readings) < EXECUTOR_MIN_ROWS, readings.sorted
+        )
+
+    async def _async_fetch_latest(self, service_id: str) -> ReadingSeries:
+        """Fetch the tail missing from the store and return the readings after the cursor.
+
+        Readings refilling gaps before the cursor are kept aside for get_refilled.
+        """
+        cursor = self._cursors.get(service_id)
+        if cursor is None:
+            self._refilled.pop(service_id, None)
+            return await self._async_fetch_history(service_id)
+        store = await self._async_get_store(service_id)
+        tail = await self._async_fetch_tail(service_id, store.last_timestamp or cursor)
+        with self.profiler.phase(service_id, PHASE_AGGREGATE):
+            store.async_extend(tail)
+        filled = await self._async_fill_gaps(service_id, store)
+        self._refilled[service_id] = filled[:bisect_right(filled.timestamps, dt_util.parse_datetime(cursor).timestamp())]
+        return store.readings_after(cursor)
+
+    async def _async_fetch_history(self, service_id: str) -> ReadingSeries:
+        """Return the full history, only fetching what the store does not already hold."""
+        store = await self._async_get_store(service_id)
+        if store.complete:
+            tail = await self._async_fetch_tail(service_id, store.last_timestamp)
+            with self.profiler.phase(service_id, PHASE_AGGREGATE):
+                store.async_extend(tail)
+        else:
+            await self._async_fetch_history_windows(service_id, store)
+        await self._async_fill_gaps(service_id, store)
+        return store.readings
+
+    async def _async_fill_gaps(self, service_id: str, store: YoutiliticsReadingsStore) -> ReadingSeries:
+        """Refetch only the runs of readings missing from a complete history.
+
+        Gaps older than GAP_MAX_AGE are left alone. A gap the API returns
+        nothing for is retried after a delay doubling with each attempt.
+        Returns the readings that filled gaps, sorted by timestamp.
+        """
+        checked = self._gaps_checked.get(service_id)
+        if not store.complete or (
+            checked is not None and time.monotonic() - checked < GAP_CHECK_INTERVAL.total_seconds()
+        ):
+            return ReadingSeries()
+        self._gaps_checked[service_id] = time.monotonic()
+        now = dt_util.utcnow().timestamp()
+        recent = [gap for gap in store.find_gaps() if gap[1] >= now - GAP_MAX_AGE.total_seconds()]
+        # Only the gaps still missing are kept, those partly filled since show up as new ones
+        empty_gaps = {gap: store.empty_gaps[gap] for gap in recent if gap in store.empty_gaps}
+        gaps = [gap for gap in recent if gap not in empty_gaps or empty_gaps[gap][1] <= now][-MAX_GAPS_PER_CHECK:]
+        if not gaps:
+            store.async_set_empty_gaps(empty_gaps)
+            return ReadingSeries()
+        LOGGER.info("Refetching %d gaps in the history of %s", len(gaps), service_id)
+
+        semaphore = asyncio.Semaphore(HISTORY_WINDOW_CONCURRENCY)
+
+        async def fetch_gap(first: float, last: float) -> ReadingSeries:
+            async with semaphore:
+                since = dt_util.utc_from_timestamp(first - SLOT_SECONDS).isoformat()
+                return await self.api.get_readings_window(service_id, since, last)
+
+        filled = ReadingSeries()
+        for gap, readings in zip(gaps, await asyncio.gather(*(fetch_gap(first, last) for first, last in gaps))):
+            with self.profiler.phase(service_id, PHASE_AGGREGATE):
+                merged = store.async_merge(readings)
+            if merged:
+                filled.extend(merged)
+                empty_gaps.pop(gap, None)
+            else:
+                attempts = empty_gaps.get(gap, (0, 0.0))[0] + 1
+                empty_gaps[gap] = (attempts, now + GAP_CHECK_INTERVAL.total_seconds() * 2 ** attempts)
+        store.async_set_empty_gaps(empty_gaps)
+        LOGGER.debug("Filled %d missing readings of %s", len(filled), service_id)
+        return await self._async_sorted(service_id, filled)
+
+    async def _async_fetch_history_windows(self, service_id: str, store: YoutiliticsReadingsStore) -> None:
+        """Fetch the history in windows, checkpointing each one in the store as it completes."""
+        first = await self.api.get_first_reading_timestamp(service_id)
+        if first is None:
+            store.async_finish_history()
+            return
+
+        size = HISTORY_WINDOW.total_seconds()
+        boundaries = [None]
+        boundary = (first // size + 1) * size
+        while boundary < dt_util.utcnow().timestamp():
+            boundaries.append(boundary)
+            boundary += size
+        windows = list(zip(boundaries, boundaries[1:] + [None]))
+        pending = [window for window in windows if window not in store.windows]
+        LOGGER.info(
+            "Fetching history of %s in %d windows (%d already stored)",
+            service_id, len(windows), len(windows) - len(pending),
+        )
+
+        semaphore = asyncio.Semaphore(HISTORY_WINDOW_CONCURRENCY)
+
+        async def fetch_window(start: float | None, end: float | None) -> None:
+            async with semaphore:
+                since = None if start is None else dt_util.utc_from_timestamp(start).isoformat()
+                readings = await self.api.get_readings_window(service_id, since, end)
+            store.async_add_window(start, end, await self._async_sorted(service_id, readings))
+
+        await asyncio.gather(*(fetch_window(start, end) for start, end in pending))
+        store.async_finish_history()
+
+    async def _async_coalesce(
+        self, key: Tuple[str, str], fetch: Callable[[], Awaitable[ReadingSeries]]
+    ) -> ReadingSeries:
+        """Run fetch once for all callers of the same key."""
+        cached = self._results.get(key)
+        if cached is not None and time.monotonic() - cached[0] < FETCH_REUSE_WINDOW.total_seconds():
+            return cached[1]
+
+        future = self._in_flight.get(key)
+        if future is None:
+            future = self.hass.async_create_task(self._async_fetch(key, fetch))
+            self._in_flight[key] = future
+        return await asyncio.shield(future)
+
+    async def _async_fetch(
+        self, key: Tuple[str, str], fetch: Callable[[], Awaitable[ReadingSeries]]
+    ) -> ReadingSeries:
+        """Fetch and record readings, then advance the cursor."""
+        service_id = key[0]
+        try:
+            readings = await fetch()
+        finally:
+            self._in_flight.pop(key, None)
+        self._results[key] = (time.monotonic(), readings)
+        await self._async_update_detector(service_id)
+        if readings:
+            self._snapshots[service_id] = YoutiliticsServiceSnapshot(readings[-1], len(readings), time.time())
+            for listener in list(self._listeners.get(service_id, [])):
+                listener()
+            latest = readings.timestamps[-1]
+            cursor = self._cursors.get(service_id)
+            if cursor is None or latest > dt_util.parse_datetime(cursor).timestamp():
+                self._cursors[service_id] = dt_util.utc_from_timestamp(latest).isoformat()
+        return readings
 
 
 class YoutiliticsDataCoordinator(DataUpdateCoordinator):
@@ -13,23 +398,61 @@ class YoutiliticsDataCoordinator(DataUpdateCoordinator):
 
     def __init__(self, hass: HomeAssistant, entry, implementation) -> None:
         """Initialize the coordinator."""
-        self.api = YoutiliticsApiClient(hass, entry, implementation)
+        self.profiler = YoutiliticsProfiler()
+        self.state_writer = YoutiliticsStateWriter(self.profiler)
+        self.api = get_client_pool(hass).async_create_client(entry, implementation, self.profiler)
+        self.readings = YoutiliticsReadingsManager(hass, self.api)
+        self.cadence = YoutiliticsCadenceTracker()
+        # Duration in seconds of the last request to each endpoint
+        self.endpoint_timings: Dict[str, float] = {}
+        self._service_types = None
+        self._service_types_fetched_at = 0.0
 
         LOGGER.info("starting data coordinator")
         super().__init__(
             hass,
             name=DOMAIN,
             logger=LOGGER,
-            update_interval=timedelta(hours=2),
+            update_interval=DEFAULT_POLL_INTERVAL,
         )
 
     async def _async_update_data(self):
         """Fetch data from API."""
         self.logger.info("coordinator: async update data")
         try:
-            return {'services': await self.api.services(), 'service_types': await self.api.service_types()}
+            services, service_types = await asyncio.gather(
+                self._async_timed("services", self.api.services()),
+                self._async_service_types(),
+            )
+        except YoutiliticsApiUnavailable as err:
+            # Pause polling until the API is expected back rather than piling failures
+            self.update_interval = max(timedelta(seconds=err.retry_in), MIN_POLL_INTERVAL)
+            raise UpdateFailed(str(err)) from err
         except YoutiliticsApiError as err:
             raise UpdateFailed(f"Error communicating with API: {err}") from err
+        self.cadence.observe(service for account in services for service in account.services)
+        self.update_interval = self.cadence.next_poll_interval()
+        self.logger.debug("coordinator: next refresh in %s", self.update_interval)
+        return {'services': services, 'service_types': service_types}
+
+    async def _async_service_types(self):
+        """Return the service types, only fetching them once their TTL expired."""
+        if (
+            self._service_types is None
+            or time.monotonic() - self._service_types_fetched_at >= SERVICE_TYPES_TTL.total_seconds()
+        ):
+            self._service_types = await self._async_timed("service_types", self.api.service_types())
+            self._service_types_fetched_at = time.monotonic()
+        return self._service_types
+
+    async def _async_timed(self, endpoint: str, request: Awaitable[Any]) -> Any:
+        """Await an API request and record how long it took."""
+        start = time.monotonic()
+        try:
+            return await request
+        finally:
+            self.endpoint_timings[endpoint] = elapsed = time.monotonic() - start
+            self.logger.debug("coordinator: %s took %.3f seconds", endpoint, elapsed)
 
     def _async_refresh_finished(self) -> None:
         super()._async_refresh_finished()
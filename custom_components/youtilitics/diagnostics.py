@@ -0,0 +1,29 @@
+"""Diagnostics support for Youtilitics."""
+from typing import Any, Dict
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN
+from .youtilitics import get_client_pool
+
+
+async def async_get_config_entry_diagnostics(hass: HomeAssistant, entry: ConfigEntry) -> Dict[str, Any]:
+    """Return the request and sync timings of a config entry."""
+    coordinator = hass.data[DOMAIN][entry.entry_id]["coordinator"]
+    return {
+        "options": dict(entry.options),
+        "update_interval": str(coordinator.update_interval),
+        "last_update_success": coordinator.last_update_success,
+        "endpoint_timings": coordinator.endpoint_timings,
+        "http_cache": coordinator.api.cache_stats,
+        "api_retry_in": coordinator.api.policy.breaker.retry_in(),
+        "api_clients": len(get_client_pool(hass).clients),
+        "token_refreshes": coordinator.api.oauth_session.refreshes,
+        "state_writes": {
+            "written": coordinator.state_writer.writes,
+            "skipped": coordinator.state_writer.skipped,
+        },
+        "anomalies": coordinator.readings.anomalies_as_dict(),
+        "profile": coordinator.profiler.as_dict(),
+    }
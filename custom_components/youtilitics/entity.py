@@ -0,0 +1,304 @@
+"""Base entity and coalesced state writes for Youtilitics."""
+from abc import ABC, abstractmethod
+import asyncio
+from collections import Counter
+from contextlib import contextmanager
+import logging
+from typing import TYPE_CHECKING, Any, Coroutine, Dict, Iterator, List, Set, Tuple
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import UnitOfEnergy, UnitOfVolume
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers import entity_platform, entity_registry as er
+from homeassistant.helpers.entity import Entity
+
+from .const import DOMAIN
+from .models import Account, Service, ServiceType
+from .profiler import PHASE_WRITE, YoutiliticsProfiler
+
+if TYPE_CHECKING:
+    from .coordinator import YoutiliticsDataCoordinator
+
+_LOGGER = logging.getLogger(__name__)
+
+# A service missing from this many successful refreshes in a row is removed,
+# its entities are unavailable until then
+RETIRE_AFTER_REFRESHES = 3
+
+
+class YoutiliticsStateWriter:
+    """Coalesce the state writes of the entities, only writing actual changes.
+
+    Entities schedule a write instead of writing right away. While a service
+    syncs, the writes of its entities are held, then flushed together in a
+    single loop iteration when the sync ends. Writes scheduled outside a sync
+    are flushed on the next loop iteration.
+    """
+
+    def __init__(self, profiler: YoutiliticsProfiler | None = None) -> None:
+        """Initialize the state writer."""
+        self._profiler = profiler or YoutiliticsProfiler()
+        self._pending: Dict[str, Set["YoutiliticsEntity"]] = {}
+        self._syncing: Counter[str] = Counter()
+        self._handle: asyncio.Handle | None = None
+        self._written: Dict["YoutiliticsEntity", Tuple[Any, ...]] = {}
+        self.writes = 0
+        self.skipped = 0
+
+    @contextmanager
+    def async_hold(self, service_id: str) -> Iterator[None]:
+        """Hold the writes of a service's entities until the block ends."""
+        self._syncing[service_id] += 1
+        try:
+            yield
+        finally:
+            self._syncing[service_id] -= 1
+            if not self._syncing[service_id]:
+                del self._syncing[service_id]
+                self._async_flush(service_id)
+
+    @callback
+    def async_schedule(self, entity: "YoutiliticsEntity") -> None:
+        """Schedule writing the state of an entity."""
+        self._pending.setdefault(entity.service_id, set()).add(entity)
+        if entity.service_id not in self._syncing and self._handle is None:
+            self._handle = asyncio.get_running_loop().call_soon(self._async_flush_idle)
+
+    @callback
+    def async_invalidate(self, entity: "YoutiliticsEntity") -> None:
+        """Forget the last state written for an entity, which was written around the writer."""
+        self._written.pop(entity, None)
+
+    @callback
+    def async_forget(self, entity: "YoutiliticsEntity") -> None:
+        """Drop the pending write and the last written state of a removed entity."""
+        self._pending.get(entity.service_id, set()).discard(entity)
+        self._written.pop(entity, None)
+
+    @callback
+    def _async_flush_idle(self) -> None:
+        """Flush the writes of the services not syncing."""
+        self._handle = None
+        for service_id in [service_id for service_id in self._pending if service_id not in self._syncing]:
+            self._async_flush(service_id)
+
+    @callback
+    def _async_flush(self, service_id: str) -> None:
+        """Write the pending states of a service's entities that changed."""
+        entities = self._pending.pop(service_id, None)
+        if not entities:
+            return
+        with self._profiler.phase(service_id, PHASE_WRITE):
+            for entity in entities:
+                if entity.hass is None:
+                    continue
+                fingerprint = entity.state_fingerprint()
+                if self._written.get(entity) == fingerprint:
+                    self.skipped += 1
+                    continue
+                self._written[entity] = fingerprint
+                self.writes += 1
+                entity.async_write_ha_state()
+
+
+class YoutiliticsEntity(Entity):
+    """Entity of a Youtilitics service, written through the state writer.
+
+    Like a coordinator entity it is never polled: it is updated by the sync
+    of its service and listens to the snapshots of the readings fetched for
+    it, computing its state from precomputed fields.
+    """
+
+    _attr_should_poll = False
+
+    def __init__(self, coordinator: "YoutiliticsDataCoordinator", service_id: str) -> None:
+        """Initialize the entity."""
+        super().__init__()
+        self._coordinator = coordinator
+        self._service_id = service_id
+        self._service_missing = False
+
+    @property
+    def service_id(self) -> str:
+        """Return the id of the service of the entity."""
+        return self._service_id
+
+    @property
+    def available(self) -> bool:
+        """Return whether the entity is available, never while its service is missing."""
+        return super().available and not self._service_missing
+
+    @callback
+    def async_set_service_missing(self, missing: bool) -> None:
+        """Mark the service of the entity as missing from the accounts, or back."""
+        if missing != self._service_missing:
+            self._service_missing = missing
+            self.async_schedule_write()
+
+    @property
+    def _writer(self) -> YoutiliticsStateWriter:
+        """Return the state writer of the entity's config entry."""
+        return self._coordinator.state_writer
+
+    async def async_added_to_hass(self) -> None:
+        """Run when entity is added to Home Assistant."""
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            self._coordinator.readings.async_add_listener(self._service_id, self._async_handle_snapshot)
+        )
+
+    @callback
+    def _async_handle_snapshot(self) -> None:
+        """Handle a new snapshot of the readings of the service."""
+        self.async_schedule_write()
+
+    @callback
+    def async_run_in_background(self, target: Coroutine[Any, Any, None], name: str) -> None:
+        """Run work of the entity without holding up its setup, cancelled when its entry unloads."""
+        self.platform.config_entry.async_create_background_task(self.hass, target, f"{self.entity_id} {name}")
+
+    @callback
+    def async_schedule_write(self) -> None:
+        """Schedule writing the state, skipped if it did not change."""
+        self._writer.async_schedule(self)
+
+    def state_fingerprint(self) -> Tuple[Any, ...]:
+        """Return what the state written by async_write_ha_state is made of."""
+        return (self.available, self.state, self.state_attributes, self.extra_state_attributes)
+
+    async def async_will_remove_from_hass(self) -> None:
+        """Run when entity will be removed from Home Assistant."""
+        await super().async_will_remove_from_hass()
+        self._writer.async_forget(self)
+
+
+class YoutiliticsEntityReconciler(ABC):
+    """Keep the entities of a platform in line with the services of the accounts of a config entry.
+
+    Entities are created for new services after each coordinator refresh.
+    Services missing from a refresh have their entities unavailable, and are
+    retired once missing from RETIRE_AFTER_REFRESHES refreshes in a row, so a
+    service briefly left out by the API keeps its entities and their
+    customizations. The readings manager is told which services the platform
+    holds, and drops their data once no platform holds them anymore. Platforms create the entities of a
+    service in _create_service_entities. Unchanged services keep their
+    entities and sync state, so a change costs O(changed services).
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        entry: ConfigEntry,
+        coordinator: "YoutiliticsDataCoordinator",
+        platform: entity_platform.EntityPlatform,
+    ) -> None:
+        """Initialize the reconciler."""
+        self.hass = hass
+        self._entry = entry
+        self._coordinator = coordinator
+        self._platform = platform
+        # Entities of each service with entities, in the order they were created
+        self._entities: Dict[str, List[YoutiliticsEntity]] = {}
+        # Services already reported as unsupported, so each refresh does not warn again
+        self._unsupported: Set[str] = set()
+        # Number of successful refreshes in a row each service with entities was missing from
+        self._missing: Counter[str] = Counter()
+
+    def _supported_services(self) -> Dict[str, Tuple[Account, Service, str, str]]:
+        """Return the account, service, type name and unit of every supported service, by id."""
+        service_types: ServiceType = self._coordinator.data['service_types']
+        # Create reverse mapping for service type IDs to names
+        type_map = {
+            service_types.electricity: "Electricity",
+            service_types.gas: "Gas",
+            service_types.water: "Water"
+        }
+        services = {}
+        for account in self._coordinator.data['services']:
+            for service in account.services:
+                service_type = type_map.get(service.type)
+                if not service_type:
+                    if service.id not in self._unsupported:
+                        self._unsupported.add(service.id)
+                        _LOGGER.warning(f"Unknown service type ID {service.type} for service {service.id}")
+                    continue
+                if service_type == "Electricity":
+                    unit = UnitOfEnergy.KILO_WATT_HOUR
+                elif service_type == "Gas":
+                    unit = UnitOfVolume.CUBIC_METERS
+                elif service_type == "Water":
+                    unit = UnitOfVolume.LITERS
+                else:
+                    _LOGGER.debug(f"Skipping unsupported service type {service_type} for service {service.id}")
+                    continue
+                services[service.id] = (account, service, service_type, unit)
+        return services
+
+    @callback
+    def async_create_entities(self) -> List[YoutiliticsEntity]:
+        """Create the entities of the services without any."""
+        entities = []
+        for service_id, (account, service, service_type, unit) in self._supported_services().items():
+            if service_id not in self._entities:
+                self._coordinator.readings.hold_service(service_id)
+                entities.extend(self._create_service_entities(account, service, service_type, unit))
+        return entities
+
+    @callback
+    def async_reconcile(self) -> None:
+        """Add the entities of new services and retire those of removed services."""
+        if not self._coordinator.last_update_success:
+            # A failed refresh says nothing about the services
+            return
+        services = self._supported_services()
+        for service_id in [service_id for service_id in self._missing if service_id in services]:
+            _LOGGER.info(f"Service {service_id} is back")
+            del self._missing[service_id]
+            for entity in self._entities[service_id]:
+                entity.async_set_service_missing(False)
+        retired = []
+        for service_id in self._entities.keys() - services.keys():
+            self._missing[service_id] += 1
+            if self._missing[service_id] < RETIRE_AFTER_REFRESHES:
+                _LOGGER.info(f"Service {service_id} is missing, its entities are unavailable")
+                for entity in self._entities[service_id]:
+                    entity.async_set_service_missing(True)
+                continue
+            _LOGGER.info(f"Service {service_id} was removed, retiring its entities")
+            del self._missing[service_id]
+            self._async_service_removed(service_id)
+            retired.extend(self._entities.pop(service_id))
+        added = self.async_create_entities()
+        if added or retired:
+            self._entry.async_create_background_task(
+                self.hass, self._async_apply(added, retired), f"{DOMAIN} entity reconciliation"
+            )
+
+    async def _async_apply(self, added: List[YoutiliticsEntity], retired: List[YoutiliticsEntity]) -> None:
+        """Remove the retired entities and release their services, then add the new ones."""
+        registry = er.async_get(self.hass)
+        for entity in retired:
+            if entity.registry_entry is not None:
+                # Removing the registry entry removes the entity as well
+                registry.async_remove(entity.entity_id)
+            elif entity.hass is not None:
+                await entity.async_remove(force_remove=True)
+        for service_id in {entity.service_id for entity in retired}:
+            await self._coordinator.readings.async_release_service(service_id)
+        if not added:
+            return
+        await self._platform.async_add_entities(added)
+        await self._async_services_added({entity.service_id for entity in added})
+
+    @abstractmethod
+    def _create_service_entities(
+        self, account: Account, service: Service, service_type: str, unit: str
+    ) -> List[YoutiliticsEntity]:
+        """Create the entities of a service."""
+
+    @callback
+    def _async_service_removed(self, service_id: str) -> None:
+        """Release what the platform holds for a removed service, before its entities are retired."""
+
+    async def _async_services_added(self, service_ids: Set[str]) -> None:
+        """Run once the entities of new services are added."""
@@ -0,0 +1,85 @@
+"""Reading slot index for Youtilitics services."""
+from typing import Dict, Iterable, List, Tuple
+
+# Readings cover 15-minute slots
+SLOT_SECONDS = 900
+SLOTS_PER_DAY = 96
+_FULL_DAY = (1 << SLOTS_PER_DAY) - 1
+
+
+class ReadingIndex:
+    """Set of the 15-minute slots holding a reading, as one bitmap per UTC day.
+
+    A day costs a single integer however many of its slots are set, which
+    keeps years of history small enough to persist and to scan for gaps.
+    """
+
+    def __init__(self) -> None:
+        """Initialize an empty index."""
+        self._days: Dict[int, int] = {}
+
+    @classmethod
+    def from_timestamps(cls, timestamps: Iterable[float]) -> 'ReadingIndex':
+        """Create the index of epoch timestamps."""
+        index = cls()
+        for timestamp in timestamps:
+            index.add(timestamp)
+        return index
+
+    def add(self, timestamp: float) -> bool:
+        """Set the slot of an epoch timestamp. Returns False if it was already set."""
+        day, slot = divmod(int(timestamp // SLOT_SECONDS), SLOTS_PER_DAY)
+        mask = self._days.get(day, 0)
+        bit = 1 << slot
+        if mask & bit:
+            return False
+        self._days[day] = mask | bit
+        return True
+
+    def __contains__(self, timestamp: float) -> bool:
+        """Return whether the slot of an epoch timestamp is set."""
+        day, slot = divmod(int(timestamp // SLOT_SECONDS), SLOTS_PER_DAY)
+        return bool(self._days.get(day, 0) >> slot & 1)
+
+    def __len__(self) -> int:
+        """Return the number of slots set."""
+        return sum(mask.bit_count() for mask in self._days.values())
+
+    def missing(self, start: float, end: float, step: int = 1) -> List[Tuple[float, float]]:
+        """Return the runs of unset slots between two epoch timestamps, both included.
+
+        Only every step-th slot from start is expected, for services reporting
+        at a coarser resolution. Runs are (first, last) slot timestamps.
+        """
+        gaps: List[Tuple[float, float]] = []
+        first = int(start // SLOT_SECONDS)
+        last = int(end // SLOT_SECONDS)
+        gap_start = None
+        slot = first
+        while slot <= last:
+            day, bit = divmod(slot, SLOTS_PER_DAY)
+            mask = self._days.get(day, 0)
+            if step == 1 and bit == 0 and mask == _FULL_DAY and gap_start is None:
+                slot += SLOTS_PER_DAY
+                continue
+            if mask >> bit & 1:
+                if gap_start is not None:
+                    gaps.append((gap_start * SLOT_SECONDS, (slot - step) * SLOT_SECONDS))
+                    gap_start = None
+            elif gap_start is None:
+                gap_start = slot
+            slot += step
+        if gap_start is not None:
+            gaps.append((gap_start * SLOT_SECONDS, (slot - step) * SLOT_SECONDS))
+        return gaps
+
+    def as_dict(self) -> Dict[str, str]:
+        """Return a JSON serializable representation, masks in hex as they exceed 64 bits."""
+        return {str(day): format(mask, "x") for day, mask in self._days.items()}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, str]) -> 'ReadingIndex':
+        """Create from as_dict output."""
+        index = cls()
+        index._days = {int(day): int(mask, 16) for day, mask in data.items()}
+        return index
@@ -1,7 +1,10 @@
 """Data classes for Youtilitics API responses."""
+from array import array
+from bisect import bisect_right
 from dataclasses import dataclass
-from datetime import datetime
-from typing import List, Optional, Dict
+from datetime import datetime, timedelta
+from operator import itemgetter
+from typing import Iterable, Iterator, List, Optional, Dict, Tuple
 from homeassistant.util import dt as dt_util
 
 @dataclass
@@ -92,6 +95,10 @@ class Account:
             updated_at=dt_util.parse_datetime(data["updated_at"]) if data.get("updated_at") else None
         )
 
+def _convert_to_cubic_meters(unit: str, raw_unit: str) -> bool:
+    """Return whether readings in this unit pair are liters of gas to report in m³."""
+    return unit == "L" and raw_unit.lower() == 'therm'
+
 @dataclass
 class Reading:
     """Represents a meter reading for a 15-minute interval."""
@@ -106,7 +113,7 @@ class Reading:
     @classmethod
     def from_dict(cls, data: Dict) -> 'Reading':
         """Create from API response."""
-        convert_to_cubic_meters = data["unit"] == "L" and data["raw_unit"].lower() == 'therm'
+        convert_to_cubic_meters = _convert_to_cubic_meters(data["unit"], data["raw_unit"])
         return cls(
             id=data["id"],
             timestamp=dt_util.parse_datetime(data["timestamp"]),
@@ -115,4 +122,236 @@ class Reading:
             raw_reading=data["raw_reading"],
             raw_unit=data["raw_unit"],
             cost=data["cost"]
-        )
\ No newline at end of file
+        )
+
+def _parse_timestamp(value: str) -> float:
+    """Return the epoch seconds of an ISO 8601 timestamp.
+
+    datetime.fromisoformat handles the fixed layout of the API in C, other
+    layouts fall back to dt_util.parse_datetime.
+    """
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        return dt_util.parse_datetime(value).timestamp()
+
+class ReadingSeries:
+    """Columnar series of readings, stored in typed arrays.
+
+    Timestamps are UTC epoch seconds. Each distinct (unit, raw_unit) pair is
+    stored once per series and rows refer to it by index. Indexing or
+    iterating yields Reading objects, built on demand.
+    """
+
+    __slots__ = ("ids", "timestamps", "readings", "raw_readings", "costs", "unit_pairs", "unit_index")
+
+    def __init__(self) -> None:
+        """Initialize an empty series."""
+        self.ids = array("q")
+        self.timestamps = array("d")
+        self.readings = array("d")
+        self.raw_readings = array("d")
+        self.costs = array("d")
+        self.unit_pairs: List[Tuple[str, str]] = []
+        self.unit_index = array("H")
+
+    @classmethod
+    def from_readings(cls, readings: Iterable[Reading]) -> 'ReadingSeries':
+        """Create from Reading objects."""
+        series = cls()
+        for reading in readings:
+            series.append(reading)
+        return series
+
+    @classmethod
+    def from_dicts(cls, items: List[Dict]) -> 'ReadingSeries':
+        """Create from raw API readings, with the same values as Reading.from_dict.
+
+        Columns are extracted in one pass each, the unit conversion is
+        resolved once per unit pair and only the converted rows are scaled.
+        """
+        series = cls()
+        series.ids = array("q", map(itemgetter("id"), items))
+        series.timestamps = array("d", map(_parse_timestamp, map(itemgetter("timestamp"), items)))
+        series.readings = array("d", map(itemgetter("reading"), items))
+        series.raw_readings = array("d", map(itemgetter("raw_reading"), items))
+        series.costs = array("d", map(itemgetter("cost"), items))
+
+        pairs = list(map(itemgetter("unit", "raw_unit"), items))
+        codes: Dict[Tuple[str, str], int] = {}
+        converted = set()
+        for pair in dict.fromkeys(pairs):
+            unit, raw_unit = pair
+            if _convert_to_cubic_meters(unit, raw_unit):
+                codes[pair] = series._unit_code(('m³', raw_unit))
+                converted.add(codes[pair])
+            else:
+                codes[pair] = series._unit_code(pair)
+        series.unit_index = array("H", map(codes.__getitem__, pairs))
+
+        if converted:
+            readings = series.readings
+            for index, code in enumerate(series.unit_index):
+                if code in converted:
+                    readings[index] = items[index]["reading"] / 1000
+        return series
+
+    def append(self, reading: Reading) -> None:
+        """Append a reading."""
+        self.ids.append(reading.id)
+        self.timestamps.append(reading.timestamp.timestamp())
+        self.readings.append(reading.reading)
+        self.raw_readings.append(reading.raw_reading)
+        self.costs.append(reading.cost)
+        self.unit_index.append(self._unit_code((reading.unit, reading.raw_unit)))
+
+    def _unit_code(self, pair: Tuple[str, str]) -> int:
+        """Return the index of a unit pair, interning it if needed."""
+        try:
+            return self.unit_pairs.index(pair)
+        except ValueError:
+            self.unit_pairs.append(pair)
+            return len(self.unit_pairs) - 1
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __getitem__(self, index):
+        """Return a Reading view of a row, or a new series for a slice."""
+        if isinstance(index, slice):
+            series = ReadingSeries()
+            series.ids = self.ids[index]
+            series.timestamps = self.timestamps[index]
+            series.readings = self.readings[index]
+            series.raw_readings = self.raw_readings[index]
+            series.costs = self.costs[index]
+            series.unit_pairs = list(self.unit_pairs)
+            series.unit_index = self.unit_index[index]
+            return series
+        unit, raw_unit = self.unit_pairs[self.unit_index[index]]
+        return Reading(
+            id=self.ids[index],
+            timestamp=dt_util.utc_from_timestamp(self.timestamps[index]),
+            reading=self.readings[index],
+            unit=unit,
+            raw_reading=self.raw_readings[index],
+            raw_unit=raw_unit,
+            cost=self.costs[index]
+        )
+
+    def __iter__(self) -> Iterator[Reading]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def __add__(self, other: 'ReadingSeries') -> 'ReadingSeries':
+        """Concatenate two series."""
+        series = self[:]
+        series.extend(other)
+        return series
+
+    def extend(self, other: 'ReadingSeries') -> None:
+        """Append the rows of another series in place."""
+        self.ids.extend(other.ids)
+        self.timestamps.extend(other.timestamps)
+        self.readings.extend(other.readings)
+        self.raw_readings.extend(other.raw_readings)
+        self.costs.extend(other.costs)
+        codes = [self._unit_code(pair) for pair in other.unit_pairs]
+        self.unit_index.extend(codes[code] for code in other.unit_index)
+
+    def merged(self, other: 'ReadingSeries') -> 'ReadingSeries':
+        """Return a new sorted series with the rows of another sorted series inserted in timestamp order.
+
+        The rows of self are copied in runs between the insertion points, so
+        merging a few rows into a long series costs no sort and no per-row work.
+        """
+        series = ReadingSeries()
+        series.unit_pairs = list(self.unit_pairs)
+        codes = [series._unit_code(pair) for pair in other.unit_pairs]
+        columns = ("ids", "timestamps", "readings", "raw_readings", "costs", "unit_index")
+        start = 0
+        for row, timestamp in enumerate(other.timestamps):
+            position = bisect_right(self.timestamps, timestamp, start)
+            for column in columns:
+                getattr(series, column).extend(getattr(self, column)[start:position])
+            series.ids.append(other.ids[row])
+            series.timestamps.append(timestamp)
+            series.readings.append(other.readings[row])
+            series.raw_readings.append(other.raw_readings[row])
+            series.costs.append(other.costs[row])
+            series.unit_index.append(codes[other.unit_index[row]])
+            start = position
+        for column in columns:
+            getattr(series, column).extend(getattr(self, column)[start:])
+        return series
+
+    def take(self, indices: Iterable[int]) -> 'ReadingSeries':
+        """Return a new series made of the given rows."""
+        indices = list(indices)
+        series = ReadingSeries()
+        series.ids = array("q", [self.ids[i] for i in indices])
+        series.timestamps = array("d", [self.timestamps[i] for i in indices])
+        series.readings = array("d", [self.readings[i] for i in indices])
+        series.raw_readings = array("d", [self.raw_readings[i] for i in indices])
+        series.costs = array("d", [self.costs[i] for i in indices])
+        series.unit_pairs = list(self.unit_pairs)
+        series.unit_index = array("H", [self.unit_index[i] for i in indices])
+        return series
+
+    def sorted(self) -> 'ReadingSeries':
+        """Return the series sorted by timestamp (self if it already is)."""
+        timestamps = self.timestamps
+        if all(timestamps[i] <= timestamps[i + 1] for i in range(len(timestamps) - 1)):
+            return self
+        return self.take(sorted(range(len(timestamps)), key=timestamps.__getitem__))
+
+    def after(self, timestamp: float) -> 'ReadingSeries':
+        """Return the rows of a sorted series strictly newer than an epoch timestamp."""
+        return self[bisect_right(self.timestamps, timestamp):]
+
+    def day_slices(self) -> Iterator['ReadingSeries']:
+        """Yield consecutive slices of a sorted series, one per local calendar day."""
+        start = 0
+        next_day = None
+        for index, timestamp in enumerate(self.timestamps):
+            if next_day is not None and timestamp < next_day:
+                continue
+            if next_day is not None:
+                yield self[start:index]
+                start = index
+            day = dt_util.as_local(dt_util.utc_from_timestamp(timestamp)).date()
+            next_day = dt_util.start_of_local_day(day + timedelta(days=1)).timestamp()
+        if start < len(self):
+            yield self[start:]
+
+    def with_unit(self, unit: str) -> 'ReadingSeries':
+        """Return the rows expressed in the given unit (self if all of them are)."""
+        codes = {code for code, pair in enumerate(self.unit_pairs) if pair[0] == unit}
+        if len(codes) == len(self.unit_pairs):
+            return self
+        return self.take(i for i, code in enumerate(self.unit_index) if code in codes)
+
+    def as_dict(self) -> Dict:
+        """Return a JSON serializable representation."""
+        return {
+            "ids": self.ids.tolist(),
+            "timestamps": self.timestamps.tolist(),
+            "readings": self.readings.tolist(),
+            "raw_readings": self.raw_readings.tolist(),
+            "costs": self.costs.tolist(),
+            "unit_pairs": self.unit_pairs,
+            "unit_index": self.unit_index.tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'ReadingSeries':
+        """Create from as_dict output."""
+        series = cls()
+        series.ids = array("q", data["ids"])
+        series.timestamps = array("d", data["timestamps"])
+        series.readings = array("d", data["readings"])
+        series.raw_readings = array("d", data["raw_readings"])
+        series.costs = array("d", data["costs"])
+        series.unit_pairs = [tuple(pair) for pair in data["unit_pairs"]]
+        series.unit_index = array("H", data["unit_index"])
+        return series
@@ -1,14 +1,31 @@
 """Provide oauth implementations for the Youtilitics API."""
+import asyncio
+from datetime import timedelta
+from http import HTTPStatus
+import time
 from typing import Any
 
+from aiohttp import ClientResponse, ClientResponseError
+
 from homeassistant.components.application_credentials import (
     AuthImplementation,
     AuthorizationServer,
     ClientCredential,
 )
+from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import ConfigEntryAuthFailed
+from homeassistant.helpers.config_entry_oauth2_flow import (
+    CLOCK_OUT_OF_SYNC_MAX_SEC,
+    AbstractOAuth2Implementation,
+    OAuth2Session,
+    async_oauth2_request,
+)
 
-from .const import AUTHORIZE_URL, SCOPES, TOKEN_URL
+from .const import AUTHORIZE_URL, DOMAIN, LOGGER, SCOPES, TOKEN_URL
+
+# Tokens are refreshed this long before they expire, while still in use
+TOKEN_REFRESH_AHEAD = timedelta(minutes=5)
 
 
 class YoutiliticsUserImplementation(AuthImplementation):
@@ -30,3 +47,70 @@ class YoutiliticsUserImplementation(AuthImplementation):
     def extra_authorize_data(self) -> dict[str, Any]:
         """Extra data that needs to be appended to the authorize url."""
         return {"prompt": "login", "scope": " ".join(SCOPES)}
+
+
+class YoutiliticsOAuth2Session(OAuth2Session):
+    """OAuth2 session refreshing its token once for all concurrent requests.
+
+    Within TOKEN_REFRESH_AHEAD of the expiry, the token is refreshed in the
+    background while requests keep using it. Requests needing a new token
+    wait on the single refresh in flight, and read the token it stored when
+    they are sent. A 401 response forces a refresh, unless another request
+    already replaced the token, and the request is sent once more.
+    """
+
+    def __init__(
+        self, hass: HomeAssistant, config_entry: ConfigEntry, implementation: AbstractOAuth2Implementation
+    ) -> None:
+        """Initialize the session."""
+        super().__init__(hass, config_entry, implementation)
+        self._refresh: asyncio.Task | None = None
+        self.refreshes = 0
+
+    async def async_ensure_token_valid(self) -> None:
+        """Ensure that the current token is valid, refreshing it ahead of its expiry."""
+        remaining = self.token["expires_at"] - time.time()
+        if remaining > TOKEN_REFRESH_AHEAD.total_seconds():
+            return
+        refresh = self._async_start_refresh()
+        if remaining <= CLOCK_OUT_OF_SYNC_MAX_SEC:
+            await asyncio.shield(refresh)
+
+    async def async_request(self, method: str, url: str, **kwargs: Any) -> ClientResponse:
+        """Make a request, sending it again with a new token if it was rejected."""
+        await self.async_ensure_token_valid()
+        access_token = self.token["access_token"]
+        response = await async_oauth2_request(self.hass, self.token, method, url, **kwargs)
+        if response.status != HTTPStatus.UNAUTHORIZED:
+            return response
+        response.release()
+        if self.token["access_token"] == access_token:
+            LOGGER.debug("Token rejected by the API, refreshing it")
+            await asyncio.shield(self._async_start_refresh())
+        return await async_oauth2_request(self.hass, self.token, method, url, **kwargs)
+
+    def _async_start_refresh(self) -> asyncio.Task:
+        """Return the refresh in flight, starting one if there is none."""
+        if self._refresh is None or self._refresh.done():
+            self._refresh = self.hass.async_create_task(self._async_refresh_token(), f"{DOMAIN} token refresh")
+            self._refresh.add_done_callback(self._async_refresh_done)
+        return self._refresh
+
+    async def _async_refresh_token(self) -> None:
+        """Refresh the token and store it in the config entry."""
+        try:
+            new_token = await self.implementation.async_refresh_token(self.token)
+        except ClientResponseError as err:
+            if err.status in (HTTPStatus.BAD_REQUEST, HTTPStatus.UNAUTHORIZED):
+                raise ConfigEntryAuthFailed("The Youtilitics authorization was revoked") from err
+            raise
+        self.refreshes += 1
+        self.hass.config_entries.async_update_entry(
+            self.config_entry, data={**self.config_entry.data, "token": new_token}
+        )
+
+    @staticmethod
+    def _async_refresh_done(refresh: asyncio.Task) -> None:
+        """Log a failed refresh, which background refreshes would leave unretrieved."""
+        if not refresh.cancelled() and (err := refresh.exception()) is not None:
+            LOGGER.warning("Refreshing the Youtilitics token failed: %r", err)
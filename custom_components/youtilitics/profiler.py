@@ -0,0 +1,186 @@
+"""Timing of the Youtilitics sync phases and event loop blocking detection."""
+import asyncio
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+import time
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.util import dt as dt_util
+
+from .const import LOGGER
+
+PHASE_HTTP = "http"
+PHASE_DECODE = "decode"
+PHASE_SORT = "sort"
+PHASE_AGGREGATE = "aggregate"
+PHASE_WRITE = "write"
+PHASES = (PHASE_HTTP, PHASE_DECODE, PHASE_SORT, PHASE_AGGREGATE, PHASE_WRITE)
+
+# Interval of the event loop lag probe, which only runs during syncs
+LAG_PROBE_INTERVAL = 0.05
+# Lags shorter than this are scheduling noise, not blocking
+LAG_THRESHOLD = 0.02
+# CPU stages over fewer rows than this run inline, the executor hop would cost more
+EXECUTOR_MIN_ROWS = 1000
+# Synchronous sections blocking the loop longer than this are logged, and
+# longer lags are counted as stalls
+BLOCKING_WARNING = 0.5
+
+
+@dataclass(slots=True)
+class PhaseStats:
+    """Accumulated time of a phase."""
+    seconds: float = 0.0
+    calls: int = 0
+    max_seconds: float = 0.0
+
+    def add(self, seconds: float) -> None:
+        """Record one run of the phase."""
+        self.seconds += seconds
+        self.calls += 1
+        self.max_seconds = max(self.max_seconds, seconds)
+
+
+@dataclass(slots=True)
+class SyncProfile:
+    """Timings of one sync (update or backfill) of a service."""
+    kind: str
+    started_at: str
+    duration: float = 0.0
+    phases: Dict[str, float] = field(default_factory=dict)
+    # Time the event loop was seen blocked while the sync ran, and the longest stall
+    loop_blocked: float = 0.0
+    loop_max_lag: float = 0.0
+
+
+class YoutiliticsProfiler:
+    """Per-service phase timers and a loop lag detector around the syncs.
+
+    Synchronous phases block the event loop for as long as they run, so
+    their timers double as blocking measurements. A probe also measures how
+    late the loop wakes up while any sync runs, catching stalls from code
+    outside the timed sections.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the profiler."""
+        self._totals: Dict[str, Dict[str, PhaseStats]] = {}
+        self._current: Dict[Tuple[str, str], SyncProfile] = {}
+        self._last: Dict[str, Dict[str, SyncProfile]] = {}
+        self._listeners: Dict[str, List[Callable[[], None]]] = {}
+        self._probe: asyncio.TimerHandle | None = None
+        self._probe_due = 0.0
+        self.loop_blocked = 0.0
+        self.loop_max_lag = 0.0
+        self.loop_stalls = 0
+
+    @contextmanager
+    def phase(self, service_id: str, phase: str) -> Iterator[None]:
+        """Time a synchronous section of a service's sync, logging it if it blocks for long."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.add(service_id, phase, elapsed)
+            if elapsed > BLOCKING_WARNING:
+                LOGGER.warning(
+                    "The %s phase of service %s blocked the event loop for %.2f seconds", phase, service_id, elapsed
+                )
+
+    async def async_run_stage(
+        self, hass: HomeAssistant, service_id: str, phase: str, inline: bool, target: Callable[..., Any], *args: Any
+    ) -> Any:
+        """Run a pure-CPU stage of a service's sync in the executor, or on the loop if inline.
+
+        The stage is timed where it runs, so executor queueing does not count.
+        target must not touch Home Assistant or shared state.
+        """
+        if inline:
+            with self.phase(service_id, phase):
+                return target(*args)
+
+        def timed() -> Tuple[Any, float]:
+            start = time.perf_counter()
+            result = target(*args)
+            return result, time.perf_counter() - start
+
+        result, elapsed = await hass.async_add_executor_job(timed)
+        self.add(service_id, phase, elapsed)
+        return result
+
+    def add(self, service_id: str, phase: str, seconds: float) -> None:
+        """Record time spent in a phase of a service's sync."""
+        self._totals.setdefault(service_id, {}).setdefault(phase, PhaseStats()).add(seconds)
+        for (running_id, _), profile in self._current.items():
+            if running_id == service_id:
+                profile.phases[phase] = profile.phases.get(phase, 0.0) + seconds
+
+    @contextmanager
+    def sync(self, service_id: str, kind: str) -> Iterator[None]:
+        """Profile one sync of a service, notifying its listeners when it ends."""
+        profile = self._current[service_id, kind] = SyncProfile(kind, dt_util.utcnow().isoformat())
+        if self._probe is None:
+            self._async_schedule_probe()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            profile.duration = time.perf_counter() - start
+            del self._current[service_id, kind]
+            self._last.setdefault(service_id, {})[kind] = profile
+            if not self._current and self._probe is not None:
+                self._probe.cancel()
+                self._probe = None
+            LOGGER.debug("Readings %s of service %s profile: %s", kind, service_id, profile)
+            for listener in self._listeners.get(service_id, []):
+                listener()
+
+    def last_sync(self, service_id: str, kind: str) -> SyncProfile | None:
+        """Return the profile of the last sync of a kind of a service."""
+        return self._last.get(service_id, {}).get(kind)
+
+    @callback
+    def async_add_listener(self, service_id: str, update_callback: Callable[[], None]) -> CALLBACK_TYPE:
+        """Call update_callback after each sync of a service. Returns a function removing it."""
+        listeners = self._listeners.setdefault(service_id, [])
+        listeners.append(update_callback)
+        return lambda: listeners.remove(update_callback)
+
+    def _async_schedule_probe(self) -> None:
+        """Schedule the next wake-up of the lag probe."""
+        loop = asyncio.get_running_loop()
+        self._probe_due = loop.time() + LAG_PROBE_INTERVAL
+        self._probe = loop.call_at(self._probe_due, self._async_probe)
+
+    def _async_probe(self) -> None:
+        """Record how late the probe woke up, charging the lag to the running syncs."""
+        lag = asyncio.get_running_loop().time() - self._probe_due
+        if lag > LAG_THRESHOLD:
+            self.loop_blocked += lag
+            self.loop_max_lag = max(self.loop_max_lag, lag)
+            for profile in self._current.values():
+                profile.loop_blocked += lag
+                profile.loop_max_lag = max(profile.loop_max_lag, lag)
+            if lag > BLOCKING_WARNING:
+                self.loop_stalls += 1
+                LOGGER.debug("The event loop was blocked for %.2f seconds during a sync", lag)
+        self._async_schedule_probe()
+
+    def as_dict(self) -> Dict:
+        """Return the timings of every service, for diagnostics."""
+        return {
+            "loop": {
+                "blocked": self.loop_blocked,
+                "max_lag": self.loop_max_lag,
+                "stalls": self.loop_stalls,
+            },
+            "services": {
+                service_id: {
+                    "totals": {phase: asdict(stats) for phase, stats in self._totals.get(service_id, {}).items()},
+                    "last_sync": {kind: asdict(profile) for kind, profile in self._last.get(service_id, {}).items()},
+                }
+                for service_id in self._totals.keys() | self._last.keys()
+            },
+        }
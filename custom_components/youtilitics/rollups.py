@@ -0,0 +1,158 @@
+"""Incremental usage rollups of Youtilitics readings."""
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Callable, Dict, Tuple
+
+from homeassistant.util import dt as dt_util
+
+from .store import YoutiliticsReadingsStore
+
+ROLLUP_HOURLY = "hourly"
+ROLLUP_DAILY = "daily"
+ROLLUP_BILLING_PERIOD = "billing_period"
+
+# Number of most recent periods kept for each rollup
+HOURS_KEPT = 48
+DAYS_KEPT = 62
+BILLING_PERIODS_KEPT = 13
+
+
+@dataclass(slots=True)
+class Aggregate:
+    """Usage over one period."""
+    start: float
+    sum: float = 0.0
+    peak: float = 0.0
+    count: int = 0
+    cost: float = 0.0
+
+    def add(self, value: float, cost: float) -> None:
+        """Add a 15-minute interval to the period."""
+        self.sum += value
+        self.cost += cost
+        if self.count == 0 or value > self.peak:
+            self.peak = value
+        self.count += 1
+
+
+def billing_period_start(day: date, billing_day: int) -> date:
+    """Return the first day of the billing period containing day."""
+    if day.day >= billing_day:
+        return day.replace(day=billing_day)
+    return (day.replace(day=1) - timedelta(days=1)).replace(day=billing_day)
+
+
+def _hour_bounds(timestamp: float) -> Tuple[float, float]:
+    """Return the epoch bounds of the hour containing timestamp."""
+    start = timestamp - timestamp % 3600
+    return start, start + 3600
+
+
+def _day_bounds(timestamp: float) -> Tuple[float, float]:
+    """Return the epoch bounds of the local day containing timestamp."""
+    day = dt_util.as_local(dt_util.utc_from_timestamp(timestamp)).date()
+    return (
+        dt_util.start_of_local_day(day).timestamp(),
+        dt_util.start_of_local_day(day + timedelta(days=1)).timestamp(),
+    )
+
+
+class _Periods:
+    """Aggregates of the most recent periods of one kind, in chronological order."""
+
+    def __init__(self, kept: int, bounds: Callable[[float], Tuple[float, float]]) -> None:
+        """Initialize the periods."""
+        self.aggregates: Dict[float, Aggregate] = {}
+        self.bounds = bounds
+        self._kept = kept
+        self._current: Aggregate | None = None
+        self._end = 0.0
+
+    def add(self, timestamp: float, value: float, cost: float) -> None:
+        """Add an interval to the period containing it."""
+        current = self._current
+        if current is None or not current.start <= timestamp < self._end:
+            start, self._end = self.bounds(timestamp)
+            current = self._current = self.aggregates.get(start)
+            if current is None:
+                current = self._current = self.aggregates[start] = Aggregate(start)
+                while len(self.aggregates) > self._kept:
+                    del self.aggregates[next(iter(self.aggregates))]
+        current.add(value, cost)
+
+    def get(self, timestamp: float) -> Aggregate:
+        """Return the aggregate of the period containing timestamp, empty if no reading falls in it."""
+        start, _ = self.bounds(timestamp)
+        return self.aggregates.get(start) or Aggregate(start)
+
+    def clear(self) -> None:
+        """Drop all aggregates."""
+        self.aggregates.clear()
+        self._current = None
+
+
+class YoutiliticsRollups:
+    """Hourly, daily and billing period aggregates of a service, in one unit.
+
+    Aggregates are brought up to date from the readings store, only
+    processing the readings appended since the previous update. When the
+    store is rewritten (history windows inserted), they are rebuilt over the
+    kept horizon.
+    """
+
+    def __init__(self, unit: str, billing_day: int) -> None:
+        """Initialize the rollups."""
+        self.unit = unit
+        self._billing_day = billing_day
+        self._periods = {
+            ROLLUP_HOURLY: _Periods(HOURS_KEPT, _hour_bounds),
+            ROLLUP_DAILY: _Periods(DAYS_KEPT, _day_bounds),
+            ROLLUP_BILLING_PERIOD: _Periods(BILLING_PERIODS_KEPT, self._billing_period_bounds),
+        }
+        self._revision: int | None = None
+        self._last_timestamp: float | None = None
+
+    def _billing_period_bounds(self, timestamp: float) -> Tuple[float, float]:
+        """Return the epoch bounds of the billing period containing timestamp."""
+        start = billing_period_start(dt_util.as_local(dt_util.utc_from_timestamp(timestamp)).date(), self._billing_day)
+        # Any day of the following month lands in the next period
+        end = billing_period_start(start + timedelta(days=32), self._billing_day)
+        return dt_util.start_of_local_day(start).timestamp(), dt_util.start_of_local_day(end).timestamp()
+
+    def update(self, store: YoutiliticsReadingsStore) -> None:
+        """Add the readings stored since the previous update."""
+        timestamps = store.readings.timestamps
+        if store.revision != self._revision or self._last_timestamp is None:
+            for periods in self._periods.values():
+                periods.clear()
+            self._revision = store.revision
+            horizon, _ = self._billing_period_bounds(dt_util.utcnow().timestamp())
+            for _ in range(BILLING_PERIODS_KEPT - 1):
+                horizon, _ = self._billing_period_bounds(horizon - 1)
+            first = bisect_left(timestamps, horizon)
+        else:
+            first = bisect_right(timestamps, self._last_timestamp)
+        if first == len(timestamps):
+            return
+        readings = store.readings[first:].with_unit(self.unit)
+        periods = self._periods.values()
+        for timestamp, value, cost in zip(readings.timestamps, readings.readings, readings.costs):
+            for period in periods:
+                period.add(timestamp, value, cost)
+        self._last_timestamp = timestamps[-1]
+
+    def current(self, kind: str) -> Aggregate:
+        """Return the aggregate of the period of a kind containing now."""
+        return self._periods[kind].get(dt_util.utcnow().timestamp())
+
+    def previous(self, kind: str) -> Aggregate:
+        """Return the aggregate of the period of a kind before the current one."""
+        periods = self._periods[kind]
+        start, _ = periods.bounds(dt_util.utcnow().timestamp())
+        return periods.get(start - 1)
+
+    def latest(self, kind: str) -> Aggregate | None:
+        """Return the aggregate of the most recent period of a kind with readings."""
+        aggregates = self._periods[kind].aggregates
+        return aggregates[next(reversed(aggregates))] if aggregates else None
@@ -0,0 +1,323 @@
+"""Concurrent readings sync scheduling for Youtilitics."""
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+import random
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Awaitable, Callable, Deque, Dict, Iterable, List, Set
+
+from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import ConfigEntryAuthFailed
+from homeassistant.helpers.singleton import singleton
+from homeassistant.util import dt as dt_util
+
+from .const import DOMAIN, LOGGER
+from .entity import YoutiliticsStateWriter
+from .models import Service
+from .profiler import YoutiliticsProfiler
+from .youtilitics import YoutiliticsApiUnavailable
+
+# Upper bound of the random delay before a scheduled sync, so installs don't all hit the API at once
+SYNC_JITTER = timedelta(minutes=5)
+# Upper bound of the random delay between services of a sync
+SERVICE_JITTER = timedelta(seconds=5)
+# A service sync taking longer than this is abandoned until the next run
+SERVICE_SYNC_TIMEOUT = timedelta(minutes=10)
+# Services syncing at the same time across all config entries
+GLOBAL_SYNC_CONCURRENCY = 6
+
+DATA_SYNC_BUDGET = f"{DOMAIN}_sync_budget"
+
+# Bounds of the coordinator polling interval chosen from the publication cadences
+MIN_POLL_INTERVAL = timedelta(minutes=15)
+MAX_POLL_INTERVAL = timedelta(hours=6)
+DEFAULT_POLL_INTERVAL = timedelta(hours=2)
+# Services whose utility does not report last_sync_at are synced this often
+UNTRACKED_SYNC_INTERVAL = timedelta(days=1)
+# Weight of the newest publication interval in the cadence estimate
+CADENCE_SMOOTHING = 0.3
+
+
+@dataclass
+class _ServiceCadence:
+    """Publication tracking of a single service."""
+    last_sync_at: datetime | None = None
+    fetched_sync_at: datetime | None = None
+    fetched_at: datetime | None = None
+    cadence: float | None = None
+
+
+class YoutiliticsCadenceTracker:
+    """Learn how often each utility publishes data from Service.last_sync_at.
+
+    A service only needs its readings fetched once its last_sync_at moved past
+    the value seen at the previous fetch. The estimated cadence (an EWMA of the
+    intervals between publications) drives the coordinator polling interval,
+    which backs off while a utility is late.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the tracker."""
+        self._services: Dict[str, _ServiceCadence] = {}
+
+    def observe(self, services: Iterable[Service]) -> None:
+        """Record the last_sync_at reported by the API for each service."""
+        for service in services:
+            tracked = self._services.setdefault(service.id, _ServiceCadence())
+            sync_at = service.last_sync_at
+            if sync_at is None or sync_at == tracked.last_sync_at:
+                continue
+            if tracked.last_sync_at is not None and sync_at > tracked.last_sync_at:
+                interval = (sync_at - tracked.last_sync_at).total_seconds()
+                tracked.cadence = interval if tracked.cadence is None else (
+                    CADENCE_SMOOTHING * interval + (1 - CADENCE_SMOOTHING) * tracked.cadence
+                )
+            tracked.last_sync_at = sync_at
+
+    def due_services(self) -> Dict[str, datetime | None]:
+        """Return the services with new data to fetch, with the last_sync_at they are due for."""
+        now = dt_util.utcnow()
+        due = {}
+        for service_id, tracked in self._services.items():
+            if tracked.last_sync_at is None:
+                if tracked.fetched_at is None or now - tracked.fetched_at >= UNTRACKED_SYNC_INTERVAL:
+                    due[service_id] = None
+            elif tracked.fetched_sync_at is None or tracked.last_sync_at > tracked.fetched_sync_at:
+                due[service_id] = tracked.last_sync_at
+        return due
+
+    def mark_fetched(self, service_id: str, sync_at: datetime | None) -> None:
+        """Record that the readings published at sync_at have been fetched."""
+        tracked = self._services.setdefault(service_id, _ServiceCadence())
+        tracked.fetched_sync_at = sync_at
+        tracked.fetched_at = dt_util.utcnow()
+
+    def last_sync_at(self, service_id: str) -> datetime | None:
+        """Return the last_sync_at last reported for a service."""
+        tracked = self._services.get(service_id)
+        return tracked.last_sync_at if tracked else None
+
+    def next_poll_interval(self) -> timedelta:
+        """Return how long to wait before asking the API for new publications.
+
+        Each service with a known cadence wants a poll when its next
+        publication is expected. Once a utility is late, it waits as long as
+        it is overdue, so stale utilities are polled less and less often.
+        """
+        now = dt_util.utcnow()
+        waits = []
+        for tracked in self._services.values():
+            if tracked.cadence is None or tracked.last_sync_at is None:
+                continue
+            expected = tracked.last_sync_at + timedelta(seconds=tracked.cadence)
+            waits.append(expected - now if expected > now else now - expected)
+        if not waits:
+            return DEFAULT_POLL_INTERVAL
+        return max(MIN_POLL_INTERVAL, min(min(waits), MAX_POLL_INTERVAL))
+
+
+class YoutiliticsSyncBudget:
+    """Sync slots shared by every config entry, handed out round-robin.
+
+    Syncs waiting for a slot are queued per entry, and freed slots go to the
+    entries in turn, so an account with many services cannot starve the
+    others.
+    """
+
+    def __init__(self, slots: int) -> None:
+        """Initialize the budget."""
+        self._free = slots
+        self._waiters: Dict[str, Deque[asyncio.Future]] = {}
+
+    @asynccontextmanager
+    async def async_slot(self, entry_id: str) -> AsyncIterator[None]:
+        """Hold a sync slot, waiting for the entry's turn if none is free."""
+        if self._free and not self._waiters:
+            self._free -= 1
+        else:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.setdefault(entry_id, deque()).append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    # The slot was handed over as the wait got cancelled
+                    self._release()
+                else:
+                    self._forget(entry_id, waiter)
+                raise
+        try:
+            yield
+        finally:
+            self._release()
+
+    def _forget(self, entry_id: str, waiter: asyncio.Future) -> None:
+        """Remove a cancelled waiter from its entry's queue."""
+        queue = self._waiters.get(entry_id)
+        if queue is not None and waiter in queue:
+            queue.remove(waiter)
+            if not queue:
+                del self._waiters[entry_id]
+
+    def _release(self) -> None:
+        """Hand a freed slot to the next entry in turn, or return it to the budget."""
+        while self._waiters:
+            entry_id = next(iter(self._waiters))
+            queue = self._waiters.pop(entry_id)
+            waiter = queue.popleft()
+            if queue:
+                # The entry goes back to the end of the line
+                self._waiters[entry_id] = queue
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._free += 1
+
+
+@singleton(DATA_SYNC_BUDGET)
+def get_sync_budget(hass: HomeAssistant) -> YoutiliticsSyncBudget:
+    """Return the sync budget shared by all config entries."""
+    return YoutiliticsSyncBudget(GLOBAL_SYNC_CONCURRENCY)
+
+
+class YoutiliticsSyncScheduler:
+    """Run the readings sync of every service concurrently, with bounded fan-out.
+
+    Each service runs in isolation: a failing or slow service is logged and
+    abandoned without delaying or aborting the others. Besides its own
+    concurrency, each sync holds a slot of the budget shared with the other
+    config entries. State writes of a service's entities are held until its
+    sync ends.
+    """
+
+    def __init__(
+        self,
+        concurrency: int,
+        jitter: timedelta = SYNC_JITTER,
+        profiler: YoutiliticsProfiler | None = None,
+        budget: YoutiliticsSyncBudget | None = None,
+        entry_id: str = "",
+        writer: YoutiliticsStateWriter | None = None,
+    ) -> None:
+        """Initialize the scheduler."""
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._jitter = jitter
+        self._profiler = profiler or YoutiliticsProfiler()
+        self._budget = budget or YoutiliticsSyncBudget(GLOBAL_SYNC_CONCURRENCY)
+        self._entry_id = entry_id
+        self._writer = writer or YoutiliticsStateWriter(self._profiler)
+        self._services: Dict[str, List] = {}
+        self._running: Set[tuple] = set()
+        # Whether the current API outage was already logged, so it is logged once, not per service
+        self._outage_logged = False
+        self._auth_failure_logged = False
+
+    def add_service(self, service_id: str, entities: List) -> None:
+        """Register the entities of a service, they are synced in order and share a single fetch."""
+        self._services[service_id] = entities
+
+    def remove_service(self, service_id: str) -> None:
+        """Stop syncing a service, a run in progress still finishes."""
+        self._services.pop(service_id, None)
+
+    async def async_run_sync(self, service_ids: Iterable[str] | None = None) -> Set[str]:
+        """Fetch the latest readings of some services (all by default), after a random delay.
+
+        Returns the services that synced successfully.
+        """
+        await asyncio.sleep(random.uniform(0, self._jitter.total_seconds()))
+        return await self._async_run_all("update", service_ids, SERVICE_JITTER, SERVICE_SYNC_TIMEOUT)
+
+    async def async_run_startup(self, service_ids: Iterable[str] | None = None) -> Set[str]:
+        """Bring some services (all by default) up to date after startup or being added.
+
+        The latest readings of the services are loaded first so every entity
+        gets a fresh state quickly, then the history backfills run. Returns
+        the services whose latest readings synced successfully.
+        """
+        if service_ids is not None:
+            service_ids = list(service_ids)
+        synced = await self._async_run_all("update", service_ids, None, SERVICE_SYNC_TIMEOUT)
+        await self._async_run_all("backfill", service_ids, None, None)
+        return synced
+
+    async def _async_run_all(
+        self,
+        phase: str,
+        service_ids: Iterable[str] | None,
+        jitter: timedelta | None,
+        timeout: timedelta | None,
+    ) -> Set[str]:
+        """Run a phase for the given services, skipping those already running it."""
+        if service_ids is None:
+            service_ids = self._services
+        service_ids = [
+            service_id for service_id in service_ids
+            if service_id in self._services and (service_id, phase) not in self._running
+        ]
+        results = await asyncio.gather(*(
+            self._async_run_job(service_id, phase, self._job(self._services[service_id], phase), jitter, timeout)
+            for service_id in service_ids
+        ))
+        return {service_id for service_id, ok in zip(service_ids, results) if ok}
+
+    @staticmethod
+    def _job(entities: List, phase: str) -> Callable[[], Awaitable[None]]:
+        """Return the job running a phase for the entities of a service."""
+        async def job() -> None:
+            for entity in entities:
+                # Disabled entities are never added to Home Assistant
+                if entity.hass is None:
+                    continue
+                if phase == "update":
+                    await entity.async_update_bulk()
+                else:
+                    await entity.async_backfill_history()
+        return job
+
+    async def _async_run_job(
+        self,
+        service_id: str,
+        phase: str,
+        job: Callable[[], Awaitable[None]],
+        jitter: timedelta | None,
+        timeout: timedelta | None,
+    ) -> bool:
+        """Run the job of a service, isolating its failures. Returns whether it succeeded."""
+        self._running.add((service_id, phase))
+        try:
+            if jitter:
+                await asyncio.sleep(random.uniform(0, jitter.total_seconds()))
+            async with self._semaphore, self._budget.async_slot(self._entry_id):
+                try:
+                    with self._writer.async_hold(service_id), self._profiler.sync(service_id, phase):
+                        async with asyncio.timeout(timeout.total_seconds() if timeout else None):
+                            await job()
+                except TimeoutError:
+                    LOGGER.warning("Readings %s of service %s timed out", phase, service_id)
+                    return False
+                except YoutiliticsApiUnavailable as err:
+                    if not self._outage_logged:
+                        self._outage_logged = True
+                        LOGGER.warning(
+                            "Youtilitics API unavailable, skipping readings syncs for %.0fs", err.retry_in
+                        )
+                    LOGGER.debug("Readings %s of service %s skipped: %s", phase, service_id, err)
+                    return False
+                except ConfigEntryAuthFailed as err:
+                    if not self._auth_failure_logged:
+                        self._auth_failure_logged = True
+                        LOGGER.warning(
+                            "Youtilitics authorization failed, skipping readings syncs until it is renewed: %s", err
+                        )
+                    LOGGER.debug("Readings %s of service %s skipped: %s", phase, service_id, err)
+                    return False
+                except Exception:  # pylint: disable=broad-except
+                    LOGGER.exception("Readings %s of service %s failed", phase, service_id)
+                    return False
+            self._outage_logged = False
+            self._auth_failure_logged = False
+            return True
+        finally:
+            self._running.discard((service_id, phase))
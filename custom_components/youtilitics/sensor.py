@@ -1,85 +1,170 @@
 """Sensor platform for Youtilitics."""
-from datetime import datetime, timedelta
+import asyncio
+from datetime import datetime
+from functools import partial
+from itertools import accumulate
 import logging
+from typing import List, Set, Tuple
 
 from homeassistant.components.sensor import SensorDeviceClass, SensorStateClass, SensorEntity
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import UnitOfEnergy, UnitOfVolume
-from homeassistant.core import HomeAssistant
-from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.const import EntityCategory, UnitOfTime
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers import entity_platform
 from homeassistant.helpers.restore_state import RestoreEntity
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.util import dt as dt_util
 
 from . import DOMAIN, YoutiliticsDataCoordinator
-from .models import ServiceType
+from .const import (
+    BACKFILL_MODE_STATISTICS,
+    CONF_BACKFILL_MODE,
+    CONF_BACKFILL_SAMPLE_RATE,
+    CONF_BILLING_DAY,
+    DEFAULT_BACKFILL_MODE,
+    DEFAULT_BACKFILL_SAMPLE_RATE,
+    DEFAULT_BILLING_DAY,
+)
+from .entity import YoutiliticsEntity, YoutiliticsEntityReconciler
+from .models import Account, ReadingSeries, Service
+from .profiler import EXECUTOR_MIN_ROWS, PHASE_AGGREGATE, PHASE_WRITE, PHASES
+from .rollups import ROLLUP_BILLING_PERIOD, ROLLUP_DAILY, ROLLUP_HOURLY
+from .scheduler import YoutiliticsSyncScheduler
+from .store import YoutiliticsMeterLedger
+from .statistics import async_import_history, build_mean_statistics, build_sum_statistics, statistic_metadata
 
 _LOGGER = logging.getLogger(__name__)
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry, async_add_entities: AddEntitiesCallback):
     """Set up sensor platform."""
     coordinator = hass.data[DOMAIN][entry.entry_id]["coordinator"]
-    entities = []
-    service_types: ServiceType = coordinator.data['service_types']
-    # Create reverse mapping for service type IDs to names
-    type_map = {
-        service_types.electricity: "Electricity",
-        service_types.gas: "Gas",
-        service_types.water: "Water"
-    }
-    for account in coordinator.data['services']:
-        for service in account.services:
-            service_type = type_map.get(service.type)
-            if not service_type:
-                _LOGGER.warning(f"Unknown service type ID {service.type} for service {service.id}")
-                continue
-            if service_type == "Electricity":
-                unit = UnitOfEnergy.KILO_WATT_HOUR
-            elif service_type == "Gas":
-                unit = UnitOfVolume.CUBIC_METERS
-            elif service_type == "Water":
-                unit = UnitOfVolume.LITERS
-            else:
-                _LOGGER.debug(f"Skipping unsupported service type {service_type} for service {service.id}")
-                continue
-            name_base = f"{service_type} with {account.utility.name}"
-            service_id_clean = service.id.replace("-", "_")
-            # Define entity IDs
-            interval_entity_id = f"sensor.{DOMAIN}_{service_id_clean}_interval"
-            meter_entity_id = f"sensor.{DOMAIN}_{service_id_clean}_meter"
-            # Create interval sensor
-            interval_sensor = YoutiliticsSensor(
-                coordinator=coordinator,
-                service_id=service.id,
-                name=f"{name_base} Interval",
-                service_type=service_type,
-                unit=unit
-            )
-            # Create meter sensor
-            meter_sensor = YoutiliticsMeterSensor(
+    scheduler = hass.data[DOMAIN][entry.entry_id]["scheduler"]
+    reconciler = YoutiliticsSensorReconciler(
+        hass, entry, coordinator, scheduler, entity_platform.async_get_current_platform()
+    )
+    async_add_entities(reconciler.async_create_entities())
+    # Services added or removed on the Youtilitics side are picked up on the next refresh
+    entry.async_on_unload(coordinator.async_add_listener(reconciler.async_reconcile))
+
+class YoutiliticsSensorReconciler(YoutiliticsEntityReconciler):
+    """Keep the sensors of a config entry in line with its services, and their services synced."""
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        entry: ConfigEntry,
+        coordinator: YoutiliticsDataCoordinator,
+        scheduler: YoutiliticsSyncScheduler,
+        platform: entity_platform.EntityPlatform,
+    ) -> None:
+        """Initialize the reconciler."""
+        super().__init__(hass, entry, coordinator, platform)
+        self._scheduler = scheduler
+        self._backfill_mode = entry.options.get(CONF_BACKFILL_MODE, DEFAULT_BACKFILL_MODE)
+        self._backfill_sample_rate = entry.options.get(CONF_BACKFILL_SAMPLE_RATE, DEFAULT_BACKFILL_SAMPLE_RATE)
+        self._billing_day = entry.options.get(CONF_BILLING_DAY, DEFAULT_BILLING_DAY)
+
+    @callback
+    def _async_service_removed(self, service_id: str) -> None:
+        """Stop syncing a removed service."""
+        self._scheduler.remove_service(service_id)
+
+    async def _async_services_added(self, service_ids: Set[str]) -> None:
+        """Bring the new services up to date."""
+        cadence = self._coordinator.cadence
+        for service_id in await self._scheduler.async_run_startup(service_ids):
+            cadence.mark_fetched(service_id, cadence.last_sync_at(service_id))
+
+    def _create_service_entities(
+        self, account: Account, service: Service, service_type: str, unit: str
+    ) -> List[SensorEntity]:
+        """Create the entities of a service and register them with the scheduler."""
+        coordinator = self._coordinator
+        backfill_mode = self._backfill_mode
+        backfill_sample_rate = self._backfill_sample_rate
+        billing_day = self._billing_day
+        name_base = f"{service_type} with {account.utility.name}"
+        service_id_clean = service.id.replace("-", "_")
+        # Define entity IDs
+        interval_entity_id = f"sensor.{DOMAIN}_{service_id_clean}_interval"
+        meter_entity_id = f"sensor.{DOMAIN}_{service_id_clean}_meter"
+        # Create interval sensor
+        interval_sensor = YoutiliticsSensor(
+            coordinator=coordinator,
+            service_id=service.id,
+            name=f"{name_base} Interval",
+            service_type=service_type,
+            unit=unit,
+            backfill_mode=backfill_mode,
+            backfill_sample_rate=backfill_sample_rate
+        )
+        # Create cost sensor, fed by the meter sensor
+        cost_sensor = YoutiliticsCostSensor(
+            coordinator=coordinator,
+            service_id=service.id,
+            name=f"{name_base} Cost"
+        )
+        # Create meter sensor
+        meter_sensor = YoutiliticsMeterSensor(
+            coordinator=coordinator,
+            service_id=service.id,
+            name=f"{name_base} Meter",
+            service_type=service_type,
+            unit=unit,
+            backfill_mode=backfill_mode,
+            backfill_sample_rate=backfill_sample_rate,
+            cost_sensor=cost_sensor
+        )
+        # Create usage rollup sensors
+        usage_sensors = [
+            YoutiliticsUsageSensor(
                 coordinator=coordinator,
                 service_id=service.id,
-                name=f"{name_base} Meter",
+                name=f"{name_base} {label}",
                 service_type=service_type,
-                unit=unit
+                unit=unit,
+                kind=kind,
+                billing_day=billing_day
             )
-            # Set entity IDs explicitly
-            interval_sensor.entity_id = interval_entity_id
-            meter_sensor.entity_id = meter_entity_id
-            _LOGGER.debug(f"Creating interval sensor with entity_id={interval_entity_id}")
-            _LOGGER.debug(f"Creating meter sensor with entity_id={meter_entity_id}")
-            entities.extend([interval_sensor, meter_sensor])
-
-    async_add_entities(entities)
-
-    # Schedule daily bulk updates at midnight
-    async def update_all(now):
-        for sensor in entities:
-            if hasattr(sensor, 'async_update_bulk'):
-                await sensor.async_update_bulk()
-
-    async_track_time_interval(hass, update_all, timedelta(days=1))
-
-class YoutiliticsSensor(RestoreEntity, SensorEntity):
+            for kind, label in ((ROLLUP_DAILY, "Daily Usage"), (ROLLUP_BILLING_PERIOD, "Billing Period Usage"))
+        ]
+        # Create sync profiling sensor, disabled by default
+        sync_sensor = YoutiliticsSyncSensor(
+            coordinator=coordinator,
+            service_id=service.id,
+            name=f"{name_base} Sync Duration"
+        )
+        # Set entity IDs explicitly
+        interval_sensor.entity_id = interval_entity_id
+        meter_sensor.entity_id = meter_entity_id
+        cost_sensor.entity_id = f"sensor.{DOMAIN}_{service_id_clean}_cost"
+        for usage_sensor in usage_sensors:
+            usage_sensor.entity_id = f"sensor.{DOMAIN}_{service_id_clean}_{usage_sensor.kind}"
+        sync_sensor.entity_id = f"sensor.{DOMAIN}_{service_id_clean}_sync_duration"
+        _LOGGER.debug(f"Creating interval sensor with entity_id={interval_entity_id}")
+        _LOGGER.debug(f"Creating meter sensor with entity_id={meter_entity_id}")
+        self._scheduler.add_service(service.id, [interval_sensor, meter_sensor, *usage_sensors])
+        entities = self._entities[service.id] = [interval_sensor, meter_sensor, cost_sensor, *usage_sensors, sync_sensor]
+        return entities
+
+def _day_batches(readings: ReadingSeries, unit: str) -> List[ReadingSeries]:
+    """Split the sorted readings in a unit into local calendar days."""
+    return list(readings.with_unit(unit).day_slices())
+
+def _cumulative_day_batches(
+    readings: ReadingSeries, total: float, cost: float
+) -> List[Tuple[ReadingSeries, List[float], List[float]]]:
+    """Split sorted readings into local calendar days, with the running total and cost after each reading."""
+    batches = []
+    for batch in readings.day_slices():
+        totals = list(accumulate(batch.readings, initial=total))[1:]
+        costs = list(accumulate(batch.costs, initial=cost))[1:]
+        if totals:
+            total, cost = totals[-1], costs[-1]
+        batches.append((batch, totals, costs))
+    return batches
+
+class YoutiliticsSensor(YoutiliticsEntity, RestoreEntity, SensorEntity):
     """Sensor for interval-based Youtilitics data (non-cumulative)."""
 
     def __init__(
@@ -88,18 +173,21 @@ class YoutiliticsSensor(RestoreEntity, SensorEntity):
         service_id: str,
         name: str,
         service_type: str,
-        unit: str
+        unit: str,
+        backfill_mode: str = DEFAULT_BACKFILL_MODE,
+        backfill_sample_rate: int = DEFAULT_BACKFILL_SAMPLE_RATE
     ):
         """Initialize the interval sensor."""
-        super().__init__()
-        self._coordinator = coordinator
-        self._service_id = service_id
+        super().__init__(coordinator, service_id)
         self._service_type = service_type
         self._unit = unit
+        self._backfill_mode = backfill_mode
+        self._backfill_sample_rate = backfill_sample_rate
         self._attr_name = name
         self._attr_unique_id = f"{service_id}_interval"
         self._last_timestamp = None
         self._latest_reading = None
+        self._restored_value = None
         self._history_backfilled = False
 
     @property
@@ -127,49 +215,34 @@ class YoutiliticsSensor(RestoreEntity, SensorEntity):
     def native_value(self):
         """Return the sensor state."""
         if self._latest_reading is None:
-            readings = self._coordinator.api.get_readings(self._service_id)
-            if not readings:
-                _LOGGER.debug(f"No readings for service {self._service_id}")
-                return None
-            self._latest_reading = readings[-1]
-        if self._latest_reading.unit != self._unit:
-            _LOGGER.warning(f"Unit mismatch for service {self._service_id}: expected {self._unit}, got {self._latest_reading.unit}")
-            return None
+            return self._restored_value
         return self._latest_reading.reading
 
-    @property
-    def available(self) -> bool:
-        """Return if the sensor is available."""
-        readings = self._coordinator.api.get_readings(self._service_id)
-        return bool(readings)
+    @callback
+    def _async_handle_snapshot(self) -> None:
+        """Become available once readings of the service are fetched."""
+        self._attr_available = True
+        super()._async_handle_snapshot()
 
     async def async_update_bulk(self):
         """Fetch and process data."""
         start_time = datetime.now()
-        readings = await self._coordinator.api.get_bulk_readings(self._service_id, self._last_timestamp)
+        readings = await self._coordinator.readings.async_fetch_latest(self._service_id)
         if not readings:
             _LOGGER.debug(f"No new bulk readings for service {self._service_id}")
             return
 
-        # Sort readings by timestamp to ensure correct order
-        readings.sort(key=lambda x: x.timestamp)
         # Process readings (minimal state updates during regular updates)
-        for reading in readings:
-            if reading.unit != self._unit:
-                _LOGGER.warning(f"Skipping reading with unit {reading.unit} for service {self._service_id}")
-                continue
-            self._latest_reading = reading
-            self._last_timestamp = reading.timestamp.isoformat()
-
-        # Record only the latest state during regular updates
-        if readings:
-            latest_reading = readings[-1]
-            self.hass.states.async_set(
-                self.entity_id,
-                latest_reading.reading,
-                {"unit_of_measurement": self._unit, "last_timestamp": self._last_timestamp},
-                timestamp=latest_reading.timestamp.timestamp()
-            )
+        profiler = self._coordinator.profiler
+        with profiler.phase(self._service_id, PHASE_AGGREGATE):
+            matching = readings.with_unit(self._unit)
+        if len(matching) != len(readings):
+            _LOGGER.warning(f"Skipping {len(readings) - len(matching)} readings not in {self._unit} for service {self._service_id}")
+        if matching:
+            self._latest_reading = matching[-1]
+            self._last_timestamp = self._latest_reading.timestamp.isoformat()
+            # Only the latest state is recorded during regular updates
+            self.async_schedule_write()
 
         elapsed = (datetime.now() - start_time).total_seconds()
         _LOGGER.info(f"Processed {len(readings)} bulk readings for service {self._service_id} in {elapsed:.2f} seconds")
@@ -182,50 +255,70 @@ class YoutiliticsSensor(RestoreEntity, SensorEntity):
 
         start_time = datetime.now()
         # Fetch all readings (initial load may have last_timestamp=None)
-        readings = await self._coordinator.api.get_bulk_readings(self._service_id, None)
+        readings = await self._coordinator.readings.async_fetch_history(self._service_id)
         if not readings:
             _LOGGER.debug(f"No readings to backfill for service {self._service_id}")
             self._history_backfilled = True
+            self.async_schedule_write()
             return
 
-        # Sort readings by timestamp
-        readings.sort(key=lambda x: x.timestamp)
-        # Process readings in batches (e.g., per day)
-        current_day = None
-        batch = []
-        for reading in readings:
-            if reading.unit != self._unit:
-                continue
-            reading_day = reading.timestamp.date()
-            if current_day is None:
-                current_day = reading_day
-            if reading_day != current_day:
-                # Process batch for the previous day
-                await self._process_history_batch(batch)
-                batch = []
-                current_day = reading_day
-            batch.append(reading)
-
-        # Process the last batch
-        if batch:
-            await self._process_history_batch(batch)
+        if self._backfill_mode == BACKFILL_MODE_STATISTICS:
+            await self._import_history_statistics(readings)
+        else:
+            await self._replay_history_states(readings)
 
         self._history_backfilled = True
+        self.async_schedule_write()
         elapsed = (datetime.now() - start_time).total_seconds()
         _LOGGER.info(f"Backfilled history for {self.entity_id} with {len(readings)} readings in {elapsed:.2f} seconds")
 
+    async def _import_history_statistics(self, readings):
+        """Import history as hourly mean/min/max statistics, bypassing the state machine."""
+        profiler = self._coordinator.profiler
+        inline = len(readings) < EXECUTOR_MIN_ROWS
+        readings = await profiler.async_run_stage(
+            self.hass, self._service_id, PHASE_AGGREGATE, inline, readings.with_unit, self._unit
+        )
+        if not readings:
+            return
+        statistics = await profiler.async_run_stage(
+            self.hass, self._service_id, PHASE_AGGREGATE, inline, build_mean_statistics, readings
+        )
+        await async_import_history(
+            self.hass,
+            statistic_metadata(self.entity_id, self.name, self._unit, has_mean=True, has_sum=False),
+            statistics,
+            timer=partial(profiler.phase, self._service_id, PHASE_WRITE),
+        )
+        self._latest_reading = readings[-1]
+        self._last_timestamp = self._latest_reading.timestamp.isoformat()
+
+    async def _replay_history_states(self, readings):
+        """Replay history as backdated states, one per hour."""
+        # Process readings in batches (e.g., per day), yielding to the loop between them
+        batches = await self._coordinator.profiler.async_run_stage(
+            self.hass, self._service_id, PHASE_AGGREGATE, len(readings) < EXECUTOR_MIN_ROWS,
+            _day_batches, readings, self._unit,
+        )
+        for batch in batches:
+            await self._process_history_batch(batch)
+            await asyncio.sleep(0)
+        # The replayed states were written around the state writer
+        self._writer.async_invalidate(self)
+
     async def _process_history_batch(self, batch):
         """Process a batch of readings for history backfill."""
         if not batch:
             return
         # Record states for the batch (e.g., one state per hour to reduce writes)
-        for i, reading in enumerate(batch):
-            if i % 4 == 0:  # Write every 4th reading (once per hour)
+        with self._coordinator.profiler.phase(self._service_id, PHASE_WRITE):
+            for i in range(0, len(batch), self._backfill_sample_rate):
+                timestamp = batch.timestamps[i]
                 self.hass.states.async_set(
                     self.entity_id,
-                    reading.reading,
-                    {"unit_of_measurement": self._unit, "last_timestamp": reading.timestamp.isoformat()},
-                    timestamp=reading.timestamp.timestamp()
+                    batch.readings[i],
+                    {"unit_of_measurement": self._unit, "last_timestamp": dt_util.utc_from_timestamp(timestamp).isoformat()},
+                    timestamp=timestamp
                 )
         # Update latest state
         self._latest_reading = batch[-1]
@@ -240,10 +333,17 @@ class YoutiliticsSensor(RestoreEntity, SensorEntity):
             self._last_timestamp = last_state.attributes.get('last_timestamp')
         if last_state and last_state.attributes.get('history_backfilled'):
             self._history_backfilled = last_state.attributes.get('history_backfilled') == 'true'
-        # Trigger initial bulk update (minimal state updates)
-        await self.async_update_bulk()
-        # Start background history backfill
-        self.hass.async_create_task(self.async_backfill_history())
+        if last_state and last_state.state not in (None, 'unknown', 'unavailable'):
+            try:
+                self._restored_value = float(last_state.state)
+            except ValueError:
+                _LOGGER.warning(f"Invalid restored state for {self.entity_id}: {last_state.state}")
+        self._attr_available = (
+            self._restored_value is not None
+            or self._coordinator.readings.get_snapshot(self._service_id) is not None
+        )
+        self._coordinator.readings.seed_cursor(self._service_id, self._last_timestamp)
+        # Initial bulk update and history backfill run in the startup sync, once all entities are added
 
     @property
     def extra_state_attributes(self):
@@ -253,7 +353,7 @@ class YoutiliticsSensor(RestoreEntity, SensorEntity):
             'history_backfilled': 'true' if self._history_backfilled else 'false'
         }
 
-class YoutiliticsMeterSensor(RestoreEntity, SensorEntity):
+class YoutiliticsMeterSensor(YoutiliticsEntity, RestoreEntity, SensorEntity):
     """Sensor for cumulative Youtilitics data (total increasing)."""
 
     def __init__(
@@ -262,17 +362,23 @@ class YoutiliticsMeterSensor(RestoreEntity, SensorEntity):
         service_id: str,
         name: str,
         service_type: str,
-        unit: str
+        unit: str,
+        backfill_mode: str = DEFAULT_BACKFILL_MODE,
+        backfill_sample_rate: int = DEFAULT_BACKFILL_SAMPLE_RATE,
+        cost_sensor: "YoutiliticsCostSensor | None" = None
     ):
         """Initialize the meter sensor."""
-        super().__init__()
-        self._coordinator = coordinator
-        self._service_id = service_id
+        super().__init__(coordinator, service_id)
         self._service_type = service_type
         self._unit = unit
+        self._backfill_mode = backfill_mode
+        self._backfill_sample_rate = backfill_sample_rate
         self._attr_name = name
         self._attr_unique_id = f"{service_id}_meter"
+        self._cost_sensor = cost_sensor
+        self._ledger = None
         self._cumulative_total = 0.0
+        self._restored = False
         self._last_timestamp = None
         self._last_processed_reading_id = None
         self._history_backfilled = False
@@ -315,46 +421,45 @@ class YoutiliticsMeterSensor(RestoreEntity, SensorEntity):
         return self._cumulative_total
 
     @property
-    def available(self) -> bool:
-        """Return if the sensor is available."""
-        readings = self._coordinator.api.get_readings(self._service_id)
-        return bool(readings)
+    def _cost_tracked(self) -> bool:
+        """Return whether costs are accumulated into an enabled cost sensor."""
+        return self._cost_sensor is not None and self._cost_sensor.hass is not None
+
+    @callback
+    def _async_handle_snapshot(self) -> None:
+        """Become available once readings of the service are fetched."""
+        self._attr_available = True
+        super()._async_handle_snapshot()
 
     async def async_update_bulk(self):
         """Fetch and process data."""
         start_time = datetime.now()
-        readings = await self._coordinator.api.get_bulk_readings(self._service_id, self._last_timestamp)
-        if not readings:
+        readings = await self._coordinator.readings.async_fetch_latest(self._service_id)
+        refilled = self._coordinator.readings.get_refilled(self._service_id)
+        if not readings and not refilled:
             _LOGGER.debug(f"No new bulk readings for service {self._service_id}")
             return
 
-        # Sort readings by timestamp to ensure correct order
-        readings.sort(key=lambda x: x.timestamp)
-        # Filter out readings already processed (using reading ID)
-        if self._last_processed_reading_id is not None:
-            readings = [r for r in readings if r.id > self._last_processed_reading_id]
-        if not readings:
-            _LOGGER.debug(f"No new readings after ID {self._last_processed_reading_id} for service {self._service_id}")
+        # Process readings, the ledger skips those already counted. Refilled
+        # readings only add to the totals, they never move the cursor back.
+        profiler = self._coordinator.profiler
+        with profiler.phase(self._service_id, PHASE_AGGREGATE):
+            matching = readings.with_unit(self._unit)
+            counted_refilled = self._ledger.async_ingest(refilled.with_unit(self._unit))
+            counted = self._ledger.async_ingest(matching)
+        if len(matching) != len(readings):
+            _LOGGER.warning(f"Skipping {len(readings) - len(matching)} readings not in {self._unit} for service {self._service_id}")
+        if not counted and not counted_refilled:
+            _LOGGER.debug(f"No new readings to count for service {self._service_id}")
             return
-
-        # Process readings
-        for reading in readings:
-            if reading.unit != self._unit:
-                _LOGGER.warning(f"Skipping reading with unit {reading.unit} for service {self._service_id}")
-                continue
-            self._cumulative_total += reading.reading
-            self._last_timestamp = reading.timestamp.isoformat()
-            self._last_processed_reading_id = reading.id
-
-        # Record only the latest state during regular updates
-        if readings:
-            latest_reading = readings[-1]
-            self.hass.states.async_set(
-                self.entity_id,
-                self._cumulative_total,
-                {"unit_of_measurement": self._unit, "last_timestamp": self._last_timestamp, "cumulative_total": self._cumulative_total},
-                timestamp=latest_reading.timestamp.timestamp()
-            )
+        self._cumulative_total = self._ledger.total
+        if counted:
+            self._last_timestamp = dt_util.utc_from_timestamp(counted.timestamps[-1]).isoformat()
+            self._last_processed_reading_id = counted.ids[-1]
+        if self._cost_tracked:
+            self._cost_sensor.async_set_total(self._ledger.cost, self._last_timestamp)
+        # Only the latest state is recorded during regular updates
+        self.async_schedule_write()
 
         elapsed = (datetime.now() - start_time).total_seconds()
         _LOGGER.info(f"Processed {len(readings)} bulk readings for service {self._service_id}, total: {self._cumulative_total} in {elapsed:.2f} seconds")
@@ -367,57 +472,121 @@ class YoutiliticsMeterSensor(RestoreEntity, SensorEntity):
 
         start_time = datetime.now()
         # Fetch all readings (initial load may have last_timestamp=None)
-        readings = await self._coordinator.api.get_bulk_readings(self._service_id, None)
+        readings = await self._coordinator.readings.async_fetch_history(self._service_id)
         if not readings:
             _LOGGER.debug(f"No readings to backfill for service {self._service_id}")
             self._history_backfilled = True
+            self.async_schedule_write()
             return
 
-        # Sort readings by timestamp
-        readings.sort(key=lambda x: x.timestamp)
-        # Process readings in batches (e.g., per day)
-        current_day = None
-        batch = []
-        batch_total = self._cumulative_total
-        for reading in readings:
-            if reading.unit != self._unit:
-                continue
-            reading_day = reading.timestamp.date()
-            if current_day is None:
-                current_day = reading_day
-            if reading_day != current_day:
-                # Process batch for the previous day
-                await self._process_history_batch(batch, batch_total)
-                batch = []
-                current_day = reading_day
-            batch.append(reading)
-            batch_total += reading.reading
-
-        # Process the last batch
-        if batch:
-            await self._process_history_batch(batch, batch_total)
+        if self._backfill_mode == BACKFILL_MODE_STATISTICS:
+            await self._import_history_statistics(readings)
+        else:
+            await self._replay_history_states(readings)
 
         self._history_backfilled = True
+        self.async_schedule_write()
         elapsed = (datetime.now() - start_time).total_seconds()
         _LOGGER.info(f"Backfilled history for {self.entity_id} with {len(readings)} readings in {elapsed:.2f} seconds")
 
-    async def _process_history_batch(self, batch, batch_total):
-        """Process a batch of readings for history backfill."""
+    async def _import_history_statistics(self, readings):
+        """Import history as hourly state/sum statistics, bypassing the state machine."""
+        profiler = self._coordinator.profiler
+        inline = len(readings) < EXECUTOR_MIN_ROWS
+        readings = await profiler.async_run_stage(
+            self.hass, self._service_id, PHASE_AGGREGATE, inline, readings.with_unit, self._unit
+        )
+        if not readings:
+            return
+        cost_tracked = self._cost_tracked
+        write_timer = partial(profiler.phase, self._service_id, PHASE_WRITE)
+        with profiler.phase(self._service_id, PHASE_AGGREGATE):
+            # Count what the syncs did not, then end the statistics on the ledger totals
+            self._ledger.async_ingest(readings)
+        statistics, cost_statistics, total, cost_total = await profiler.async_run_stage(
+            self.hass, self._service_id, PHASE_AGGREGATE, inline, build_sum_statistics,
+            readings, self._ledger.total - sum(readings.readings), self._ledger.cost - sum(readings.costs),
+        )
+        await async_import_history(
+            self.hass,
+            statistic_metadata(self.entity_id, self.name, self._unit, has_mean=False, has_sum=True),
+            statistics,
+            timer=write_timer,
+        )
+        self._cumulative_total = total
+        self._last_timestamp = dt_util.utc_from_timestamp(readings.timestamps[-1]).isoformat()
+        self._last_processed_reading_id = readings.ids[-1]
+        if cost_tracked:
+            cost_sensor = self._cost_sensor
+            await async_import_history(
+                self.hass,
+                statistic_metadata(
+                    cost_sensor.entity_id, cost_sensor.name, cost_sensor.native_unit_of_measurement, has_mean=False, has_sum=True
+                ),
+                cost_statistics,
+                timer=write_timer,
+            )
+            cost_sensor.async_set_total(cost_total, self._last_timestamp)
+
+    async def _replay_history_states(self, readings):
+        """Replay history as backdated states, one per hour."""
+        profiler = self._coordinator.profiler
+        inline = len(readings) < EXECUTOR_MIN_ROWS
+        readings = await profiler.async_run_stage(
+            self.hass, self._service_id, PHASE_AGGREGATE, inline, readings.with_unit, self._unit
+        )
+        if not readings:
+            return
+        with profiler.phase(self._service_id, PHASE_AGGREGATE):
+            # Count what the syncs did not, then replay the totals up to the ledger ones
+            self._ledger.async_ingest(readings)
+        self._cumulative_total = self._ledger.total - sum(readings.readings)
+        cost_sensor = self._cost_sensor if self._cost_tracked else None
+        if cost_sensor:
+            cost_sensor.total = self._ledger.cost - sum(readings.costs)
+        # Running totals: the meter value and cost right after each reading, computed off the loop
+        batches = await profiler.async_run_stage(
+            self.hass, self._service_id, PHASE_AGGREGATE, inline, _cumulative_day_batches,
+            readings, self._cumulative_total, cost_sensor.total if cost_sensor else 0.0,
+        )
+        # Process readings in batches (e.g., per day), yielding to the loop between them
+        for batch, totals, costs in batches:
+            await self._process_history_batch(batch, totals, costs)
+            await asyncio.sleep(0)
+        # The replayed states were written around the state writer
+        self._writer.async_invalidate(self)
+        if cost_sensor:
+            self._writer.async_invalidate(cost_sensor)
+
+    async def _process_history_batch(self, batch, totals, costs):
+        """Process a batch of readings for history backfill, with the running totals after each reading."""
         if not batch:
             return
+        cost_sensor = self._cost_sensor if self._cost_tracked else None
         # Record states for the batch (e.g., one state per hour to reduce writes)
-        for i, reading in enumerate(batch):
-            if i % 4 == 0:  # Write every 4th reading (once per hour)
+        with self._coordinator.profiler.phase(self._service_id, PHASE_WRITE):
+            for i in range(0, len(batch), self._backfill_sample_rate):
+                timestamp = batch.timestamps[i]
+                last_timestamp = dt_util.utc_from_timestamp(timestamp).isoformat()
                 self.hass.states.async_set(
                     self.entity_id,
-                    batch_total - sum(r.reading for r in batch[i+1:]) if i + 1 < len(batch) else batch_total,
-                    {"unit_of_measurement": self._unit, "last_timestamp": reading.timestamp.isoformat(), "cumulative_total": batch_total},
-                    timestamp=reading.timestamp.timestamp()
+                    totals[i],
+                    {"unit_of_measurement": self._unit, "last_timestamp": last_timestamp, "cumulative_total": totals[i]},
+                    timestamp=timestamp
                 )
+                if cost_sensor:
+                    self.hass.states.async_set(
+                        cost_sensor.entity_id,
+                        costs[i],
+                        {"unit_of_measurement": cost_sensor.native_unit_of_measurement, "last_timestamp": last_timestamp},
+                        timestamp=timestamp
+                    )
         # Update cumulative total and last processed reading
-        self._cumulative_total = batch_total
-        self._last_timestamp = batch[-1].timestamp.isoformat()
-        self._last_processed_reading_id = batch[-1].id
+        self._cumulative_total = totals[-1]
+        self._last_timestamp = dt_util.utc_from_timestamp(batch.timestamps[-1]).isoformat()
+        self._last_processed_reading_id = batch.ids[-1]
+        if cost_sensor:
+            cost_sensor.async_set_total(costs[-1], self._last_timestamp)
 
     async def async_added_to_hass(self):
         """Run when entity is added to Home Assistant."""
@@ -437,12 +606,27 @@ class YoutiliticsMeterSensor(RestoreEntity, SensorEntity):
                     # Only use restored total if it's higher (prevent decrease)
                     if restored_total > self._cumulative_total:
                         self._cumulative_total = restored_total
+                    self._restored = True
                 except ValueError:
                     _LOGGER.warning(f"Invalid restored state for {self.entity_id}: {last_state.state}")
-        # Trigger initial bulk update (minimal state updates)
-        await self.async_update_bulk()
-        # Start background history backfill
-        self.hass.async_create_task(self.async_backfill_history())
+        # The ledger holds the total and the readings counted into it
+        self._ledger = YoutiliticsMeterLedger(self.hass, self._service_id)
+        if await self._ledger.async_load():
+            self._cumulative_total = self._ledger.total
+            self._restored = True
+        elif self._restored:
+            # Total counted before the ledger existed, up to the restored timestamp
+            watermark = dt_util.parse_datetime(self._last_timestamp).timestamp() if self._last_timestamp else None
+            self._ledger.async_migrate(self._cumulative_total, watermark)
+        self._attr_available = self._restored or self._coordinator.readings.get_snapshot(self._service_id) is not None
+        self._coordinator.readings.seed_cursor(self._service_id, self._last_timestamp)
+        # Initial bulk update and history backfill run in the startup sync, once all entities are added
+
+    async def async_removed_from_registry(self):
+        """Delete the ledger of the meter once the sensor is removed for good."""
+        await super().async_removed_from_registry()
+        if self._ledger is not None:
+            await self._ledger.async_remove()
 
     @property
     def extra_state_attributes(self):
@@ -453,3 +637,245 @@ class YoutiliticsMeterSensor(RestoreEntity, SensorEntity):
             'last_processed_reading_id': self._last_processed_reading_id,
             'history_backfilled': 'true' if self._history_backfilled else 'false'
         }
+
+class YoutiliticsCostSensor(YoutiliticsEntity, RestoreEntity, SensorEntity):
+    """Sensor for the cumulative cost of a service, accumulated by its meter sensor."""
+
+    def __init__(self, coordinator: YoutiliticsDataCoordinator, service_id: str, name: str):
+        """Initialize the cost sensor."""
+        super().__init__(coordinator, service_id)
+        self._attr_name = name
+        self._attr_unique_id = f"{service_id}_cost"
+        self._attr_suggested_display_precision = 2
+        self.total = 0.0
+        self._last_timestamp = None
+
+    @property
+    def device_class(self):
+        """Return the device class."""
+        return SensorDeviceClass.MONETARY
+
+    @property
+    def state_class(self):
+        """Return the state class."""
+        return SensorStateClass.TOTAL
+
+    @property
+    def native_unit_of_measurement(self) -> str:
+        """Return the currency of the costs."""
+        return self.hass.config.currency
+
+    @property
+    def icon(self):
+        """Return an icon."""
+        return "mdi:cash"
+
+    @property
+    def native_value(self):
+        """Return the cumulative cost."""
+        return self.total
+
+    def async_set_total(self, total: float, last_timestamp: str | None):
+        """Set the cumulative cost and schedule writing the state."""
+        self.total = total
+        self._last_timestamp = last_timestamp
+        self.async_schedule_write()
+
+    async def async_added_to_hass(self):
+        """Run when entity is added to Home Assistant."""
+        await super().async_added_to_hass()
+        last_state = await self.async_get_last_state()
+        if last_state:
+            self._last_timestamp = last_state.attributes.get('last_timestamp')
+            if last_state.state not in (None, 'unknown', 'unavailable'):
+                try:
+                    self.total = float(last_state.state)
+                except ValueError:
+                    _LOGGER.warning(f"Invalid restored state for {self.entity_id}: {last_state.state}")
+
+    @property
+    def extra_state_attributes(self):
+        """Return additional state attributes."""
+        return {
+            'last_timestamp': self._last_timestamp
+        }
+
+class YoutiliticsUsageSensor(YoutiliticsEntity, SensorEntity):
+    """Sensor for the usage of the current day or billing period, from the rollups."""
+
+    def __init__(
+        self,
+        coordinator: YoutiliticsDataCoordinator,
+        service_id: str,
+        name: str,
+        service_type: str,
+        unit: str,
+        kind: str,
+        billing_day: int = DEFAULT_BILLING_DAY
+    ):
+        """Initialize the usage sensor."""
+        super().__init__(coordinator, service_id)
+        self._service_type = service_type
+        self._unit = unit
+        self._billing_day = billing_day
+        self.kind = kind
+        self._attr_name = name
+        self._attr_unique_id = f"{service_id}_{kind}"
+        self._rollups = None
+
+    @property
+    def device_class(self):
+        """Return the device class."""
+        if self._service_type == "Electricity":
+            return SensorDeviceClass.ENERGY
+        if self._service_type == "Water":
+            return SensorDeviceClass.WATER
+        if self._service_type == "Gas":
+            return SensorDeviceClass.GAS
+        return None
+
+    @property
+    def state_class(self):
+        """Return the state class."""
+        return SensorStateClass.TOTAL
+
+    @property
+    def native_unit_of_measurement(self) -> str:
+        """Return the unit of measurement."""
+        return self._unit
+
+    @property
+    def icon(self):
+        """Return an icon."""
+        if self._service_type == "Electricity":
+            return "mdi:flash"
+        if self._service_type == "Water":
+            return "mdi:water"
+        if self._service_type == "Gas":
+            return "mdi:gas-cylinder"
+        return "mdi:meter"
+
+    @property
+    def native_value(self):
+        """Return the usage of the current period."""
+        if self._rollups is None:
+            return None
+        return self._rollups.current(self.kind).sum
+
+    @property
+    def last_reset(self) -> datetime | None:
+        """Return the start of the current period."""
+        if self._rollups is None:
+            return None
+        return dt_util.utc_from_timestamp(self._rollups.current(self.kind).start)
+
+    @property
+    def available(self) -> bool:
+        """Return if the sensor is available."""
+        return super().available and self._rollups is not None
+
+    async def _async_update_rollups(self):
+        """Bring the rollups up to date with the stored readings and schedule writing the state."""
+        self._rollups = await self._coordinator.readings.async_get_rollups(self._service_id, self._unit, self._billing_day)
+        self.async_schedule_write()
+
+    async def async_update_bulk(self):
+        """Fetch and process data."""
+        await self._coordinator.readings.async_fetch_latest(self._service_id)
+        await self._async_update_rollups()
+
+    async def async_backfill_history(self):
+        """Rebuild the rollups once the history is fetched."""
+        await self._coordinator.readings.async_fetch_history(self._service_id)
+        await self._async_update_rollups()
+
+    async def async_added_to_hass(self):
+        """Run when entity is added to Home Assistant."""
+        await super().async_added_to_hass()
+        # The rollups are rebuilt from the persisted readings, no fetch needed. Loading
+        # them can take a while, so it does not hold up adding the entities
+        self.async_run_in_background(self._async_update_rollups(), "rollups rebuild")
+
+    @property
+    def extra_state_attributes(self):
+        """Return additional state attributes."""
+        if self._rollups is None:
+            return None
+        current = self._rollups.current(self.kind)
+        previous = self._rollups.previous(self.kind)
+        attributes = {
+            'peak_interval': current.peak,
+            'interval_count': current.count,
+            'cost': round(current.cost, 2),
+            'previous_usage': previous.sum,
+            'previous_peak_interval': previous.peak,
+            'previous_cost': round(previous.cost, 2),
+        }
+        latest_hour = self._rollups.latest(ROLLUP_HOURLY)
+        if self.kind == ROLLUP_DAILY and latest_hour is not None:
+            attributes['latest_hour'] = dt_util.utc_from_timestamp(latest_hour.start).isoformat()
+            attributes['latest_hour_usage'] = latest_hour.sum
+            attributes['latest_hour_peak_interval'] = latest_hour.peak
+        return attributes
+
+class YoutiliticsSyncSensor(YoutiliticsEntity, SensorEntity):
+    """Debug sensor for the duration and phase timings of the last sync of a service."""
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+
+    def __init__(self, coordinator: YoutiliticsDataCoordinator, service_id: str, name: str):
+        """Initialize the sync sensor."""
+        super().__init__(coordinator, service_id)
+        self._attr_name = name
+        self._attr_unique_id = f"{service_id}_sync_duration"
+
+    @property
+    def device_class(self):
+        """Return the device class."""
+        return SensorDeviceClass.DURATION
+
+    @property
+    def state_class(self):
+        """Return the state class."""
+        return SensorStateClass.MEASUREMENT
+
+    @property
+    def native_unit_of_measurement(self) -> str:
+        """Return the unit of measurement."""
+        return UnitOfTime.SECONDS
+
+    @property
+    def icon(self):
+        """Return an icon."""
+        return "mdi:timer-outline"
+
+    @property
+    def native_value(self):
+        """Return the duration of the last update of the service."""
+        profile = self._coordinator.profiler.last_sync(self._service_id, "update")
+        return None if profile is None else round(profile.duration, 3)
+
+    async def async_added_to_hass(self):
+        """Run when entity is added to Home Assistant."""
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            self._coordinator.profiler.async_add_listener(self._service_id, self.async_schedule_write)
+        )
+
+    @property
+    def extra_state_attributes(self):
+        """Return the phase timings of the last update and backfill."""
+        attributes = {}
+        for kind in ("update", "backfill"):
+            profile = self._coordinator.profiler.last_sync(self._service_id, kind)
+            if profile is None:
+                continue
+            attributes[f"{kind}_started_at"] = profile.started_at
+            if kind != "update":
+                attributes[f"{kind}_duration"] = round(profile.duration, 3)
+            for phase in PHASES:
+                attributes[f"{kind}_{phase}"] = round(profile.phases.get(phase, 0.0), 3)
+            attributes[f"{kind}_loop_blocked"] = round(profile.loop_blocked, 3)
+            attributes[f"{kind}_loop_max_lag"] = round(profile.loop_max_lag, 3)
+        return attributes
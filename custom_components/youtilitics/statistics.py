@@ -0,0 +1,103 @@
+"""Recorder statistics import for Youtilitics history backfill."""
+import asyncio
+from contextlib import AbstractContextManager, nullcontext
+from typing import Callable, List, Tuple
+
+from homeassistant.components.recorder.models import StatisticData, StatisticMetaData
+from homeassistant.components.recorder.statistics import async_import_statistics
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+
+from .models import ReadingSeries
+
+# Number of hourly rows handed to the recorder per import job (about a month)
+STATISTICS_CHUNK_SIZE = 24 * 31
+
+
+def build_mean_statistics(series: ReadingSeries) -> List[StatisticData]:
+    """Build hourly mean/min/max statistics from a series sorted by timestamp."""
+    statistics: List[StatisticData] = []
+    hour = None
+    total = 0.0
+    count = 0
+    low = high = 0.0
+    for timestamp, value in zip(series.timestamps, series.readings):
+        start = timestamp - timestamp % 3600
+        if start != hour:
+            if hour is not None:
+                statistics.append(StatisticData(start=dt_util.utc_from_timestamp(hour), mean=total / count, min=low, max=high))
+            hour = start
+            total = 0.0
+            count = 0
+            low = high = value
+        total += value
+        count += 1
+        if value < low:
+            low = value
+        elif value > high:
+            high = value
+    if hour is not None:
+        statistics.append(StatisticData(start=dt_util.utc_from_timestamp(hour), mean=total / count, min=low, max=high))
+    return statistics
+
+
+def build_sum_statistics(
+    series: ReadingSeries, base_total: float = 0.0, base_cost: float = 0.0
+) -> Tuple[List[StatisticData], List[StatisticData], float, float]:
+    """Build hourly state/sum statistics of usage and cost from a series sorted by timestamp.
+
+    The state is the meter total (starting at base_total) or the cumulative
+    cost (starting at base_cost) at the end of each hour, and the sum is the
+    usage or cost since the first imported hour. Both are built in the same
+    pass. Returns the usage and cost statistics and the final totals.
+    """
+    statistics: List[StatisticData] = []
+    cost_statistics: List[StatisticData] = []
+    hour = None
+    running = 0.0
+    running_cost = 0.0
+    for timestamp, value, cost in zip(series.timestamps, series.readings, series.costs):
+        start = timestamp - timestamp % 3600
+        if start != hour:
+            if hour is not None:
+                start_time = dt_util.utc_from_timestamp(hour)
+                statistics.append(StatisticData(start=start_time, state=base_total + running, sum=running))
+                cost_statistics.append(StatisticData(start=start_time, state=base_cost + running_cost, sum=running_cost))
+            hour = start
+        running += value
+        running_cost += cost
+    if hour is not None:
+        start_time = dt_util.utc_from_timestamp(hour)
+        statistics.append(StatisticData(start=start_time, state=base_total + running, sum=running))
+        cost_statistics.append(StatisticData(start=start_time, state=base_cost + running_cost, sum=running_cost))
+    return statistics, cost_statistics, base_total + running, base_cost + running_cost
+
+
+def statistic_metadata(entity_id: str, name: str | None, unit: str, has_mean: bool, has_sum: bool) -> StatisticMetaData:
+    """Return the metadata of an entity's long-term statistics."""
+    return StatisticMetaData(
+        has_mean=has_mean,
+        has_sum=has_sum,
+        name=name,
+        source="recorder",
+        statistic_id=entity_id,
+        unit_of_measurement=unit,
+    )
+
+
+async def async_import_history(
+    hass: HomeAssistant,
+    metadata: StatisticMetaData,
+    statistics: List[StatisticData],
+    chunk_size: int = STATISTICS_CHUNK_SIZE,
+    timer: Callable[[], AbstractContextManager] = nullcontext,
+) -> None:
+    """Queue statistics in recorder import jobs, yielding to the loop between chunks.
+
+    Each chunk is queued inside a timer() context, so callers can profile the
+    work done on the loop without the time spent yielding.
+    """
+    for i in range(0, len(statistics), chunk_size):
+        with timer():
+            async_import_statistics(hass, metadata, statistics[i:i + chunk_size])
+        await asyncio.sleep(0)
@@ -0,0 +1,249 @@
+"""Persistent readings cache for Youtilitics services."""
+from bisect import bisect_right
+from collections import Counter
+from typing import Dict, List, Tuple
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
+
+from .const import DOMAIN
+from .index import SLOT_SECONDS, ReadingIndex
+from .models import ReadingSeries
+
+STORAGE_VERSION = 1
+STORAGE_KEY = f"{DOMAIN}.readings"
+LEDGER_STORAGE_KEY = f"{DOMAIN}.meter"
+# Coalesce writes of consecutive syncs into a single save
+SAVE_DELAY = 60
+
+
+class YoutiliticsReadingsStore:
+    """Readings of a service persisted across restarts.
+
+    Readings are kept sorted by timestamp. The store is complete when it holds
+    the full history of the service, otherwise it only holds a tail of it,
+    plus the history windows already fetched by an interrupted backfill.
+    Gaps the API returned nothing for are kept with their number of attempts
+    and the epoch time they may be refetched at, so they are not retried on
+    every check.
+    The readings series is replaced on every change, never mutated, so the
+    series handed out can be processed in the executor.
+    """
+
+    def __init__(self, hass: HomeAssistant, service_id: str) -> None:
+        """Initialize the readings store."""
+        self._store = Store(hass, STORAGE_VERSION, f"{STORAGE_KEY}.{service_id}")
+        self.service_id = service_id
+        self.readings = ReadingSeries()
+        self.complete = False
+        self.windows: List[Tuple[float | None, float | None]] = []
+        self.empty_gaps: Dict[Tuple[float, float], Tuple[int, float]] = {}
+        # Bumped whenever readings are replaced rather than appended
+        self.revision = 0
+        self._index: ReadingIndex | None = None
+        self._loaded = False
+
+    @property
+    def last_id(self) -> int | None:
+        """Return the id of the last stored reading."""
+        return self.readings.ids[-1] if self.readings else None
+
+    @property
+    def last_timestamp(self) -> str | None:
+        """Return the timestamp of the last stored reading, usable as an API cursor."""
+        if not self.readings:
+            return None
+        return dt_util.utc_from_timestamp(self.readings.timestamps[-1]).isoformat()
+
+    @property
+    def index(self) -> ReadingIndex:
+        """Return the index of the slots holding a stored reading."""
+        if self._index is None:
+            self._index = ReadingIndex.from_timestamps(self.readings.timestamps)
+        return self._index
+
+    async def async_load(self) -> None:
+        """Load stored readings from disk."""
+        if self._loaded:
+            return
+        data = await self._store.async_load()
+        self._loaded = True
+        if data is None:
+            return
+        self.readings = ReadingSeries.from_dict(data["readings"])
+        self.revision += 1
+        self._index = None
+        self.complete = data["complete"]
+        self.windows = [tuple(window) for window in data.get("windows", [])]
+        self.empty_gaps = {
+            (first, last): (attempts, retry_at)
+            for first, last, attempts, retry_at in data.get("empty_gaps", [])
+        }
+
+    def readings_after(self, last_timestamp: str | None) -> ReadingSeries:
+        """Return the stored readings strictly newer than last_timestamp."""
+        if last_timestamp is None:
+            return self.readings
+        return self.readings.after(dt_util.parse_datetime(last_timestamp).timestamp())
+
+    def async_extend(self, readings: ReadingSeries) -> ReadingSeries:
+        """Append sorted readings newer than the stored tail and schedule a save.
+
+        Returns the readings that were actually new.
+        """
+        if self.readings:
+            readings = readings.after(self.readings.timestamps[-1])
+        if readings and self._index is not None:
+            index = self._index
+            readings = readings.take(i for i, timestamp in enumerate(readings.timestamps) if index.add(timestamp))
+        if readings:
+            # Build a new series so callers holding the previous one are unaffected
+            self.readings = self.readings + readings
+            self._store.async_delay_save(self._data_to_save, SAVE_DELAY)
+        return readings
+
+    def async_add_window(self, start: float | None, end: float | None, readings: ReadingSeries) -> None:
+        """Checkpoint the sorted readings of the history window (start, end] and schedule a save.
+
+        Readings already stored in that window are replaced, None bounds are open.
+        """
+        timestamps = self.readings.timestamps
+        first = 0 if start is None else bisect_right(timestamps, start)
+        last = len(timestamps) if end is None else bisect_right(timestamps, end)
+        self.readings = self.readings[:first] + readings + self.readings[last:]
+        self.revision += 1
+        self._index = None
+        self.windows.append((start, end))
+        self._store.async_delay_save(self._data_to_save, SAVE_DELAY)
+
+    def async_merge(self, readings: ReadingSeries) -> ReadingSeries:
+        """Insert readings into free slots anywhere in the history and schedule a save.
+
+        Returns the readings that were actually new.
+        """
+        index = self.index
+        readings = readings.take(i for i, timestamp in enumerate(readings.timestamps) if index.add(timestamp))
+        if readings:
+            # Only the few new readings are placed, the stored ones are copied in runs
+            self.readings = self.readings.merged(readings.sorted())
+            self.revision += 1
+            self._store.async_delay_save(self._data_to_save, SAVE_DELAY)
+        return readings
+
+    def find_gaps(self) -> List[Tuple[float, float]]:
+        """Return the (first, last) epoch timestamps of the runs of missing readings.
+
+        The reporting resolution of the service is the most common spacing
+        between its recent readings.
+        """
+        timestamps = self.readings.timestamps
+        if len(timestamps) < 2:
+            return []
+        recent = timestamps[-1000:]
+        spacing = Counter(b - a for a, b in zip(recent, recent[1:])).most_common(1)[0][0]
+        if spacing <= 0 or spacing % SLOT_SECONDS:
+            return []
+        return self.index.missing(timestamps[0], timestamps[-1], int(spacing // SLOT_SECONDS))
+
+    def async_set_empty_gaps(self, empty_gaps: Dict[Tuple[float, float], Tuple[int, float]]) -> None:
+        """Replace the gaps the API returned nothing for and schedule a save if they changed."""
+        if empty_gaps != self.empty_gaps:
+            self.empty_gaps = empty_gaps
+            self._store.async_delay_save(self._data_to_save, SAVE_DELAY)
+
+    def async_finish_history(self) -> None:
+        """Mark the history as complete once all its windows are stored."""
+        self.complete = True
+        self.windows = []
+        self._store.async_delay_save(self._data_to_save, SAVE_DELAY)
+
+    async def async_remove(self) -> None:
+        """Remove the stored readings from disk."""
+        self.readings = ReadingSeries()
+        self.revision += 1
+        self._index = None
+        self.complete = False
+        self.windows = []
+        self.empty_gaps = {}
+        await self._store.async_remove()
+
+    def _data_to_save(self) -> Dict:
+        """Return the data to persist."""
+        return {
+            "complete": self.complete,
+            "last_id": self.last_id,
+            "last_timestamp": self.last_timestamp,
+            "windows": self.windows,
+            "empty_gaps": [[*gap, *retry] for gap, retry in self.empty_gaps.items()],
+            "readings": self.readings.as_dict(),
+        }
+
+
+class YoutiliticsMeterLedger:
+    """Readings counted into the meter total of a service, persisted with the total.
+
+    The total, the cost and the index of counted slots are saved together, so
+    a reading is never counted twice, whatever order syncs and backfills
+    deliver it in. Readings up to the legacy watermark are considered counted:
+    it is set when migrating a meter total restored from the state machine.
+    """
+
+    def __init__(self, hass: HomeAssistant, service_id: str) -> None:
+        """Initialize the meter ledger."""
+        self._store = Store(hass, STORAGE_VERSION, f"{LEDGER_STORAGE_KEY}.{service_id}")
+        self.index = ReadingIndex()
+        self.total = 0.0
+        self.cost = 0.0
+        self.watermark: float | None = None
+
+    async def async_load(self) -> bool:
+        """Load the ledger from disk. Returns False if none was saved yet."""
+        data = await self._store.async_load()
+        if data is None:
+            return False
+        self.index = ReadingIndex.from_dict(data["index"])
+        self.total = data["total"]
+        self.cost = data["cost"]
+        self.watermark = data["watermark"]
+        return True
+
+    async def async_remove(self) -> None:
+        """Remove the ledger from disk."""
+        self.index = ReadingIndex()
+        self.total = 0.0
+        self.cost = 0.0
+        self.watermark = None
+        await self._store.async_remove()
+
+    def async_migrate(self, total: float, watermark: float | None) -> None:
+        """Start from a meter total counted before the ledger existed, up to watermark."""
+        self.total = total
+        self.watermark = watermark
+        self._store.async_delay_save(self._data_to_save, SAVE_DELAY)
+
+    def async_ingest(self, readings: ReadingSeries) -> ReadingSeries:
+        """Count the readings not counted yet into the totals and schedule a save.
+
+        Returns the readings that were counted.
+        """
+        index = self.index
+        watermark = self.watermark
+        readings = readings.take(
+            i for i, timestamp in enumerate(readings.timestamps)
+            if (watermark is None or timestamp > watermark) and index.add(timestamp)
+        )
+        if readings:
+            self.total += sum(readings.readings)
+            self.cost += sum(readings.costs)
+            self._store.async_delay_save(self._data_to_save, SAVE_DELAY)
+        return readings
+
+    def _data_to_save(self) -> Dict:
+        """Return the data to persist."""
+        return {
+            "total": self.total,
+            "cost": self.cost,
+            "watermark": self.watermark,
+            "index": self.index.as_dict(),
+        }
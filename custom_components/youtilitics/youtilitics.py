@@ -1,32 +1,364 @@
 """Youtilitics API client."""
+import asyncio
+import codecs
+from contextlib import aclosing, asynccontextmanager
+from dataclasses import dataclass
+from datetime import timedelta
+from email.utils import parsedate_to_datetime
+import json
+import random
+import time
 from urllib.parse import urlencode
-from typing import List, Dict
+from typing import Any, AsyncContextManager, AsyncIterator, Awaitable, Callable, List, Dict
 
-from homeassistant.helpers.config_entry_oauth2_flow import OAuth2Session
+from aiohttp import ClientError, ClientResponse, ClientTimeout, hdrs
+
+from homeassistant.helpers.singleton import singleton
 from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+
+from .const import DOMAIN, LOGGER, API_URL
+from .models import ServiceType, Account, Reading, ReadingSeries
+from .oauth import YoutiliticsOAuth2Session
+from .profiler import PHASE_DECODE, PHASE_HTTP, YoutiliticsProfiler
 
-from .const import LOGGER, API_URL
-from .models import ServiceType, Account, Reading
+# Bytes read from the response per iteration when streaming
+STREAM_READ_SIZE = 64 * 1024
+# Readings per series chunk yielded when streaming
+STREAM_BATCH_SIZE = 2000
+# Response chunks smaller than this are decoded on the loop, the executor hop would cost more
+EXECUTOR_MIN_BYTES = 16 * 1024
+# Responses without ETag/Last-Modified validators are reused for this long
+HTTP_CACHE_TTL = timedelta(minutes=15)
+# A response that does not start within these delays is retried; the total is
+# unbounded because bulk readings can take a while to stream
+REQUEST_TIMEOUT = ClientTimeout(total=None, sock_connect=30, sock_read=60)
+# Attempts of a request failing with a 5xx, a 429 or a network error
+MAX_ATTEMPTS = 4
+# Bounds of the exponential backoff between attempts (full jitter)
+BACKOFF_BASE = timedelta(seconds=2)
+BACKOFF_MAX = timedelta(minutes=1)
+# A Retry-After longer than this is not waited for, the API is considered down until then
+MAX_RETRY_AFTER = timedelta(minutes=2)
+# Requests per second and burst size allowed by the limiter shared by all entries
+RATE_LIMIT = 2.0
+RATE_BURST = 10
+# Consecutive failed attempts opening the circuit, and how long it stays open
+BREAKER_THRESHOLD = 5
+BREAKER_RESET = timedelta(minutes=5)
+# Requests open at the same time across all entries, streamed responses hold theirs until read
+MAX_CONCURRENT_REQUESTS = 8
+
+DATA_CLIENT_POOL = f"{DOMAIN}_client_pool"
 
 class YoutiliticsApiError(Exception):
     """Base class for Youtilitics API errors."""
 
+class YoutiliticsApiUnavailable(YoutiliticsApiError):
+    """The API is considered down, requests are paused."""
+
+    def __init__(self, retry_in: float) -> None:
+        """Initialize the error with the seconds until requests resume."""
+        super().__init__(f"Youtilitics API unavailable, retrying in {retry_in:.0f}s")
+        self.retry_in = retry_in
+
+class _TokenBucket:
+    """Limit the rate of requests, allowing short bursts."""
+
+    def __init__(self, rate: float, capacity: int) -> None:
+        """Initialize a full bucket."""
+        self._rate = rate
+        self._capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def async_acquire(self) -> None:
+        """Wait until a request is allowed."""
+        async with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self._capacity, self._tokens + (now - self._updated) * self._rate)
+            self._updated = now
+            if self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self._rate)
+                self._updated = time.monotonic()
+                self._tokens = 1.0
+            self._tokens -= 1
+
+class _CircuitBreaker:
+    """Stop sending requests while the API keeps failing.
+
+    After BREAKER_THRESHOLD consecutive failures the circuit opens and
+    requests fail fast. Once open_until has passed a single probe request is
+    let through; its success closes the circuit, its failure reopens it.
+    """
+
+    def __init__(self) -> None:
+        """Initialize a closed circuit."""
+        self._failures = 0
+        self._open_until = 0.0
+        self._probing = False
+
+    def retry_in(self) -> float:
+        """Return the seconds until requests are allowed again, 0 if they are."""
+        return max(0.0, self._open_until - time.monotonic())
+
+    def check(self) -> None:
+        """Raise if the request must not be sent."""
+        if retry_in := self.retry_in():
+            raise YoutiliticsApiUnavailable(retry_in)
+        if self._failures >= BREAKER_THRESHOLD:
+            if self._probing:
+                raise YoutiliticsApiUnavailable(0)
+            self._probing = True
+
+    def record_success(self) -> None:
+        """Close the circuit."""
+        if self._failures >= BREAKER_THRESHOLD:
+            LOGGER.info("Youtilitics API is back, resuming requests")
+        self._failures = 0
+        self._probing = False
+
+    def release_probe(self) -> None:
+        """Let another request probe the API, this one did not tell whether it is up."""
+        self._probing = False
+
+    def record_failure(self) -> None:
+        """Count a failure, opening the circuit past the threshold."""
+        self._failures += 1
+        self._probing = False
+        if self._failures >= BREAKER_THRESHOLD:
+            self.open(BREAKER_RESET.total_seconds())
+
+    def open(self, duration: float) -> None:
+        """Pause requests for duration seconds."""
+        if time.monotonic() + duration > self._open_until:
+            LOGGER.warning("Youtilitics API unavailable, pausing requests for %.0fs", duration)
+            self._open_until = time.monotonic() + duration
+        self._failures = max(self._failures, BREAKER_THRESHOLD)
+
+def _retry_after(response: ClientResponse) -> float | None:
+    """Return the delay requested by the Retry-After header, in seconds."""
+    value = response.headers.get(hdrs.RETRY_AFTER)
+    if value is None:
+        return None
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=dt_util.UTC)
+    return max(0.0, (when - dt_util.utcnow()).total_seconds())
+
+class YoutiliticsRequestPolicy:
+    """Rate limiting, concurrency, retries and circuit breaking shared by every client.
+
+    5xx responses and network errors are retried with exponential backoff and
+    full jitter, 429 responses after their Retry-After delay. Every attempt
+    goes through a single token bucket and circuit breaker, so the entries and
+    services syncing at the same time cannot turn an outage into a retry storm.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the request policy."""
+        self.bucket = _TokenBucket(RATE_LIMIT, RATE_BURST)
+        self.breaker = _CircuitBreaker()
+        self.slots = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+
+    @asynccontextmanager
+    async def async_open(self, path: str, send: Callable[[], Awaitable[ClientResponse]]) -> AsyncIterator[ClientResponse]:
+        """Send a request in one of the concurrency slots, held until the response is released."""
+        async with self.slots:
+            response = await self.async_request(path, send)
+            try:
+                yield response
+            finally:
+                response.release()
+
+    async def async_request(self, path: str, send: Callable[[], Awaitable[ClientResponse]]) -> ClientResponse:
+        """Send a request, retrying it as allowed. The caller must release the response."""
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            self.breaker.check()
+            await self.bucket.async_acquire()
+            delay = min(BACKOFF_MAX.total_seconds(), BACKOFF_BASE.total_seconds() * 2 ** (attempt - 1))
+            delay = random.uniform(0, delay)
+            try:
+                response = await send()
+            except (ClientError, TimeoutError) as err:
+                self.breaker.record_failure()
+                if attempt == MAX_ATTEMPTS:
+                    raise YoutiliticsApiError(f"Error fetching data from {path}: {err!r}") from err
+                LOGGER.debug("Request to %s failed (%r), retrying in %.1fs", path, err, delay)
+                await asyncio.sleep(delay)
+                continue
+            except BaseException:
+                self.breaker.release_probe()
+                raise
+            if response.status == 429:
+                self.breaker.release_probe()
+                retry_after = _retry_after(response)
+                if retry_after is not None:
+                    if retry_after > MAX_RETRY_AFTER.total_seconds():
+                        self.breaker.open(retry_after)
+                        response.release()
+                        raise YoutiliticsApiUnavailable(retry_after)
+                    delay = retry_after
+            elif response.status >= 500:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+                return response
+            if attempt == MAX_ATTEMPTS:
+                return response
+            LOGGER.debug("Request to %s returned %s, retrying in %.1fs", path, response.status, delay)
+            response.release()
+            await asyncio.sleep(delay)
+        raise AssertionError("unreachable")
+
+
+class _JsonArrayDecoder:
+    """Incrementally decode the items of a JSON array from chunks of bytes.
+
+    Only the undecoded remainder of the body is buffered, so memory stays
+    bounded by the size of a single item plus one chunk. Decoding is pure
+    CPU work, so chunks can be fed from an executor thread.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the decoder."""
+        self._decoder = json.JSONDecoder()
+        self._text_decoder = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._started = False
+        self.done = False
+
+    def feed(self, chunk: bytes) -> List[Any]:
+        """Return the items completed by a chunk of the body."""
+        buffer = self._buffer + self._text_decoder.decode(chunk)
+        position = 0
+        items = []
+        while not self.done:
+            while position < len(buffer) and buffer[position] in " \t\r\n,":
+                position += 1
+            if position == len(buffer):
+                break
+            if not self._started:
+                if buffer[position] != "[":
+                    raise YoutiliticsApiError("Expected a JSON array in the response")
+                self._started = True
+                position += 1
+                continue
+            if buffer[position] == "]":
+                self.done = True
+                break
+            try:
+                item, position = self._decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                # Item split across chunks, wait for more data
+                break
+            items.append(item)
+        self._buffer = buffer[position:]
+        return items
+
+def _decode_readings(decoder: _JsonArrayDecoder, chunk: bytes) -> ReadingSeries:
+    """Decode the readings completed by a chunk of a bulk readings response."""
+    return ReadingSeries.from_dicts(decoder.feed(chunk))
+
+@dataclass
+class _CachedResponse:
+    """Parsed response of a GET request, with its validators."""
+    data: Any
+    etag: str | None
+    last_modified: str | None
+    fetched_at: float
+
+    @property
+    def has_validators(self) -> bool:
+        """Return whether the response can be revalidated with a conditional request."""
+        return self.etag is not None or self.last_modified is not None
+
 class YoutiliticsApiClient:
     """Class to manage fetching Youtilitics data."""
 
-    def __init__(self, hass: HomeAssistant, entry, implementation) -> None:
+    def __init__(self, hass: HomeAssistant, entry, implementation, profiler: YoutiliticsProfiler | None = None) -> None:
         """Initialize the API client."""
-        self.oauth_session = OAuth2Session(hass, entry, implementation)
+        self.oauth_session = YoutiliticsOAuth2Session(hass, entry, implementation)
         self.hass = hass
-        self._bulk_readings: Dict[str, List[Reading]] = {}  # Store readings per service
+        self.profiler = profiler or YoutiliticsProfiler()
+        self.policy = get_client_pool(hass).policy
+        self._http_cache: Dict[str, _CachedResponse] = {}
+        # hits: served without a request, revalidated: 304 Not Modified, misses: full response
+        self.cache_stats = {"hits": 0, "revalidated": 0, "misses": 0}
 
-    async def _get(self, path: str) -> Dict:
-        """Make HTTP request to Youtilitics."""
-        async with await self.oauth_session.async_request('GET', f"{API_URL}/{path}") as response:
+    async def _get(self, path: str) -> Any:
+        """Make HTTP request to Youtilitics.
+
+        Responses are cached per path: they are revalidated with a conditional
+        request when the server sent validators, and reused for HTTP_CACHE_TTL
+        otherwise.
+        """
+        cached = self._http_cache.get(path)
+        headers = {}
+        if cached is not None:
+            if not cached.has_validators:
+                if time.monotonic() - cached.fetched_at < HTTP_CACHE_TTL.total_seconds():
+                    self.cache_stats["hits"] += 1
+                    return cached.data
+            else:
+                if cached.etag is not None:
+                    headers[hdrs.IF_NONE_MATCH] = cached.etag
+                if cached.last_modified is not None:
+                    headers[hdrs.IF_MODIFIED_SINCE] = cached.last_modified
+
+        async with self._request(path, headers) as response:
+            if response.status == 304 and cached is not None:
+                self.cache_stats["revalidated"] += 1
+                cached.fetched_at = time.monotonic()
+                return cached.data
             if response.status != 200:
                 body = await response.text()
                 raise YoutiliticsApiError(f"Error fetching data from {path}: {response.status} - {body}")
-            return await response.json()
+            data = await response.json()
+            self.cache_stats["misses"] += 1
+            self._http_cache[path] = _CachedResponse(
+                data,
+                response.headers.get(hdrs.ETAG),
+                response.headers.get(hdrs.LAST_MODIFIED),
+                time.monotonic(),
+            )
+        LOGGER.debug("HTTP cache stats: %s", self.cache_stats)
+        return data
+
+    def _request(self, path: str, headers: Dict[str, str] | None = None) -> AsyncContextManager[ClientResponse]:
+        """Send a GET request through the shared request policy."""
+        return self.policy.async_open(
+            path,
+            lambda: self.oauth_session.async_request(
+                'GET', f"{API_URL}/{path}", headers=headers or {}, timeout=REQUEST_TIMEOUT
+            ),
+        )
+
+    async def _stream_chunks(self, path: str) -> AsyncIterator[bytes]:
+        """Make HTTP request to Youtilitics and yield the response body as it arrives."""
+        async with self._request(path) as response:
+            if response.status != 200:
+                body = await response.text()
+                raise YoutiliticsApiError(f"Error fetching data from {path}: {response.status} - {body}")
+            async for chunk in response.content.iter_chunked(STREAM_READ_SIZE):
+                yield chunk
+
+    async def _stream(self, path: str) -> AsyncIterator[Any]:
+        """Make HTTP request to Youtilitics and decode the JSON array response as it arrives."""
+        decoder = _JsonArrayDecoder()
+        async with aclosing(self._stream_chunks(path)) as chunks:
+            async for chunk in chunks:
+                for item in decoder.feed(chunk):
+                    yield item
+                if decoder.done:
+                    return
+        raise YoutiliticsApiError("Truncated JSON array in the response")
 
     async def services(self) -> List[Account]:
         """Fetch services."""
@@ -38,18 +370,101 @@ class YoutiliticsApiClient:
         data = await self._get("utilities/services")
         return ServiceType.from_dict(data)
 
-    async def get_bulk_readings(self, service_id: str, state: str | None) -> List[Reading]:
-        """Fetch bulk readings from a service."""
+    async def iter_bulk_readings(self, service_id: str, state: str | None) -> AsyncIterator[ReadingSeries]:
+        """Stream bulk readings from a service as series chunks.
+
+        The body is decoded chunk by chunk in the executor, the loop only
+        waits on the response. Waiting is profiled as the HTTP phase and
+        decoding as the decode one.
+        """
         LOGGER.info("Loading bulk readings for %s since %s", service_id, state)
         url = f"services/{service_id}"
         if state is not None:
             query = urlencode({"last": state})
             url += f"?{query}"
-        data = await self._get(url)
-        readings = [Reading.from_dict(item) for item in data]
-        self._bulk_readings[service_id] = readings
+        decoder = _JsonArrayDecoder()
+        batch = ReadingSeries()
+        waiting = 0.0
+        resumed = time.perf_counter()
+        try:
+            async with aclosing(self._stream_chunks(url)) as chunks:
+                async for chunk in chunks:
+                    waiting += time.perf_counter() - resumed
+                    batch.extend(await self.profiler.async_run_stage(
+                        self.hass, service_id, PHASE_DECODE, len(chunk) < EXECUTOR_MIN_BYTES,
+                        _decode_readings, decoder, chunk,
+                    ))
+                    if len(batch) >= STREAM_BATCH_SIZE:
+                        yield batch
+                        batch = ReadingSeries()
+                    if decoder.done:
+                        break
+                    resumed = time.perf_counter()
+                else:
+                    waiting += time.perf_counter() - resumed
+        finally:
+            self.profiler.add(service_id, PHASE_HTTP, waiting)
+        if not decoder.done:
+            raise YoutiliticsApiError("Truncated JSON array in the response")
+        if batch:
+            yield batch
+
+    async def get_bulk_readings(self, service_id: str, state: str | None) -> ReadingSeries:
+        """Fetch bulk readings from a service."""
+        readings = ReadingSeries()
+        async for chunk in self.iter_bulk_readings(service_id, state):
+            readings.extend(chunk)
         return readings
 
-    def get_readings(self, service_id: str) -> List[Reading]:
-        """Get stored readings for a given service_id."""
-        return self._bulk_readings.get(service_id, [])
\ No newline at end of file
+    async def get_readings_window(self, service_id: str, state: str | None, until: float | None) -> ReadingSeries:
+        """Fetch the readings of a service after state and up to an epoch timestamp.
+
+        Readings come in ascending order, so the response is closed as soon as
+        it goes past until instead of downloading the rest of the history.
+        """
+        readings = ReadingSeries()
+        async with aclosing(self.iter_bulk_readings(service_id, state)) as chunks:
+            async for chunk in chunks:
+                if until is None or chunk.timestamps[-1] <= until:
+                    readings.extend(chunk)
+                    continue
+                readings.extend(chunk.take(i for i, timestamp in enumerate(chunk.timestamps) if timestamp <= until))
+                break
+        return readings
+
+    async def get_first_reading_timestamp(self, service_id: str) -> float | None:
+        """Return the epoch timestamp of the oldest reading of a service."""
+        async with aclosing(self._stream(f"services/{service_id}")) as items:
+            async for item in items:
+                return Reading.from_dict(item).timestamp.timestamp()
+        return None
+
+class YoutiliticsClientPool:
+    """API clients of every config entry, sharing one request policy.
+
+    All requests go through Home Assistant's shared aiohttp session and a
+    single policy, so the rate, concurrency and circuit breaking budgets are
+    global however many accounts are configured.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the client pool."""
+        self.hass = hass
+        self.policy = YoutiliticsRequestPolicy()
+        self.clients: Dict[str, YoutiliticsApiClient] = {}
+
+    def async_create_client(
+        self, entry, implementation, profiler: YoutiliticsProfiler | None = None
+    ) -> YoutiliticsApiClient:
+        """Create the client of a config entry."""
+        client = self.clients[entry.entry_id] = YoutiliticsApiClient(self.hass, entry, implementation, profiler)
+        return client
+
+    def async_remove_client(self, entry_id: str) -> None:
+        """Forget the client of an unloaded config entry."""
+        self.clients.pop(entry_id, None)
+
+@singleton(DATA_CLIENT_POOL)
+def get_client_pool(hass: HomeAssistant) -> YoutiliticsClientPool:
+    """Return the client pool shared by all config entries."""
+    return YoutiliticsClientPool(hass)
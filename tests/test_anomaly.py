@@ -0,0 +1,97 @@
+"""Tests of the usage spike and leak detection."""
+from datetime import datetime, timedelta, timezone
+
+from custom_components.youtilitics.anomaly import (
+    ANOMALY_LEAK,
+    ANOMALY_SPIKE,
+    MIN_FLOW_ALPHA,
+    YoutiliticsAnomalyDetector,
+)
+from custom_components.youtilitics.models import ReadingSeries
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+READINGS_PER_DAY = 96
+
+
+def _series(values, first=0, unit="L"):
+    """Return 15-minute readings of values, the first one in slot first from START."""
+    return ReadingSeries.from_dicts([
+        {
+            "id": first + i,
+            "timestamp": (START + timedelta(minutes=15 * (first + i))).isoformat(),
+            "reading": value,
+            "unit": unit,
+            "raw_reading": value,
+            "raw_unit": unit,
+            "cost": 0.0,
+        }
+        for i, value in enumerate(values)
+    ])
+
+
+def _normal_days(days):
+    """Return the readings of days with no flow for two hours each night, 5 to 7 L the rest of the day."""
+    return [0.0 if i % READINGS_PER_DAY < 8 else 5.0 + i % 3 for i in range(days * READINGS_PER_DAY)]
+
+
+def test_seeding_is_silent_then_spikes_are_reported():
+    """Seeding reports nothing, a reading far above its hour of day is a spike."""
+    history = _normal_days(14)
+    detector = YoutiliticsAnomalyDetector.from_history("L", 1, _series(history))
+    assert detector.revision == 1
+    assert detector.spike is None
+    assert detector.leak_since is None
+    assert detector.usual_min_flow.mean == 0.0
+
+    anomalies = detector.add(_series([6.0, 200.0, 6.0], first=len(history)))
+    assert [anomaly.kind for anomaly in anomalies] == [ANOMALY_SPIKE]
+    assert anomalies[0].value == 200.0
+    assert detector.spike is None
+    assert detector.last_spike.value == 200.0
+    # Readings already processed are skipped
+    assert detector.add(_series(history)) == []
+
+
+def test_leak_on_then_off():
+    """A flow that never stops for a day is a leak, until it stops."""
+    history = _normal_days(14)
+    detector = YoutiliticsAnomalyDetector.from_history("L", 1, _series(history))
+    anomalies = detector.add(_series([5.0] * READINGS_PER_DAY, first=len(history)))
+    assert [anomaly.kind for anomaly in anomalies] == [ANOMALY_LEAK]
+    assert detector.leak_since is not None
+    detector.add(_series([0.0], first=len(history) + READINGS_PER_DAY))
+    assert detector.leak_since is None
+
+
+def test_steady_leak_does_not_become_usual():
+    """A constant leak lasting well beyond the time the usual minimum takes to adapt stays a leak."""
+    history = _normal_days(30)
+    detector = YoutiliticsAnomalyDetector.from_history("L", 1, _series(history))
+    usual = detector.usual_min_flow.mean
+    # Without freezing, the usual minimum would pass half the leak flow in about 1 / MIN_FLOW_ALPHA days
+    days = int(5 / MIN_FLOW_ALPHA)
+    anomalies = detector.add(_series([3.0] * days * READINGS_PER_DAY, first=len(history)))
+    assert [anomaly.kind for anomaly in anomalies] == [ANOMALY_LEAK]
+    assert detector.leak_since == anomalies[0].timestamp
+    assert detector.min_flow == 3.0
+    assert detector.usual_min_flow.mean == usual
+
+    # Once the leak is fixed the usual minimum learns again
+    detector.add(_series(_normal_days(2), first=len(history) + days * READINGS_PER_DAY))
+    assert detector.leak_since is None
+
+
+def test_gap_restarts_the_window():
+    """Readings further apart than the maximum gap do not make a continuous flow."""
+    detector = YoutiliticsAnomalyDetector.from_history("L", 1, _series([5.0] * 50))
+    assert detector.add(_series([5.0] * 50, first=60)) == []
+    assert detector.leak_since is None
+    assert detector.min_flow is None
+
+
+def test_energy_is_not_checked_for_leaks():
+    """A constant electricity usage is not a leak."""
+    detector = YoutiliticsAnomalyDetector.from_history("kWh", 1, _series([5.0] * 200, unit="kWh"))
+    assert not detector.checks_leaks
+    assert detector.min_flow is None
+    assert detector.leak_since is None
@@ -0,0 +1,50 @@
+"""Tests of the incremental JSON array decoder of streamed responses."""
+import json
+
+import pytest
+
+from custom_components.youtilitics.youtilitics import YoutiliticsApiError, _JsonArrayDecoder
+
+ITEMS = [
+    {"id": 1, "timestamp": "2024-01-01T00:15:00+00:00", "reading": 0.25, "unit": "kWh"},
+    {"id": 2, "timestamp": "2024-01-01T00:30:00+00:00", "reading": 1.5, "unit": "m³"},
+    {"id": 3, "note": "split [brackets], \"quotes\" and commas", "reading": -2e-3},
+]
+
+
+def _feed(body: bytes, size: int) -> tuple[list, _JsonArrayDecoder]:
+    """Feed a body to a decoder in chunks of a size."""
+    decoder = _JsonArrayDecoder()
+    items = []
+    for start in range(0, len(body), size):
+        items.extend(decoder.feed(body[start:start + size]))
+    return items, decoder
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64, 100000])
+def test_items_split_across_chunks(size):
+    """Items are decoded whatever the chunk boundaries, including inside multi-byte characters."""
+    body = json.dumps(ITEMS, ensure_ascii=False, indent=1).encode()
+    items, decoder = _feed(body, size)
+    assert items == ITEMS
+    assert decoder.done
+
+
+def test_empty_array():
+    """An empty array yields nothing and completes."""
+    items, decoder = _feed(b" [ ] ", 1)
+    assert items == []
+    assert decoder.done
+
+
+def test_incomplete_array():
+    """A truncated body is not done, and its partial item is not yielded."""
+    items, decoder = _feed(json.dumps(ITEMS).encode()[:-10], 5)
+    assert items == ITEMS[:2]
+    assert not decoder.done
+
+
+def test_not_an_array():
+    """A body that is not a JSON array is an API error."""
+    with pytest.raises(YoutiliticsApiError):
+        _JsonArrayDecoder().feed(b'{"error": "nope"}')
@@ -0,0 +1,94 @@
+"""Tests of the conditional GET cache of the API client."""
+import asyncio
+from unittest.mock import patch
+
+from multidict import CIMultiDict
+
+from custom_components.youtilitics.youtilitics import (
+    HTTP_CACHE_TTL,
+    YoutiliticsApiClient,
+    YoutiliticsRequestPolicy,
+)
+
+
+class FakeResponse:
+    """Response of the fake OAuth session."""
+
+    def __init__(self, status, data=None, headers=None):
+        """Initialize the response."""
+        self.status = status
+        self.data = data
+        self.headers = CIMultiDict(headers or {})
+
+    async def json(self):
+        """Return the body."""
+        return self.data
+
+    async def text(self):
+        """Return the body as text."""
+        return str(self.data)
+
+    def release(self):
+        """Release the connection."""
+
+
+class FakeSession:
+    """OAuth session replaying responses and recording the request headers."""
+
+    def __init__(self, *responses):
+        """Initialize the session."""
+        self.responses = list(responses)
+        self.headers = []
+
+    async def async_request(self, method, url, headers=None, timeout=None):
+        """Return the next response."""
+        self.headers.append(dict(headers))
+        return self.responses.pop(0)
+
+
+def _client(*responses) -> YoutiliticsApiClient:
+    """Return an API client talking to a fake session, outside Home Assistant."""
+    client = YoutiliticsApiClient.__new__(YoutiliticsApiClient)
+    client.oauth_session = FakeSession(*responses)
+    client.policy = YoutiliticsRequestPolicy()
+    client._http_cache = {}
+    client.cache_stats = {"hits": 0, "revalidated": 0, "misses": 0}
+    return client
+
+
+def test_revalidated_with_etag():
+    """A response with an ETag is revalidated, and a 304 serves the cached body."""
+    client = _client(
+        FakeResponse(200, [1], {"ETag": '"v1"', "Last-Modified": "Mon, 01 Jan 2024 00:00:00 GMT"}),
+        FakeResponse(304),
+        FakeResponse(200, [2], {"ETag": '"v2"'}),
+        FakeResponse(304),
+    )
+
+    async def run():
+        return [await client._get("services") for _ in range(4)]
+
+    assert asyncio.run(run()) == [[1], [1], [2], [2]]
+    assert client.oauth_session.headers == [
+        {},
+        {"If-None-Match": '"v1"', "If-Modified-Since": "Mon, 01 Jan 2024 00:00:00 GMT"},
+        {"If-None-Match": '"v1"', "If-Modified-Since": "Mon, 01 Jan 2024 00:00:00 GMT"},
+        {"If-None-Match": '"v2"'},
+    ]
+    assert client.cache_stats == {"hits": 0, "revalidated": 2, "misses": 2}
+
+
+def test_reused_without_validators_until_ttl():
+    """A response without validators is reused without a request until HTTP_CACHE_TTL."""
+    now = 1000.0
+
+    async def run():
+        return [await client._get("utilities/services") for _ in range(2)]
+
+    with patch("custom_components.youtilitics.youtilitics.time.monotonic", lambda: now):
+        client = _client(FakeResponse(200, {"a": 1}), FakeResponse(200, {"a": 2}))
+        assert asyncio.run(run()) == [{"a": 1}, {"a": 1}]
+        now += HTTP_CACHE_TTL.total_seconds()
+        assert asyncio.run(client._get("utilities/services")) == {"a": 2}
+    assert client.oauth_session.headers == [{}, {}]
+    assert client.cache_stats == {"hits": 1, "revalidated": 0, "misses": 2}
@@ -0,0 +1,55 @@
+"""Tests of the reading slot index."""
+from custom_components.youtilitics.index import SLOT_SECONDS, SLOTS_PER_DAY, ReadingIndex
+
+DAY = SLOT_SECONDS * SLOTS_PER_DAY
+# Midnight UTC, so days of the index line up with the slots below
+START = 1_700_006_400
+
+
+def _slots(*numbers):
+    """Return the epoch timestamps of slots numbered from START."""
+    return [START + n * SLOT_SECONDS for n in numbers]
+
+
+def test_add_and_contains():
+    """A slot is set once, whatever the second within it."""
+    index = ReadingIndex()
+    assert index.add(START)
+    assert not index.add(START + SLOT_SECONDS - 1)
+    assert START + 60 in index
+    assert START + SLOT_SECONDS not in index
+    assert len(index) == 1
+
+
+def test_missing_runs():
+    """Runs of unset slots are returned with their first and last slot, both bounds included."""
+    index = ReadingIndex.from_timestamps(_slots(0, 1, 4, 5, 9))
+    assert index.missing(*_slots(0, 9)) == [tuple(_slots(2, 3)), tuple(_slots(6, 8))]
+    assert index.missing(*_slots(0, 1)) == []
+    # A run still open at the end is returned up to end
+    assert index.missing(*_slots(4, 12)) == [tuple(_slots(6, 8)), tuple(_slots(10, 12))]
+
+
+def test_missing_across_full_days():
+    """Full days are skipped and runs spanning midnight are returned whole."""
+    timestamps = _slots(*range(3 * SLOTS_PER_DAY))
+    del timestamps[SLOTS_PER_DAY * 2 - 2:SLOTS_PER_DAY * 2 + 3]
+    index = ReadingIndex.from_timestamps(timestamps)
+    assert index.missing(START, START + 3 * DAY - SLOT_SECONDS) == [
+        tuple(_slots(SLOTS_PER_DAY * 2 - 2, SLOTS_PER_DAY * 2 + 2))
+    ]
+
+
+def test_missing_with_step():
+    """Services reporting hourly only expect every fourth slot."""
+    index = ReadingIndex.from_timestamps(_slots(0, 4, 16, 20))
+    assert index.missing(*_slots(0, 20), step=4) == [tuple(_slots(8, 12))]
+    assert index.missing(*_slots(0, 20)) != [tuple(_slots(8, 12))]
+
+
+def test_dict_round_trip():
+    """The index survives serialization."""
+    index = ReadingIndex.from_timestamps(_slots(0, 95, 96, 500))
+    restored = ReadingIndex.from_dict(index.as_dict())
+    assert len(restored) == 4
+    assert restored.missing(*_slots(0, 500)) == index.missing(*_slots(0, 500))
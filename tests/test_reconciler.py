@@ -0,0 +1,110 @@
+"""Tests of the reconciliation of entities with the services of the accounts."""
+from types import SimpleNamespace
+
+import pytest
+
+from custom_components.youtilitics.entity import RETIRE_AFTER_REFRESHES, YoutiliticsEntityReconciler
+from custom_components.youtilitics.models import Account, ServiceType
+
+
+class FakeEntity:
+    """Entity recording whether its service is missing."""
+
+    def __init__(self, service_id):
+        self.service_id = service_id
+        self.missing = False
+
+    def async_set_service_missing(self, missing):
+        self.missing = missing
+
+
+class FakeReconciler(YoutiliticsEntityReconciler):
+    """Reconciler creating one fake entity per service, recording the removed services."""
+
+    def __init__(self, coordinator):
+        super().__init__(None, SimpleNamespace(async_create_background_task=self._run), coordinator, None)
+        self.removed = []
+
+    def _run(self, hass, target, name):
+        target.close()
+
+    def _create_service_entities(self, account, service, service_type, unit):
+        entities = self._entities[service.id] = [FakeEntity(service.id)]
+        return entities
+
+    def _async_service_removed(self, service_id):
+        self.removed.append(service_id)
+
+
+def _coordinator(*service_ids):
+    """Return a coordinator whose last refresh found water services with the given ids."""
+    held = []
+    return SimpleNamespace(
+        last_update_success=True,
+        data=_data(*service_ids),
+        readings=SimpleNamespace(held=held, hold_service=held.append),
+    )
+
+
+def _data(*service_ids):
+    """Return coordinator data holding water services with the given ids."""
+    return {
+        "service_types": ServiceType(electricity=1, gas=2, water=3),
+        "services": [Account.from_dict({
+            "id": "account",
+            "utility": {"id": "u", "slug": "u", "name": "Utility", "services": [3]},
+            "services": [{"id": service_id, "type": 3, "remote_id": service_id} for service_id in service_ids],
+        })],
+    }
+
+
+def test_reconciler_is_abstract():
+    """Platforms must create the entities of a service."""
+    with pytest.raises(TypeError):
+        YoutiliticsEntityReconciler(None, None, _coordinator(), None)
+
+
+def test_missing_service_is_retired_after_several_refreshes():
+    """A service left out of a few refreshes is only unavailable, then retired."""
+    coordinator = _coordinator("s-1", "s-2")
+    reconciler = FakeReconciler(coordinator)
+    reconciler.async_create_entities()
+    assert coordinator.readings.held == ["s-1", "s-2"]
+    entity = reconciler._entities["s-2"][0]
+
+    coordinator.data = _data("s-1")
+    for _ in range(RETIRE_AFTER_REFRESHES - 1):
+        reconciler.async_reconcile()
+        assert entity.missing
+        assert "s-2" in reconciler._entities
+    assert not reconciler.removed
+
+    reconciler.async_reconcile()
+    assert reconciler.removed == ["s-2"]
+    assert set(reconciler._entities) == {"s-1"}
+
+
+def test_service_back_before_retirement_keeps_its_entities():
+    """A service back in a refresh is available again and its count starts over."""
+    coordinator = _coordinator("s-1")
+    reconciler = FakeReconciler(coordinator)
+    reconciler.async_create_entities()
+    entity = reconciler._entities["s-1"][0]
+
+    coordinator.data = _data()
+    reconciler.async_reconcile()
+    assert entity.missing
+    # A failed refresh says nothing about the services
+    coordinator.last_update_success = False
+    reconciler.async_reconcile()
+    coordinator.last_update_success = True
+    coordinator.data = _data("s-1")
+    reconciler.async_reconcile()
+    assert not entity.missing
+    assert reconciler._entities["s-1"] == [entity]
+    assert coordinator.readings.held == ["s-1"]
+
+    coordinator.data = _data()
+    for _ in range(RETIRE_AFTER_REFRESHES - 1):
+        reconciler.async_reconcile()
+    assert not reconciler.removed
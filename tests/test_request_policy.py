@@ -0,0 +1,188 @@
+"""Tests of the retries and circuit breaker of the API request policy, and of how failed syncs are logged."""
+import asyncio
+import logging
+from unittest.mock import patch
+
+from multidict import CIMultiDict
+import pytest
+
+from homeassistant.exceptions import ConfigEntryAuthFailed
+
+from custom_components.youtilitics import youtilitics
+from custom_components.youtilitics.scheduler import YoutiliticsSyncScheduler
+from custom_components.youtilitics.youtilitics import (
+    BREAKER_RESET,
+    BREAKER_THRESHOLD,
+    MAX_ATTEMPTS,
+    YoutiliticsApiUnavailable,
+    YoutiliticsRequestPolicy,
+    _CircuitBreaker,
+)
+
+
+class FakeResponse:
+    """Response with a status and headers."""
+
+    def __init__(self, status, headers=None):
+        """Initialize the response."""
+        self.status = status
+        self.headers = CIMultiDict(headers or {})
+
+    def release(self):
+        """Release the connection."""
+
+
+class FakeClock:
+    """Monotonic clock advanced by hand."""
+
+    def __init__(self):
+        """Initialize the clock."""
+        self.now = 1000.0
+
+    def __call__(self):
+        """Return the current time."""
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    """Freeze the monotonic clock of the API module."""
+    clock = FakeClock()
+    with patch.object(youtilitics.time, "monotonic", clock):
+        yield clock
+
+
+def _sender(*statuses):
+    """Return a send function answering with statuses in turn, and the list of statuses sent."""
+    sent = []
+
+    async def send():
+        status = statuses[len(sent)]
+        sent.append(status)
+        return FakeResponse(status)
+
+    return send, sent
+
+
+def test_breaker_transitions(clock):
+    """The breaker opens after BREAKER_THRESHOLD failures, lets one probe through, then closes or reopens."""
+    breaker = _CircuitBreaker()
+    for _ in range(BREAKER_THRESHOLD - 1):
+        breaker.check()
+        breaker.record_failure()
+    breaker.check()
+    breaker.record_failure()
+    with pytest.raises(YoutiliticsApiUnavailable) as err:
+        breaker.check()
+    assert err.value.retry_in == BREAKER_RESET.total_seconds()
+
+    # Half open: a single probe at a time
+    clock.now += BREAKER_RESET.total_seconds()
+    breaker.check()
+    with pytest.raises(YoutiliticsApiUnavailable):
+        breaker.check()
+    # A failed probe reopens the circuit
+    breaker.record_failure()
+    assert breaker.retry_in() == BREAKER_RESET.total_seconds()
+
+    # A successful probe closes it
+    clock.now += BREAKER_RESET.total_seconds()
+    breaker.check()
+    breaker.record_success()
+    breaker.check()
+    breaker.check()
+
+
+def test_released_probe_lets_another_through(clock):
+    """A probe that did not tell whether the API is up lets the next request probe."""
+    breaker = _CircuitBreaker()
+    breaker.open(60)
+    clock.now += 60
+    breaker.check()
+    breaker.release_probe()
+    breaker.check()
+
+
+def test_policy_retries_then_opens(clock):
+    """5xx responses are retried, and enough of them open the circuit for every caller."""
+    policy = YoutiliticsRequestPolicy()
+
+    async def no_sleep(delay):
+        pass
+
+    async def run():
+        send, sent = _sender(503, 200)
+        assert (await policy.async_request("services", send)).status == 200
+        assert sent == [503, 200]
+
+        send, sent = _sender(*[500] * MAX_ATTEMPTS)
+        assert (await policy.async_request("services", send)).status == 500
+        assert len(sent) == MAX_ATTEMPTS
+
+        send, sent = _sender(*[500] * MAX_ATTEMPTS)
+        with pytest.raises(YoutiliticsApiUnavailable):
+            await policy.async_request("services", send)
+        assert len(sent) == BREAKER_THRESHOLD - MAX_ATTEMPTS
+        with pytest.raises(YoutiliticsApiUnavailable):
+            await policy.async_request("services", send)
+
+    with patch.object(youtilitics.asyncio, "sleep", no_sleep):
+        asyncio.run(run())
+
+
+def test_long_retry_after_opens(clock):
+    """A Retry-After longer than MAX_RETRY_AFTER opens the circuit for that long."""
+    policy = YoutiliticsRequestPolicy()
+
+    async def send():
+        return FakeResponse(429, {"Retry-After": "3600"})
+
+    with pytest.raises(YoutiliticsApiUnavailable):
+        asyncio.run(policy.async_request("services", send))
+    assert policy.breaker.retry_in() == 3600
+
+
+def test_outage_logged_once(caplog):
+    """Jobs failing because the API is unavailable log a single warning, not a traceback each."""
+    scheduler = YoutiliticsSyncScheduler(4)
+
+    async def unavailable():
+        raise YoutiliticsApiUnavailable(120)
+
+    async def ok():
+        pass
+
+    async def run():
+        results = await asyncio.gather(*(
+            scheduler._async_run_job(f"s-{i}", "update", unavailable, None, None) for i in range(3)
+        ))
+        assert results == [False] * 3
+        assert await scheduler._async_run_job("s-0", "update", ok, None, None)
+        assert not await scheduler._async_run_job("s-0", "update", unavailable, None, None)
+
+    with caplog.at_level(logging.WARNING):
+        asyncio.run(run())
+    warnings = [record for record in caplog.records if "unavailable" in record.getMessage()]
+    assert len(warnings) == 2
+    assert "120s" in warnings[0].getMessage()
+    assert not any(record.exc_info for record in caplog.records)
+
+
+def test_auth_failure_logged_once(caplog):
+    """Jobs failing because the authorization was revoked log a single warning, not a traceback each."""
+    scheduler = YoutiliticsSyncScheduler(4)
+
+    async def revoked():
+        raise ConfigEntryAuthFailed("The Youtilitics authorization was revoked")
+
+    async def run():
+        results = await asyncio.gather(*(
+            scheduler._async_run_job(f"s-{i}", "update", revoked, None, None) for i in range(3)
+        ))
+        assert results == [False] * 3
+
+    with caplog.at_level(logging.WARNING):
+        asyncio.run(run())
+    warnings = [record for record in caplog.records if "authorization" in record.getMessage()]
+    assert len(warnings) == 1
+    assert not any(record.exc_info for record in caplog.records)
@@ -0,0 +1,98 @@
+"""Tests of the incremental hourly, daily and billing period rollups."""
+from datetime import date, datetime, timedelta, timezone
+from types import SimpleNamespace
+from unittest.mock import patch
+import zoneinfo
+
+import pytest
+
+from homeassistant.util import dt as dt_util
+
+from custom_components.youtilitics.models import ReadingSeries
+from custom_components.youtilitics.rollups import (
+    ROLLUP_BILLING_PERIOD,
+    ROLLUP_DAILY,
+    ROLLUP_HOURLY,
+    YoutiliticsRollups,
+    billing_period_start,
+)
+
+
+@pytest.fixture
+def time_zone():
+    """Set the local time zone of the dt helpers, restoring it afterwards."""
+    previous = dt_util.DEFAULT_TIME_ZONE
+
+    def set_time_zone(name):
+        dt_util.set_default_time_zone(zoneinfo.ZoneInfo(name))
+
+    yield set_time_zone
+    dt_util.set_default_time_zone(previous)
+
+
+def _series(start, count, first_id=0):
+    """Return 15-minute readings of 0.25 kWh from start, the sixth one a 1.25 kWh peak."""
+    return ReadingSeries.from_dicts([
+        {
+            "id": first_id + i,
+            "timestamp": (start + timedelta(minutes=15 * i)).isoformat(),
+            "reading": 1.25 if i == 5 else 0.25,
+            "unit": "kWh",
+            "raw_reading": 0.0,
+            "raw_unit": "kWh",
+            "cost": 0.1,
+        }
+        for i in range(count)
+    ])
+
+
+def test_billing_period_start():
+    """Billing periods start on the billing day, in the previous month before it."""
+    assert billing_period_start(date(2024, 3, 20), 15) == date(2024, 3, 15)
+    assert billing_period_start(date(2024, 3, 15), 15) == date(2024, 3, 15)
+    assert billing_period_start(date(2024, 3, 3), 15) == date(2024, 2, 15)
+    assert billing_period_start(date(2024, 1, 3), 15) == date(2023, 12, 15)
+
+
+def test_periods_and_incremental_updates(time_zone):
+    """Readings land in their hour, day and billing period, appended ones are added once."""
+    time_zone("UTC")
+    start = datetime(2024, 3, 1, tzinfo=timezone.utc)
+    store = SimpleNamespace(readings=_series(start, 96 * 3), revision=1)
+    rollups = YoutiliticsRollups("kWh", 2)
+    with patch.object(dt_util, "utcnow", return_value=start + timedelta(days=2, hours=12)):
+        rollups.update(store)
+        assert rollups.current(ROLLUP_DAILY).count == 96
+        previous_day = rollups.previous(ROLLUP_DAILY)
+        assert previous_day.sum == 96 * 0.25
+        assert previous_day.peak == 0.25
+        assert rollups.current(ROLLUP_HOURLY).count == 4
+        # March 1st falls in the billing period that started on February 2nd
+        assert rollups.previous(ROLLUP_BILLING_PERIOD).count == 96
+        assert rollups.previous(ROLLUP_BILLING_PERIOD).peak == 1.25
+        assert rollups.current(ROLLUP_BILLING_PERIOD).count == 96 * 2
+        assert rollups.current(ROLLUP_BILLING_PERIOD).cost == pytest.approx(96 * 2 * 0.1)
+
+        store.readings = store.readings + _series(start + timedelta(days=3), 4, 96 * 3)
+        rollups.update(store)
+        rollups.update(store)
+        assert rollups.latest(ROLLUP_DAILY).count == 4
+        assert rollups.current(ROLLUP_BILLING_PERIOD).count == 96 * 2 + 4
+
+        # A rewritten store is rebuilt rather than added again
+        store.revision = 2
+        rollups.update(store)
+        assert rollups.latest(ROLLUP_DAILY).count == 4
+        assert rollups.current(ROLLUP_BILLING_PERIOD).count == 96 * 2 + 4
+
+
+def test_local_days_across_dst(time_zone):
+    """Days follow the local time zone, a DST change day having 92 intervals."""
+    time_zone("Europe/Paris")
+    local_midnight = datetime(2024, 3, 31, tzinfo=zoneinfo.ZoneInfo("Europe/Paris"))
+    store = SimpleNamespace(readings=_series(local_midnight.astimezone(timezone.utc), 92 + 96), revision=1)
+    rollups = YoutiliticsRollups("kWh", 1)
+    with patch.object(dt_util, "utcnow", return_value=datetime(2024, 4, 1, 12, tzinfo=timezone.utc)):
+        rollups.update(store)
+        assert rollups.previous(ROLLUP_DAILY).count == 92
+        assert rollups.current(ROLLUP_DAILY).count == 96
@@ -0,0 +1,75 @@
+"""Tests of the columnar readings series and its batch decoding."""
+from datetime import datetime, timedelta, timezone
+
+from custom_components.youtilitics.models import Reading, ReadingSeries
+
+START = datetime(2024, 3, 1, tzinfo=timezone.utc)
+TIMESTAMP_FORMATS = [
+    lambda when: when.isoformat(),
+    lambda when: when.strftime("%Y-%m-%dT%H:%M:%SZ"),
+    lambda when: when.astimezone(timezone(timedelta(hours=-5))).isoformat(),
+    lambda when: when.isoformat(timespec="milliseconds"),
+]
+
+
+def _items(count, timestamp_format):
+    """Return raw API readings mixing units, some of them converted."""
+    items = []
+    for i in range(count):
+        gas = i % 3 == 0
+        items.append({
+            "id": i,
+            "timestamp": timestamp_format(START + timedelta(minutes=15 * i)),
+            "reading": 0.5 * i,
+            "unit": "m³" if gas else "kWh",
+            "raw_reading": 0.01 * i,
+            "raw_unit": "Therm" if gas else "kWh",
+            "cost": 0.1,
+        })
+    return items
+
+
+def test_from_dicts_matches_per_reading_decoding():
+    """Decoding column by column gives the same rows as decoding each reading."""
+    for timestamp_format in TIMESTAMP_FORMATS:
+        items = _items(50, timestamp_format)
+        expected = ReadingSeries.from_readings(Reading.from_dict(item) for item in items)
+        series = ReadingSeries.from_dicts(items)
+        assert list(series) == list(expected)
+        assert series.as_dict() == expected.as_dict()
+
+
+def test_round_trip_and_slicing():
+    """Series survive serialization, concatenation, sorting and filtering."""
+    series = ReadingSeries.from_dicts(_items(40, TIMESTAMP_FORMATS[0]))
+    assert list(ReadingSeries.from_dict(series.as_dict())) == list(series)
+    assert list((series[:10] + series[10:]).ids) == list(range(40))
+    shuffled = series.take([3, 1, 2, 0])
+    assert list(shuffled.sorted().ids) == [0, 1, 2, 3]
+    assert list(series.after(series.timestamps[29]).ids) == list(range(30, 40))
+    assert list(series.with_unit("m³").ids) == list(range(0, 40, 3))
+    assert {reading.unit for reading in series.with_unit("kWh")} == {"kWh"}
+
+
+def test_day_slices():
+    """A sorted series is split into local calendar days."""
+    series = ReadingSeries.from_dicts(_items(96 * 3, TIMESTAMP_FORMATS[0]))
+    days = list(series.day_slices())
+    assert sum(len(day) for day in days) == len(series)
+    for day in days:
+        dates = {datetime.fromtimestamp(timestamp).date() for timestamp in day.timestamps}
+        assert len(dates) <= 1
+
+
+def test_merged_matches_a_sorted_concatenation():
+    """Rows merged into a sorted series land where sorting the concatenation would put them."""
+    series = ReadingSeries.from_dicts(_items(40, TIMESTAMP_FORMATS[0]))
+    kept = series.take(i for i in range(40) if i % 7 not in (2, 3))
+    refilled = series.take(i for i in range(40) if i % 7 in (2, 3))
+    merged = kept.merged(refilled)
+    assert list(merged) == list(series)
+    assert list(merged) == list((kept + refilled).sorted())
+    # Rows before, after and in a series without them
+    assert list(series[10:20].merged(series[:3] + series[35:])) == list(series[:3] + series[10:20] + series[35:])
+    assert list(ReadingSeries().merged(series[:5])) == list(series[:5])
+    assert list(series[:5].merged(ReadingSeries())) == list(series[:5])
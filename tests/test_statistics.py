@@ -0,0 +1,58 @@
+"""Tests of the hourly statistics built from the readings for the backfill."""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from custom_components.youtilitics.models import ReadingSeries
+from custom_components.youtilitics.statistics import build_mean_statistics, build_sum_statistics
+
+START = datetime(2024, 5, 1, 10, tzinfo=timezone.utc)
+
+
+def _series(values, costs):
+    """Return 15-minute readings with the given values and costs."""
+    return ReadingSeries.from_dicts([
+        {
+            "id": i,
+            "timestamp": (START + timedelta(minutes=15 * i)).isoformat(),
+            "reading": value,
+            "unit": "kWh",
+            "raw_reading": value,
+            "raw_unit": "kWh",
+            "cost": cost,
+        }
+        for i, (value, cost) in enumerate(zip(values, costs))
+    ])
+
+
+def test_sum_statistics_of_usage_and_cost():
+    """Usage and cost get the same hours, with running states from the base totals and sums from zero."""
+    series = _series([1.0, 2.0, 3.0, 4.0, 5.0, 6.0], [0.1, 0.2, 0.3, 0.4, 0.5, 0.6])
+    usage, cost, total, total_cost = build_sum_statistics(series, base_total=100.0, base_cost=10.0)
+    assert [row["start"] for row in usage] == [START, START + timedelta(hours=1)]
+    assert [row["start"] for row in cost] == [START, START + timedelta(hours=1)]
+    assert [(row["state"], row["sum"]) for row in usage] == [(110.0, 10.0), (121.0, 21.0)]
+    assert [row["state"] for row in cost] == pytest.approx([11.0, 12.1])
+    assert [row["sum"] for row in cost] == pytest.approx([1.0, 2.1])
+    assert total == 121.0
+    assert total_cost == pytest.approx(12.1)
+
+
+def test_sum_statistics_continue_from_previous_totals():
+    """Statistics built in two batches end on the same totals as in one."""
+    series = _series([1.0] * 12, [0.5] * 12)
+    _, _, total, total_cost = build_sum_statistics(series[:6])
+    _, _, total, total_cost = build_sum_statistics(series[6:], total, total_cost)
+    assert (total, total_cost) == build_sum_statistics(series)[2:]
+
+
+def test_empty_series():
+    """An empty series builds no statistics and keeps the base totals."""
+    assert build_sum_statistics(ReadingSeries(), 5.0, 1.0) == ([], [], 5.0, 1.0)
+    assert build_mean_statistics(ReadingSeries()) == []
+
+
+def test_mean_statistics():
+    """Interval statistics are the hourly mean, min and max of the readings."""
+    rows = build_mean_statistics(_series([1.0, 2.0, 3.0, 6.0, 5.0], [0.0] * 5))
+    assert [(row["mean"], row["min"], row["max"]) for row in rows] == [(3.0, 1.0, 6.0), (5.0, 5.0, 5.0)]
@@ -0,0 +1,227 @@
+"""Tests of the readings store, the meter ledger and the refetching of gaps."""
+import asyncio
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+from homeassistant.util import dt as dt_util
+
+from custom_components.youtilitics.coordinator import GAP_CHECK_INTERVAL, GAP_MAX_AGE, YoutiliticsReadingsManager
+from custom_components.youtilitics.index import SLOT_SECONDS
+from custom_components.youtilitics.models import ReadingSeries
+from custom_components.youtilitics.profiler import YoutiliticsProfiler
+from custom_components.youtilitics.store import YoutiliticsMeterLedger, YoutiliticsReadingsStore
+
+SERVICE_ID = "service-1"
+
+
+class FakeStore:
+    """Home Assistant Store keeping the saved data in memory."""
+
+    saved = {}
+
+    def __init__(self, hass, version, key):
+        self.key = key
+
+    async def async_load(self):
+        return self.saved.get(self.key)
+
+    def async_delay_save(self, data_func, delay):
+        self.saved[self.key] = data_func()
+
+    async def async_remove(self):
+        self.saved.pop(self.key, None)
+
+
+@pytest.fixture(autouse=True)
+def fake_store():
+    """Keep stores in memory."""
+    FakeStore.saved = {}
+    with patch("custom_components.youtilitics.store.Store", FakeStore):
+        yield
+
+
+def _series(start, slots, reading=0.25):
+    """Return readings of the given 15-minute slots from start."""
+    return ReadingSeries.from_dicts([
+        {
+            "id": slot,
+            "timestamp": (start + timedelta(minutes=15 * slot)).isoformat(),
+            "reading": reading,
+            "unit": "kWh",
+            "raw_reading": reading,
+            "raw_unit": "kWh",
+            "cost": 0.05,
+        }
+        for slot in slots
+    ])
+
+
+def _start(days_ago):
+    """Return the start of a slot some days ago."""
+    now = dt_util.utcnow().timestamp()
+    return dt_util.utc_from_timestamp(now - now % SLOT_SECONDS) - timedelta(days=days_ago)
+
+
+def test_ledger_counts_each_reading_once():
+    """Readings delivered again, in any order, are not counted twice."""
+    ledger = YoutiliticsMeterLedger(None, SERVICE_ID)
+    start = _start(5)
+    readings = _series(start, range(8))
+    assert len(ledger.async_ingest(readings[:5])) == 5
+    counted = ledger.async_ingest(readings.take([7, 2, 5, 0, 6]))
+    assert sorted(counted.ids) == [5, 6, 7]
+    assert not ledger.async_ingest(readings)
+    assert ledger.total == pytest.approx(2.0)
+    assert ledger.cost == pytest.approx(0.4)
+
+    restored = YoutiliticsMeterLedger(None, SERVICE_ID)
+    assert asyncio.run(restored.async_load())
+    assert not restored.async_ingest(readings)
+    assert restored.total == pytest.approx(2.0)
+
+
+def test_ledger_skips_readings_up_to_the_watermark():
+    """A migrated total already includes the readings up to its watermark."""
+    ledger = YoutiliticsMeterLedger(None, SERVICE_ID)
+    readings = _series(_start(5), range(4))
+    ledger.async_migrate(10.0, readings.timestamps[1])
+    assert list(ledger.async_ingest(readings).ids) == [2, 3]
+    assert ledger.total == pytest.approx(10.5)
+
+
+def test_store_round_trip():
+    """Readings, history state and empty gaps survive a restart."""
+    store = YoutiliticsReadingsStore(None, SERVICE_ID)
+    readings = _series(_start(5), [0, 1, 3])
+    store.async_extend(readings)
+    store.async_finish_history()
+    store.async_set_empty_gaps({(readings.timestamps[1] + SLOT_SECONDS,) * 2: (2, 1234.0)})
+
+    restored = YoutiliticsReadingsStore(None, SERVICE_ID)
+    asyncio.run(restored.async_load())
+    assert list(restored.readings) == list(readings)
+    assert restored.complete
+    assert restored.empty_gaps == store.empty_gaps
+    assert restored.find_gaps() == list(store.empty_gaps)
+
+
+def _manager(store, responses):
+    """Return a readings manager using store, whose API answers gap and tail requests from responses."""
+    async def get_readings_window(service_id, since, until):
+        return responses.get(dt_util.parse_datetime(since).timestamp() + SLOT_SECONDS, ReadingSeries())
+
+    async def get_bulk_readings(service_id, since):
+        return responses.get("tail", ReadingSeries())
+
+    api = SimpleNamespace(
+        profiler=YoutiliticsProfiler(),
+        get_readings_window=get_readings_window,
+        get_bulk_readings=get_bulk_readings,
+    )
+    manager = YoutiliticsReadingsManager(None, api)
+    manager._stores[SERVICE_ID] = store
+    return manager
+
+
+def _complete_store(readings):
+    """Return a complete store holding readings."""
+    store = YoutiliticsReadingsStore(None, SERVICE_ID)
+    asyncio.run(store.async_load())
+    store.async_extend(readings)
+    store.async_finish_history()
+    return store
+
+
+def test_refilled_readings_do_not_move_the_cursor():
+    """Readings refilling gaps before the cursor are kept apart from the new readings."""
+    start = _start(5)
+    stored = _series(start, [0, 1, 4, 5])
+    store = _complete_store(stored)
+    manager = _manager(store, {
+        stored.timestamps[1] + SLOT_SECONDS: _series(start, [2, 3]),
+        "tail": _series(start, [6, 7]),
+    })
+    manager.seed_cursor(SERVICE_ID, store.last_timestamp)
+
+    readings = asyncio.run(manager._async_fetch_latest(SERVICE_ID))
+    assert list(readings.ids) == [6, 7]
+    assert list(manager.get_refilled(SERVICE_ID).ids) == [2, 3]
+    assert list(store.readings.ids) == list(range(8))
+
+
+def test_empty_gaps_back_off():
+    """A gap the API has nothing for is retried after a delay doubling with each attempt."""
+    start = _start(5)
+    stored = _series(start, [0, 1, 4, 5])
+    gap = (stored.timestamps[1] + SLOT_SECONDS, stored.timestamps[2] - SLOT_SECONDS)
+    store = _complete_store(stored)
+    manager = _manager(store, {})
+
+    assert not asyncio.run(manager._async_fill_gaps(SERVICE_ID, store))
+    attempts, retry_at = store.empty_gaps[gap]
+    assert attempts == 1
+    assert retry_at == pytest.approx(dt_util.utcnow().timestamp() + 2 * GAP_CHECK_INTERVAL.total_seconds(), abs=5)
+
+    # The next check leaves the gap alone until it is due
+    requested = []
+    manager.api.get_readings_window = lambda *args: requested.append(args)
+    manager._gaps_checked.clear()
+    asyncio.run(manager._async_fill_gaps(SERVICE_ID, store))
+    assert not requested
+    assert store.empty_gaps[gap] == (1, retry_at)
+
+    # Once due it is retried, then filled
+    store.empty_gaps[gap] = (1, 0.0)
+    manager = _manager(store, {gap[0]: _series(start, [2, 3])})
+    filled = asyncio.run(manager._async_fill_gaps(SERVICE_ID, store))
+    assert list(filled.ids) == [2, 3]
+    assert store.empty_gaps == {}
+
+
+def test_old_gaps_are_not_refetched():
+    """Gaps older than the age cutoff are never requested."""
+    start = _start(GAP_MAX_AGE.days + 5)
+    store = _complete_store(_series(start, [0, 1, 4, 5]))
+    requested = []
+
+    async def get_readings_window(*args):
+        requested.append(args)
+        return ReadingSeries()
+
+    manager = _manager(store, {})
+    manager.api.get_readings_window = get_readings_window
+    asyncio.run(manager._async_fill_gaps(SERVICE_ID, store))
+    assert not requested
+    assert store.empty_gaps == {}
+
+
+def test_released_service_leaves_nothing_behind():
+    """A service released by every platform holding it has its state and stored readings dropped."""
+    readings = _series(_start(5), range(4))
+    store = _complete_store(readings)
+    manager = _manager(store, {})
+    listener = manager.async_add_listener(SERVICE_ID, lambda: None)
+    manager.hold_service(SERVICE_ID)
+    manager.hold_service(SERVICE_ID)
+    manager.seed_cursor(SERVICE_ID, store.last_timestamp)
+    manager._gaps_checked[SERVICE_ID] = 0.0
+    manager._results[SERVICE_ID, "latest"] = (0.0, readings)
+    assert FakeStore.saved
+
+    # The other platform still holds the service
+    asyncio.run(manager.async_release_service(SERVICE_ID))
+    assert FakeStore.saved
+    assert manager._stores[SERVICE_ID] is store
+
+    asyncio.run(manager.async_release_service(SERVICE_ID))
+    assert not FakeStore.saved
+    assert SERVICE_ID not in manager._stores
+    assert SERVICE_ID not in manager._cursors
+    assert SERVICE_ID not in manager._gaps_checked
+    assert not manager._results
+    # Entities remove their own listeners
+    listener()
+    assert manager._listeners[SERVICE_ID] == []
@@ -0,0 +1,108 @@
+"""Tests of the sync slots shared by the config entries."""
+import asyncio
+
+from custom_components.youtilitics.scheduler import YoutiliticsSyncBudget
+
+
+async def _sync(budget, entry_id, name, order, release):
+    """Hold a slot of the budget until release is set, recording when it was acquired."""
+    async with budget.async_slot(entry_id):
+        order.append(name)
+        await release.wait()
+
+
+async def _settle():
+    """Let the tasks run until they block."""
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_slots_go_to_entries_in_turn():
+    """An entry queueing many syncs cannot starve another entry."""
+    async def run():
+        budget = YoutiliticsSyncBudget(1)
+        order = []
+        releases = {name: asyncio.Event() for name in ("first", "a1", "a2", "a3", "b1")}
+        tasks = [asyncio.create_task(_sync(budget, "a", "first", order, releases["first"]))]
+        await _settle()
+        for name in ("a1", "a2", "a3", "b1"):
+            tasks.append(asyncio.create_task(_sync(budget, name[0], name, order, releases[name])))
+        await _settle()
+        assert order == ["first"]
+        for name in ("first", "a1", "b1", "a2"):
+            releases[name].set()
+            await _settle()
+        assert order == ["first", "a1", "b1", "a2", "a3"]
+        releases["a3"].set()
+        await asyncio.gather(*tasks)
+        assert budget._free == 1
+        assert not budget._waiters
+
+    asyncio.run(run())
+
+
+def test_slots_are_shared_up_to_the_budget():
+    """Syncs only wait once every slot is taken."""
+    async def run():
+        budget = YoutiliticsSyncBudget(2)
+        order = []
+        release = asyncio.Event()
+        tasks = [asyncio.create_task(_sync(budget, entry_id, entry_id, order, release)) for entry_id in "abc"]
+        await _settle()
+        assert order == ["a", "b"]
+        release.set()
+        await asyncio.gather(*tasks)
+        assert order == ["a", "b", "c"]
+        assert budget._free == 2
+
+    asyncio.run(run())
+
+
+def test_cancelled_waiter_gives_up_its_place():
+    """A sync cancelled while waiting leaves the queue, the slot goes to the next one."""
+    async def run():
+        budget = YoutiliticsSyncBudget(1)
+        order = []
+        release = asyncio.Event()
+        holder = asyncio.create_task(_sync(budget, "a", "holder", order, release))
+        await _settle()
+        cancelled = asyncio.create_task(_sync(budget, "b", "cancelled", order, release))
+        waiting = asyncio.create_task(_sync(budget, "c", "waiting", order, release))
+        await _settle()
+        cancelled.cancel()
+        await _settle()
+        assert "b" not in budget._waiters
+        release.set()
+        await asyncio.gather(holder, waiting)
+        assert order == ["holder", "waiting"]
+        assert cancelled.cancelled()
+        assert budget._free == 1
+
+    asyncio.run(run())
+
+
+def test_slot_handed_to_a_cancelled_waiter_is_passed_on():
+    """A slot handed over just as the wait got cancelled goes to the next waiter instead of leaking."""
+    async def run():
+        budget = YoutiliticsSyncBudget(1)
+        order = []
+        release = asyncio.Event()
+
+        async def hold():
+            await _sync(budget, "a", "holder", order, release)
+            # The slot was just handed to "cancelled", which is cancelled before it resumes
+            cancelled.cancel()
+
+        holder = asyncio.create_task(hold())
+        await _settle()
+        cancelled = asyncio.create_task(_sync(budget, "b", "cancelled", order, release))
+        waiting = asyncio.create_task(_sync(budget, "c", "waiting", order, release))
+        await _settle()
+        release.set()
+        await holder
+        await waiting
+        assert order == ["holder", "waiting"]
+        assert cancelled.cancelled()
+        assert budget._free == 1
+
+    asyncio.run(run())